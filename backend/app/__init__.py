@@ -8,11 +8,204 @@ def create_app(test_config=None):
     """Create and configure the Flask application."""
     app = Flask(__name__, instance_relative_config=False)
 
+    from .patterns.pool_state import DEFAULT_SYNC_INTERVAL, LocalPoolState, SQLitePoolState
+    from .patterns.singleton_pool import DEFAULT_IDLE_TTL, Pool
+    from .utils.admission import (DEFAULT_DEADLINE_HEADER, DEFAULT_MAX_CLIENTS, DEFAULT_MAX_CONCURRENT,
+                                  DEFAULT_MAX_WAIT, DEFAULT_QUEUE_SIZE)
+    from .utils.coalescing import (DEFAULT_MAX_ENTRIES as DEFAULT_COALESCE_MAX_ENTRIES,
+                                   DEFAULT_MAX_WAIT as DEFAULT_COALESCE_MAX_WAIT, DEFAULT_TTL as DEFAULT_COALESCE_TTL)
+    from .utils.character_store import (DEFAULT_BATCH_SIZE as DEFAULT_STORE_BATCH_SIZE,
+                                        DEFAULT_CAPACITY as DEFAULT_STORE_CAPACITY,
+                                        DEFAULT_FLUSH_INTERVAL as DEFAULT_STORE_FLUSH_INTERVAL,
+                                        DEFAULT_RETENTION as DEFAULT_STORE_RETENTION)
+    from .utils.population import DEFAULT_MAX_BYTES as DEFAULT_POPULATION_MAX_BYTES
+    from .utils.population import DEFAULT_MAX_COUNT as DEFAULT_POPULATION_MAX_COUNT
+    from .utils.combat import (DEFAULT_MAX_DUELS as DEFAULT_SIMULATION_MAX_DUELS,
+                               DEFAULT_MAX_JOBS as DEFAULT_SIMULATION_MAX_JOBS,
+                               DEFAULT_MAX_PENDING as DEFAULT_SIMULATION_MAX_PENDING,
+                               DEFAULT_MAX_ROUNDS as DEFAULT_SIMULATION_MAX_ROUNDS,
+                               DEFAULT_SHARD_SIZE as DEFAULT_SIMULATION_SHARD_SIZE)
+    from .utils.http_cache import DEFAULT_CACHE_CONTROL, send_image
+    from .utils.image_manager import DEFAULT_REFRESH_INTERVAL, DEFAULT_UPLOAD_MAX_BYTES, image_manager
+    from .utils.profiling import (DEFAULT_HEADER as PROFILE_DEFAULT_HEADER,
+                                  DEFAULT_MAX_BYTES as DEFAULT_PROFILE_MAX_BYTES, DEFAULT_STACK_INTERVAL)
+    from .utils.tracing import DEFAULT_BUFFER as DEFAULT_TRACE_BUFFER, DEFAULT_HEADER as TRACE_DEFAULT_HEADER
+    from .utils.sprite_atlas import (DEFAULT_MAX_BYTES as DEFAULT_SPRITE_CACHE_BYTES,
+                                     DEFAULT_MAX_DISK_BYTES as DEFAULT_SPRITE_CACHE_DISK_BYTES, sprite_renderer)
+
     # Simple config; extend as needed
     app.config.from_mapping(
         SECRET_KEY="dev",
+        POOL_IDLE_TTL=DEFAULT_IDLE_TTL,
+        POOL_MAX_FACTORIES=None,
+        POOL_STATE="local",
+        POOL_STATE_PATH=None,
+        POOL_SYNC_INTERVAL=DEFAULT_SYNC_INTERVAL,
+        IMAGE_INDEX_REFRESH=DEFAULT_REFRESH_INTERVAL,
+        BATCH_MAX_COUNT=100000,
+        ACTION_EVENTS_SAMPLE_RATE=1.0,
+        ACTION_EVENTS_CAPACITY=4096,
+        ACTION_EVENTS_FLUSH_INTERVAL=1.0,
+        ACTION_EVENTS_FILE=None,
+        CACHE_CONTROL=dict(DEFAULT_CACHE_CONTROL),
+        ASSET_PACKS_ENABLED=True,
+        ASSET_PACK_DIR=None,
+        ASSET_PACK_BODY="bytes",
+        SPRITE_CACHE_DIR=None,
+        SPRITE_CACHE_BYTES=DEFAULT_SPRITE_CACHE_BYTES,
+        SPRITE_CACHE_DISK_BYTES=DEFAULT_SPRITE_CACHE_DISK_BYTES,
+        UPLOAD_MAX_BYTES=DEFAULT_UPLOAD_MAX_BYTES,
+        JSON_ENCODER="auto",
+        JSON_COMPACT=False,
+        WARM_UP=True,
+        RACES_DIRS=(),
+        RACES_PRELOAD=False,
+        PRODUCT_MODE="pool",
+        METRICS_ENABLED=True,
+        METRICS_PATH="/metrics",
+        PROFILE_SAMPLE_RATE=0.0,
+        PROFILE_MODE="cprofile",
+        PROFILE_HEADER=PROFILE_DEFAULT_HEADER,
+        PROFILE_TOKEN=None,
+        PROFILE_DIR=None,
+        PROFILE_MAX_BYTES=DEFAULT_PROFILE_MAX_BYTES,
+        PROFILE_STACK_INTERVAL=DEFAULT_STACK_INTERVAL,
+        TRACE_ENABLED=False,
+        TRACE_SAMPLE_RATE=1.0,
+        TRACE_HEADER=TRACE_DEFAULT_HEADER,
+        TRACE_BUFFER=DEFAULT_TRACE_BUFFER,
+        CHARACTER_STORE_ENABLED=False,
+        CHARACTER_STORE_PATH=None,
+        CHARACTER_STORE_CAPACITY=DEFAULT_STORE_CAPACITY,
+        CHARACTER_STORE_BATCH_SIZE=DEFAULT_STORE_BATCH_SIZE,
+        CHARACTER_STORE_FLUSH_INTERVAL=DEFAULT_STORE_FLUSH_INTERVAL,
+        CHARACTER_STORE_RETENTION=DEFAULT_STORE_RETENTION,
+        POPULATION_DIR=None,
+        POPULATION_MAX_COUNT=DEFAULT_POPULATION_MAX_COUNT,
+        POPULATION_MAX_BYTES=DEFAULT_POPULATION_MAX_BYTES,
+        SIMULATION_DIR=None,
+        SIMULATION_WORKERS=None,
+        SIMULATION_SHARD_SIZE=DEFAULT_SIMULATION_SHARD_SIZE,
+        SIMULATION_MAX_ROUNDS=DEFAULT_SIMULATION_MAX_ROUNDS,
+        SIMULATION_MAX_DUELS=DEFAULT_SIMULATION_MAX_DUELS,
+        SIMULATION_MAX_JOBS=DEFAULT_SIMULATION_MAX_JOBS,
+        SIMULATION_MAX_PENDING=DEFAULT_SIMULATION_MAX_PENDING,
+        COALESCE_ENABLED=True,
+        COALESCE_TTL=DEFAULT_COALESCE_TTL,
+        COALESCE_MAX_WAIT=DEFAULT_COALESCE_MAX_WAIT,
+        COALESCE_MAX_ENTRIES=DEFAULT_COALESCE_MAX_ENTRIES,
+        ADMISSION_ENABLED=True,
+        ADMISSION_MAX_CONCURRENT=DEFAULT_MAX_CONCURRENT,
+        ADMISSION_QUEUE_SIZE=DEFAULT_QUEUE_SIZE,
+        ADMISSION_MAX_WAIT=DEFAULT_MAX_WAIT,
+        ADMISSION_RATE=None,
+        ADMISSION_BURST=None,
+        ADMISSION_MAX_CLIENTS=DEFAULT_MAX_CLIENTS,
+        ADMISSION_CLIENT_HEADER=None,
+        ADMISSION_DEADLINE_HEADER=DEFAULT_DEADLINE_HEADER,
+    )
+    if test_config is not None:
+        app.config.update(test_config)
+
+    # Política de desalojo del registro de fábricas y estado compartido entre workers
+    if app.config["POOL_STATE"] == "sqlite":
+        pool_state = SQLitePoolState(
+            app.config["POOL_STATE_PATH"] or image_manager.project_root / "build" / "pool-state.sqlite3",
+            sync_interval=app.config["POOL_SYNC_INTERVAL"],
+        )
+    elif app.config["POOL_STATE"] == "local":
+        pool_state = LocalPoolState()
+    else:
+        raise ValueError(f"POOL_STATE desconocido: '{app.config['POOL_STATE']}'")
+    Pool().configure(
+        idle_ttl=app.config["POOL_IDLE_TTL"],
+        max_factories=app.config["POOL_MAX_FACTORIES"],
+        state=pool_state,
     )
 
+    # Codificador JSON de las respuestas (orjson solo con JSON_COMPACT)
+    from .utils.serialization import configure_json
+    configure_json(app.config["JSON_ENCODER"], compact=app.config["JSON_COMPACT"])
+
+    # Índice de imágenes construido una sola vez al arrancar
+    image_manager.refresh_interval = app.config["IMAGE_INDEX_REFRESH"]
+    image_manager.build_index()
+
+    # Paquetes mmap de imágenes (si se construyeron con `python -m backend.app.utils.asset_pack build`)
+    if app.config["ASSET_PACKS_ENABLED"]:
+        from .utils.asset_pack import asset_packs
+        asset_packs.load(pack_dir=app.config["ASSET_PACK_DIR"])
+
+    # Personajes creados guardados en SQLite (WAL) con escritura diferida por lotes (desactivado por defecto)
+    from .utils.character_store import character_store
+    character_store.configure(
+        app.config["CHARACTER_STORE_PATH"] or image_manager.project_root / "build" / "characters.sqlite3"
+        if app.config["CHARACTER_STORE_ENABLED"] else None,
+        capacity=app.config["CHARACTER_STORE_CAPACITY"],
+        batch_size=app.config["CHARACTER_STORE_BATCH_SIZE"],
+        flush_interval=app.config["CHARACTER_STORE_FLUSH_INTERVAL"],
+        retention=app.config["CHARACTER_STORE_RETENTION"],
+    )
+
+    # Poblaciones exportadas por columnas (necesitan NumPy para generarse y leerse)
+    from .utils.population import population_store
+    population_store.configure(
+        app.config["POPULATION_DIR"] or image_manager.project_root / "build" / "populations",
+        max_count=app.config["POPULATION_MAX_COUNT"],
+        max_bytes=app.config["POPULATION_MAX_BYTES"],
+    )
+
+    # Simulaciones de combate en segundo plano (estado compartido en disco entre workers)
+    from .utils.combat import simulation_jobs
+    simulation_jobs.configure(
+        app.config["SIMULATION_DIR"] or image_manager.project_root / "build" / "simulations",
+        workers=app.config["SIMULATION_WORKERS"],
+        shard_size=app.config["SIMULATION_SHARD_SIZE"],
+        max_rounds=app.config["SIMULATION_MAX_ROUNDS"],
+        max_duels=app.config["SIMULATION_MAX_DUELS"],
+        max_jobs=app.config["SIMULATION_MAX_JOBS"],
+        max_pending=app.config["SIMULATION_MAX_PENDING"],
+    )
+
+    # Caché de atlas de sprites (LRU en memoria + disco acotado)
+    sprite_renderer.cache_dir = app.config["SPRITE_CACHE_DIR"]
+    sprite_renderer.max_bytes = app.config["SPRITE_CACHE_BYTES"]
+    sprite_renderer.max_disk_bytes = app.config["SPRITE_CACHE_DISK_BYTES"]
+
+    # Eventos de acción de los productos: muestreados y volcados en segundo plano
+    from .interfaces.interfaces import set_event_sink
+    from .utils.event_sink import SampledEventSink
+    previous_sink = set_event_sink(SampledEventSink(
+        capacity=app.config["ACTION_EVENTS_CAPACITY"],
+        sample_rate=app.config["ACTION_EVENTS_SAMPLE_RATE"],
+        flush_interval=app.config["ACTION_EVENTS_FLUSH_INTERVAL"],
+        path=app.config["ACTION_EVENTS_FILE"],
+    ))
+    if previous_sink is not None:
+        previous_sink.close()
+
+    # Métricas en formato Prometheus (latencias por ruta, pool, cachés, bytes servidos)
+    if app.config["METRICS_ENABLED"]:
+        from .utils import metrics
+        metrics.install(app, path=app.config["METRICS_PATH"])
+
+    # Perfilado muestreado o bajo demanda (sin muestreo ni token no añade hooks)
+    from .utils.profiling import request_profiler
+    request_profiler.install(app)
+
+    # Trazas por fase de las peticiones muestreadas (/api/debug/traces)
+    from .utils.tracing import tracer
+    tracer.install(app)
+
+    # Control de admisión delante de /api/create y /api/character, en dos fases alrededor
+    # de la agrupación de lecturas idénticas: las cubetas por cliente se cobran a todas
+    # las peticiones; las plazas y la cola, solo a quien calcula (quien espera no ocupa plaza)
+    from .utils.admission import admission
+    from .utils.coalescing import coalescer
+    admission.install(app)
+    coalescer.install(app)
+    admission.install_slots(app)
+
     # Register blueprints / routes
     from .routes import bp
 
@@ -33,15 +226,41 @@ def create_app(test_config=None):
 
     @app.route('/images/<path:filename>')
     def serve_images(filename):
-        # Servir desde PUBLIC_DIR/images; use send_from_directory que manejará seguridad
+        # Servir desde PUBLIC_DIR/images con ETag/Last-Modified y Cache-Control por categoría
+        category, _, rel = filename.partition('/')
+        if rel and category in image_manager.categories():
+            return send_image(category, rel)
         images_dir = os.path.join(PUBLIC_DIR, 'images')
         return send_from_directory(images_dir, filename)
 
 
     app.register_blueprint(bp)
 
+    # Razas declaradas en JSON; RACES_PRELOAD elige cuáles se compilan al arrancar
+    # (True = todas, lista = esas, False = ninguna: cada una en su primer uso)
+    from .factories import race_registry
+    from .factories.base import FabricaConPool
+    from .routes import FACTORIES
+    race_registry.configure(app.config["RACES_DIRS"])
+    # Productos prestados por pools acotados o instancias compartidas (flyweight)
+    FabricaConPool.configurar(app.config["PRODUCT_MODE"])
+    preload = app.config["RACES_PRELOAD"]
+    kinds = list(FACTORIES) if preload is True else list(preload or ())
+    preloaded = {kind: FACTORIES[kind] for kind in kinds}
+
+    # Precompilar el catálogo de personajes antes de aceptar tráfico
+    from .utils.character_catalog import character_catalog
+    character_catalog.invalidate()
+    character_catalog.build(preloaded)
+
     CORS(app)  # Habilitar CORS para todas las rutas
 
+    # Calentar fábricas, pools y rutas antes de declararse listo (/api/ready)
+    from .utils.lifecycle import readiness, warm_up
+    if app.config["WARM_UP"]:
+        warm_up(app, preloaded)
+    readiness.mark_ready()
+
 
 
     return app
@@ -1,12 +1,18 @@
-# Importamos implementaciones para que estén disponibles al importar el paquete
-from .elfos import FabricarElfos
-from .enanos import FabricarEnanos
-from .humanos import FabricarHumanos
-from .orcos import FabricarOrcos
+# Las razas se declaran en races/*.json y se compilan al usarse por primera vez
+from .registry import RaceDefinitionError, RaceRegistry, race_registry
+
+
+def __getattr__(name):
+    # Compatibilidad con ``from app.factories import FabricarElfos``
+    if name.startswith("Fabricar"):
+        factory_class = race_registry.find_class(name)
+        if factory_class is not None:
+            return factory_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
-    "FabricarElfos",
-    "FabricarEnanos",
-    "FabricarHumanos",
-    "FabricarOrcos",
+    "RaceDefinitionError",
+    "RaceRegistry",
+    "race_registry",
 ]
@@ -0,0 +1,123 @@
+from ..interfaces.interfaces import FactoryAbstract, IArma, IArmadura, ICuerpo, IMontura
+from ..patterns.object_pool import ObjectPool
+from ..utils.tracing import span
+from .productos import ProductoVariante
+
+
+# Segundos que se espera por un objeto del pool antes de rendirse
+DEFAULT_ACQUIRE_TIMEOUT = 10.0
+
+# Entrega de productos: "pool" (ObjectPool acotado) o "flyweight" (instancia compartida)
+MODOS = ("pool", "flyweight")
+
+PARTES = ("cuerpo", "montura", "armadura", "arma")
+
+
+class FabricaConPool(FactoryAbstract):
+    """
+    Base para fábricas que reutilizan sus productos mediante un ObjectPool
+    acotado por cada parte (cuerpo, montura, armadura, arma).
+
+    Las subclases declaran en ``productos`` la clase concreta de cada parte.
+    Los objetos obtenidos con ``crear_*`` deben devolverse con ``devolver_*``;
+    si no se devuelven, el pool se agota y ``crear_*`` lanza PoolExhausted.
+
+    En modo ``flyweight`` los productos no tienen estado por instancia y
+    ``crear_*`` entrega siempre la misma instancia compartida: sin pools,
+    locks ni asignaciones, y ``devolver_*`` no hace nada. ``crear_variante``
+    da un producto mutable propio para cuando un personaje necesite estado.
+    """
+
+    productos = {}
+
+    # Modo de las fábricas que se construyan (create_app lo fija con PRODUCT_MODE)
+    modo = "pool"
+
+    def __init__(self, max_size: int = 10, timeout: float = DEFAULT_ACQUIRE_TIMEOUT, modo: str = None):
+        super().__init__()
+        self.max_size = max_size
+        self.timeout = timeout
+        self.modo = modo or type(self).modo
+        if self.modo not in MODOS:
+            raise ValueError(f"Modo de productos desconocido: '{self.modo}'")
+        if self.modo == "flyweight":
+            self._pools = {}
+            self._compartidos = {
+                parte: getattr(producto, "compartido", producto)()
+                for parte, producto in self.productos.items()
+            }
+            self._personaje = tuple(self._compartidos[parte] for parte in PARTES)
+        else:
+            self._pools = {
+                parte: ObjectPool(producto, max_size=max_size, name=producto.__name__)
+                for parte, producto in self.productos.items()
+            }
+            self._compartidos = None
+            self._personaje = None
+
+    @classmethod
+    def configurar(cls, modo: str = "pool"):
+        """Fija el modo por defecto de las fábricas que se construyan a partir de ahora."""
+        if modo not in MODOS:
+            raise ValueError(f"Modo de productos desconocido: '{modo}'")
+        FabricaConPool.modo = modo
+
+    def _adquirir(self, parte: str, timeout: float = None):
+        if self._compartidos is not None:
+            return self._compartidos[parte]
+        return self._pools[parte].acquire(self.timeout if timeout is None else timeout)
+
+    def _devolver(self, parte: str, producto) -> None:
+        # Las instancias compartidas y las variantes no pertenecen a ningún pool
+        if self._compartidos is not None or isinstance(producto, ProductoVariante):
+            return
+        self._pools[parte].release(producto)
+
+    def crear_variante(self, parte: str, **estado):
+        """Producto mutable con estado propio; no se comparte ni vuelve al pool."""
+        return self.productos[parte].variante(**estado)
+
+    def devolver_cuerpo(self, cuerpo: ICuerpo) -> None:
+        self._devolver("cuerpo", cuerpo)
+
+    def devolver_montura(self, montura: IMontura) -> None:
+        self._devolver("montura", montura)
+
+    def devolver_armadura(self, armadura: IArmadura) -> None:
+        self._devolver("armadura", armadura)
+
+    def devolver_arma(self, arma: IArma) -> None:
+        self._devolver("arma", arma)
+
+    def crear_personaje(self, timeout: float = None) -> tuple:
+        """
+        Obtiene las cuatro partes de un personaje.
+
+        Si alguna parte no se puede obtener, devuelve al pool las ya
+        adquiridas antes de propagar la excepción.
+        """
+        if self._personaje is not None:
+            return self._personaje
+        adquiridas = []
+        try:
+            for crear in (self.crear_cuerpo, self.crear_montura, self.crear_armadura, self.crear_arma):
+                with span(crear.__name__, "factory"):
+                    adquiridas.append(crear(timeout))
+        except BaseException:
+            for parte, producto in zip(PARTES, adquiridas):
+                self._devolver(parte, producto)
+            raise
+        return tuple(adquiridas)
+
+    def devolver_personaje(self, cuerpo, montura, armadura, arma) -> None:
+        """Devuelve al pool las cuatro partes de un personaje."""
+        self.devolver_cuerpo(cuerpo)
+        self.devolver_montura(montura)
+        self.devolver_armadura(armadura)
+        self.devolver_arma(arma)
+
+    def get_pool_stats(self) -> dict:
+        """Estadísticas de cada pool de productos, indexadas por parte."""
+        if self._compartidos is not None:
+            return {parte: {"mode": "flyweight", "instances": 1} for parte in self._compartidos}
+        return {parte: pool.stats() for parte, pool in self._pools.items()}
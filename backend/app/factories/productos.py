@@ -0,0 +1,104 @@
+"""Productos compilados desde las definiciones de raza.
+
+``ProductoDefinido`` no guarda estado por instancia, así que una única
+instancia por clase (``compartido()``) puede prestarse a cualquier número de
+peticiones a la vez. ``ProductoVariante`` es la vía para cuando un personaje
+necesite estado propio: cada variante es un objeto nuevo y mutable que nunca
+se comparte ni vuelve a un pool.
+
+La plantilla compartida se congela al compilar la clase (``congelar``):
+modificarla cambiaría a la vez todos los personajes de la raza.
+"""
+from collections.abc import Mapping
+from types import MappingProxyType
+
+from ..utils.image_manager import image_manager
+
+
+IMAGE_KEY = "$image"
+IMAGE_CATEGORY = "characters"
+
+
+def congelar(value):
+    """Copia inmutable de una plantilla JSON: objetos como ``MappingProxyType`` y listas como tuplas."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: congelar(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(congelar(item) for item in value)
+    return value
+
+
+def render(value):
+    """Copia mutable de la plantilla con las imágenes resueltas a rutas web."""
+    if isinstance(value, Mapping):
+        if len(value) == 1 and IMAGE_KEY in value:
+            return image_manager.get_web_path(IMAGE_CATEGORY, value[IMAGE_KEY])
+        return {key: render(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [render(item) for item in value]
+    return value
+
+
+class ProductoDefinido:
+    """
+    Producto sin estado por instancia: la plantilla y las acciones viven en
+    la clase y ``__slots__`` vacío impide añadir atributos.
+    """
+
+    __slots__ = ()
+
+    # Nombre con el que se emiten los eventos de acción (el de la clase definida)
+    nombre = None
+    # Plantilla congelada (ver ``congelar``): la comparten todas las instancias
+    plantilla = MappingProxyType({})
+    # Modelo numérico: campo -> (media, desviación, mín, máx)
+    estadisticas = MappingProxyType({})
+    _variante = None
+
+    def obtener_informacion(self) -> dict:
+        return render(self.plantilla)
+
+    @classmethod
+    def compartido(cls):
+        """Instancia única de la clase (flyweight), creada en el primer uso."""
+        instancia = cls.__dict__.get("_instancia")
+        if instancia is None:
+            # Si dos hilos coinciden se queda una de dos instancias equivalentes
+            instancia = cls._instancia = cls()
+        return instancia
+
+    @classmethod
+    def variante(cls, **estado):
+        """Nueva instancia mutable con estado propio por personaje."""
+        return cls._variante(**estado)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+
+class ProductoVariante:
+    """
+    Variante mutable de un producto definido. ``estado`` se superpone a la
+    plantilla en ``obtener_informacion()``; las acciones son las del producto.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, **estado):
+        self.estado = dict(estado)
+
+    def obtener_informacion(self) -> dict:
+        info = super().obtener_informacion()
+        info.update(self.estado)
+        return info
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.estado!r}>"
+
+
+def crear_variante(producto: type) -> type:
+    """Clase mutable asociada a un producto definido (``<Clase>Variante``)."""
+    return type(f"{producto.__name__}Variante", (ProductoVariante, producto), {
+        "__slots__": ("estado",),
+        "__module__": producto.__module__,
+    })
@@ -0,0 +1,213 @@
+"""Razas declaradas en datos y compiladas a fábricas bajo demanda.
+
+Cada archivo ``races/<kind>.json`` describe una raza: el nombre de su
+fábrica y, por cada parte, el nombre de la clase del producto, la plantilla
+de ``obtener_informacion()``, el mensaje de cada acción y, opcionalmente,
+el modelo numérico de ``estadisticas`` (ver ``app/utils/population.py``).
+Las imágenes se escriben como ``{"$image": "elfo/elfo_cuerpo.png"}`` y se
+resuelven con ``image_manager`` cada vez que se pide la información (ver
+``productos``).
+
+El registro solo lista los archivos al arrancar; cada raza se lee y se
+compila la primera vez que se usa.
+"""
+import json
+import threading
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+
+from ..interfaces.interfaces import IArma, IArmadura, ICuerpo, IMontura, emit_action
+from .base import FabricaConPool
+from .productos import ProductoDefinido, congelar, crear_variante
+
+
+BUILTIN_DIR = Path(__file__).resolve().parent / "races"
+
+# Interfaz que implementa cada parte, en el orden de las respuestas
+INTERFACES = {
+    "cuerpo": ICuerpo,
+    "montura": IMontura,
+    "armadura": IArmadura,
+    "arma": IArma,
+}
+
+
+class RaceDefinitionError(ValueError):
+    """Definición de raza inválida."""
+    pass
+
+
+def _accion(nombre: str, mensaje: str):
+    def accion(self) -> None:
+        emit_action(self.nombre, nombre, mensaje)
+    accion.__name__ = accion.__qualname__ = nombre
+    return accion
+
+
+def _creador(parte: str):
+    def crear(self, timeout: float = None):
+        return self._adquirir(parte, timeout)
+    crear.__name__ = crear.__qualname__ = f"crear_{parte}"
+    return crear
+
+
+def _require(condition, source, message):
+    if not condition:
+        raise RaceDefinitionError(f"{source}: {message}")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_stats(parte: str, spec, source: str) -> dict:
+    """``estadisticas``: campo -> (media, desviación, mín, máx); sin media la distribución es uniforme."""
+    _require(isinstance(spec, dict), source, f"'{parte}.estadisticas' debe ser un objeto")
+    stats = {}
+    for campo, dist in spec.items():
+        where = f"'{parte}.estadisticas.{campo}'"
+        _require(campo.isidentifier() and isinstance(dist, dict), source, f"{where} inválida")
+        mean, std = dist.get("media"), dist.get("desviacion", 0)
+        low, high = dist.get("min"), dist.get("max")
+        _require(all(_is_number(v) for v in (std, low, high)) and (mean is None or _is_number(mean)),
+                 source, f"{where}: 'min' y 'max' obligatorios y valores numéricos")
+        _require(low <= high and std >= 0, source, f"{where}: 'min' <= 'max' y 'desviacion' >= 0")
+        _require(mean is None or low <= mean <= high, source, f"{where}: 'media' fuera de [min, max]")
+        stats[campo] = (mean, std, low, high)
+    return MappingProxyType(stats)
+
+
+def _compile_product(parte: str, spec: dict, source: str) -> type:
+    interfaz = INTERFACES[parte]
+    _require(isinstance(spec, dict), source, f"la parte '{parte}' debe ser un objeto")
+    clase = spec.get("clase")
+    _require(isinstance(clase, str) and clase.isidentifier(), source, f"'{parte}.clase' inválida")
+    _require(isinstance(spec.get("info"), dict), source, f"'{parte}.info' debe ser un objeto")
+    acciones = spec.get("acciones", {})
+    _require(isinstance(acciones, dict) and all(isinstance(m, str) for m in acciones.values()),
+             source, f"'{parte}.acciones' debe asociar acción -> mensaje")
+
+    requeridas = interfaz.__abstractmethods__ - {"obtener_informacion"}
+    faltan = sorted(requeridas - acciones.keys())
+    _require(not faltan, source, f"a '{parte}' le faltan las acciones {faltan}")
+
+    attrs = {"__slots__": (), "__module__": __name__, "nombre": clase, "plantilla": congelar(spec["info"]),
+             "estadisticas": _compile_stats(parte, spec.get("estadisticas", {}), source)}
+    for nombre, mensaje in acciones.items():
+        _require(nombre.isidentifier() and not hasattr(ProductoDefinido, nombre), source,
+                 f"nombre de acción inválido: '{nombre}'")
+        attrs[nombre] = _accion(nombre, mensaje)
+    producto = type(clase, (ProductoDefinido, interfaz), attrs)
+    producto._variante = crear_variante(producto)
+    return producto
+
+
+def compile_race(definition: dict, kind: str, source: str = "<datos>") -> type:
+    """Compila una definición en una subclase de ``FabricaConPool``."""
+    _require(isinstance(definition, dict), source, "la definición debe ser un objeto")
+    _require(definition.get("kind", kind) == kind, source,
+             f"'kind' ({definition.get('kind')}) no coincide con el archivo ({kind})")
+    fabrica = definition.get("fabrica")
+    _require(isinstance(fabrica, str) and fabrica.isidentifier(), source, "'fabrica' inválida")
+    partes = definition.get("partes")
+    _require(isinstance(partes, dict) and set(partes) == set(INTERFACES), source,
+             f"'partes' debe definir exactamente {list(INTERFACES)}")
+
+    attrs = {
+        "__module__": __name__,
+        "__doc__": definition.get("descripcion"),
+        "kind": kind,
+        "origen": source,
+        "productos": {parte: _compile_product(parte, partes[parte], source) for parte in INTERFACES},
+    }
+    for parte in INTERFACES:
+        attrs[f"crear_{parte}"] = _creador(parte)
+    return type(fabrica, (FabricaConPool,), attrs)
+
+
+def load_race(path) -> type:
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            definition = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RaceDefinitionError(f"{path.name}: {e}") from e
+    return compile_race(definition, path.stem, source=path.name)
+
+
+class RaceRegistry(Mapping):
+    """
+    Mapa kind -> clase de fábrica con compilación perezosa.
+
+    Iterar o consultar ``in`` solo usa la lista de archivos; ``registry[kind]``
+    compila la raza la primera vez. Los directorios adicionales pueden añadir
+    razas o sustituir las incluidas (mismo nombre de archivo).
+    """
+
+    def __init__(self, directories=()):
+        self._lock = threading.Lock()
+        self._directories = None
+        self.configure(directories)
+
+    def configure(self, directories=()):
+        directories = [BUILTIN_DIR] + [Path(d) for d in directories or ()]
+        with self._lock:
+            if directories == self._directories:
+                return
+            self._directories = directories
+            self._paths = None
+            self._compiled = {}
+
+    def _index(self) -> dict:
+        paths = self._paths
+        if paths is None:
+            found = {}
+            for directory in self._directories:
+                if directory.is_dir():
+                    for path in directory.glob("*.json"):
+                        found[path.stem] = path
+            paths = self._paths = dict(sorted(found.items()))
+        return paths
+
+    def reload(self):
+        """Vuelve a listar los archivos (las razas ya compiladas se conservan)."""
+        with self._lock:
+            self._paths = None
+
+    def __getitem__(self, kind: str) -> type:
+        factory_class = self._compiled.get(kind)
+        if factory_class is not None:
+            return factory_class
+        with self._lock:
+            factory_class = self._compiled.get(kind)
+            if factory_class is None:
+                path = self._index().get(kind)
+                if path is None:
+                    raise KeyError(kind)
+                factory_class = self._compiled[kind] = load_race(path)
+            return factory_class
+
+    def __contains__(self, kind) -> bool:
+        return kind in self._index()
+
+    def __iter__(self):
+        return iter(self._index())
+
+    def __len__(self) -> int:
+        return len(self._index())
+
+    def loaded(self) -> list:
+        """Razas ya compiladas."""
+        return list(self._compiled)
+
+    def find_class(self, name: str):
+        """Busca una fábrica por nombre de clase (compila las razas hasta encontrarla)."""
+        for kind in self:
+            if self[kind].__name__ == name:
+                return self[kind]
+        return None
+
+
+# Instancia global
+race_registry = RaceRegistry()
@@ -3,6 +3,7 @@ from abc import ABC, abstractmethod
 
 # Interfaces de productos
 class ICuerpo(ABC):
+    __slots__ = ()
 
     @abstractmethod
     def obtener_informacion(self) -> dict:
@@ -14,6 +15,8 @@ class ICuerpo(ABC):
 
 
 class IMontura(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def obtener_informacion(self) -> dict:
         pass
@@ -28,6 +31,8 @@ class IMontura(ABC):
 
 
 class IArmadura(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def obtener_informacion(self) -> dict:
         pass
@@ -42,6 +47,8 @@ class IArmadura(ABC):
 
 
 class IArma(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def obtener_informacion(self) -> dict:
         pass
@@ -61,3 +68,32 @@ class FactoryAbstract(ABC):
     def crear_armadura(self) -> IArmadura: ...
     @abstractmethod
     def crear_arma(self) -> IArma: ...
+
+
+# Eventos de acción
+class IEventSink(ABC):
+    """Destino de los eventos emitidos por los métodos de acción de los productos."""
+
+    @abstractmethod
+    def emit(self, origen: str, accion: str, mensaje: str) -> None: ...
+
+
+_event_sink = None
+
+
+def set_event_sink(sink):
+    """Instala el sink global de eventos de acción y devuelve el anterior (None = descartar)."""
+    global _event_sink
+    previous, _event_sink = _event_sink, sink
+    return previous
+
+
+def get_event_sink():
+    return _event_sink
+
+
+def emit_action(origen: str, accion: str, mensaje: str) -> None:
+    """Emite un evento de acción al sink global; sin sink no hace nada."""
+    sink = _event_sink
+    if sink is not None:
+        sink.emit(origen, accion, mensaje)
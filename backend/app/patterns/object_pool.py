@@ -0,0 +1,127 @@
+import threading
+import time
+
+
+class PoolExhausted(RuntimeError):
+    """Excepción lanzada cuando no se obtiene un objeto del pool antes del timeout."""
+    pass
+
+
+class ObjectPool:
+    """
+    Pool de objetos acotado y thread-safe.
+
+    Crea objetos bajo demanda con ``creator`` hasta ``max_size`` instancias
+    vivas. Cuando todas están prestadas, ``acquire`` espera hasta que alguna
+    sea devuelta con ``release`` o hasta agotar el timeout.
+    """
+
+    def __init__(self, creator, max_size: int = 10, reset=None, name: str = None):
+        if max_size < 1:
+            raise ValueError("max_size debe ser al menos 1")
+        self._creator = creator
+        self._reset = reset
+        self.max_size = max_size
+        self.name = name or getattr(creator, "__name__", "pool")
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []
+        self._created = 0
+        self._in_use = 0
+
+        # Contadores
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._high_water = 0
+
+    def acquire(self, timeout: float = None):
+        """
+        Obtiene un objeto del pool.
+
+        Args:
+            timeout: segundos máximos de espera (None = esperar indefinidamente)
+
+        Raises:
+            PoolExhausted: si no hay objetos disponibles antes del timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._created >= self.max_size:
+                if not waited:
+                    self._waits += 1
+                    waited = True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhausted(
+                        f"Pool '{self.name}' agotado: {self._in_use}/{self.max_size} objetos en uso"
+                    )
+                self._cond.wait(remaining)
+
+            if self._idle:
+                obj = self._idle.pop()
+                self._hits += 1
+            else:
+                # Reservar el hueco antes de construir fuera del lock
+                self._created += 1
+                self._misses += 1
+                obj = None
+            self._in_use += 1
+            if self._in_use > self._high_water:
+                self._high_water = self._in_use
+
+        if obj is None:
+            try:
+                obj = self._creator()
+            except BaseException:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return obj
+
+    def release(self, obj) -> None:
+        """
+        Devuelve un objeto al pool para su reutilización.
+
+        Si ``reset`` falla el objeto se descarta (su hueco queda libre para
+        crear otro) y la excepción se propaga.
+        """
+        with self._cond:
+            if self._in_use == 0:
+                raise ValueError(f"Pool '{self.name}': release sin acquire previo")
+            self._in_use -= 1
+        reusable = False
+        try:
+            if self._reset is not None:
+                self._reset(obj)
+            reusable = True
+        finally:
+            with self._cond:
+                if reusable:
+                    self._idle.append(obj)
+                else:
+                    self._created -= 1
+                    self._discarded += 1
+                self._cond.notify()
+
+    def stats(self) -> dict:
+        """Devuelve un resumen de ocupación y contadores del pool."""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "available": len(self._idle) + (self.max_size - self._created),
+                "hits": self._hits,
+                "misses": self._misses,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "high_water": self._high_water,
+            }
@@ -0,0 +1,229 @@
+"""Estado compartido del pool de fábricas entre procesos worker.
+
+``LocalPoolState`` (por defecto) no comparte nada: un solo proceso.
+``SQLitePoolState`` usa un archivo SQLite en modo WAL donde cada worker
+publica periódicamente sus fábricas y contadores, y donde se anotan las
+eliminaciones pedidas (``/pool/delete``, ``/pool/force-clear``) para que el
+resto de workers las apliquen en su siguiente sincronización.
+
+La sincronización la hace un hilo en segundo plano por proceso; las lecturas
+de estado solo consultan la última vista publicada en memoria. En la misma
+ronda cada worker publica también los datos registrados con ``share`` (p. ej.
+sus métricas), que los demás leen con ``shared_view``.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# Tipo de fábrica especial que representa "todas" (force-clear)
+ALL_FACTORIES = "*"
+DEFAULT_SYNC_INTERVAL = 0.5
+
+
+class LocalPoolState:
+    """Estado solo local: cada proceso ve únicamente sus propias fábricas."""
+
+    name = "local"
+    shared = False
+    sync_interval = None
+
+    def attach(self, pool):
+        pass
+
+    def request_removal(self, factory_type: str) -> None:
+        pass
+
+    def cluster_view(self):
+        """Lista de ``(pid, segundos desde la publicación, snapshot)`` de los demás workers."""
+        return ()
+
+    def share(self, name: str, producer) -> None:
+        """Publica en cada sincronización el resultado (serializable a JSON) de ``producer()``."""
+        pass
+
+    def shared_view(self, name: str):
+        """Lista de ``(pid, datos)`` publicados con ``share(name, ...)`` por los demás workers."""
+        return ()
+
+    def suspend(self):
+        pass
+
+    def after_fork(self):
+        """Recrea en el proceso hijo lo que no sobrevive a fork() (conexiones, hilos)."""
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLitePoolState(LocalPoolState):
+    """
+    Estado compartido en un archivo SQLite (WAL).
+
+    Cada ``sync_interval`` segundos el proceso aplica las eliminaciones nuevas,
+    publica su snapshot y recarga los de los demás workers, de modo que una
+    eliminación llega a todos en como mucho un intervalo (más la escritura).
+    """
+
+    name = "sqlite"
+    shared = True
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS pool_workers ("
+        " pid INTEGER PRIMARY KEY, updated_at REAL NOT NULL, snapshot TEXT NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS pool_removals ("
+        " factory_type TEXT PRIMARY KEY, epoch INTEGER NOT NULL, requested_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS worker_shared ("
+        " pid INTEGER NOT NULL, name TEXT NOT NULL, updated_at REAL NOT NULL, data TEXT NOT NULL,"
+        " PRIMARY KEY (pid, name))",
+    )
+
+    def __init__(self, path, sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.path = str(path)
+        self.sync_interval = sync_interval
+        # Un worker sin publicar durante este tiempo se considera muerto
+        self.worker_ttl = max(5.0, sync_interval * 10)
+        self._pool = None
+        self._local = threading.local()
+        self._seen = None
+        self._view = ()
+        self._shared = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def attach(self, pool):
+        self._pool = pool
+        self._start()
+
+    def _start(self):
+        self._stop = threading.Event()
+        self._seen = None
+        self._thread = threading.Thread(target=self._run, name="pool-state-sync", daemon=True)
+        self._thread.start()
+
+    def after_fork(self):
+        # Ni la conexión ni el hilo sobreviven a fork(): recrearlos en el hijo
+        self._local = threading.local()
+        self._view = ()
+        if self._pool is not None and not self._closed:
+            self._start()
+
+    def request_removal(self, factory_type: str) -> None:
+        """Anota la eliminación para el resto de workers (la local ya se hizo)."""
+        conn = self._connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO pool_removals (factory_type, epoch, requested_at) VALUES (?, 1, ?) "
+                "ON CONFLICT(factory_type) DO UPDATE SET epoch = epoch + 1, "
+                "requested_at = excluded.requested_at",
+                (factory_type, time.time()),
+            )
+            epoch = conn.execute(
+                "SELECT epoch FROM pool_removals WHERE factory_type = ?", (factory_type,)
+            ).fetchone()[0]
+        # Este proceso ya la aplicó: no volver a aplicarla en la próxima sincronización
+        if self._seen is not None:
+            self._seen[factory_type] = max(self._seen.get(factory_type, 0), epoch)
+
+    def cluster_view(self):
+        return self._view
+
+    def share(self, name: str, producer) -> None:
+        self._shared[name] = producer
+
+    def shared_view(self, name: str):
+        # Se lee al consultar (p. ej. un scrape de /metrics), no en cada sincronización
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT pid, data FROM worker_shared WHERE name = ? AND pid != ? AND updated_at >= ? ORDER BY pid",
+            (name, os.getpid(), time.time() - self.worker_ttl),
+        ).fetchall()
+        return tuple((pid, json.loads(data)) for pid, data in rows)
+
+    def sync(self):
+        """Una ronda de sincronización (la ejecuta el hilo en segundo plano)."""
+        pool = self._pool
+        conn = self._connection()
+        now = time.time()
+
+        removals = conn.execute("SELECT factory_type, epoch, requested_at FROM pool_removals").fetchall()
+        if self._seen is None:
+            # Al arrancar, las eliminaciones anteriores no aplican a este proceso
+            self._seen = {factory_type: epoch for factory_type, epoch, _ in removals}
+        else:
+            for factory_type, epoch, requested_at in removals:
+                if epoch > self._seen.get(factory_type, 0):
+                    self._seen[factory_type] = epoch
+                    pool._apply_removal(None if factory_type == ALL_FACTORIES else factory_type,
+                                        requested_at)
+
+        snapshot = json.dumps(pool._local_snapshot(), ensure_ascii=False)
+        pid = os.getpid()
+        shared = []
+        for name, producer in list(self._shared.items()):
+            try:
+                shared.append((pid, name, now, json.dumps(producer(), ensure_ascii=False)))
+            except Exception:
+                continue  # Un productor que falla no debe detener la sincronización del pool
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pool_workers (pid, updated_at, snapshot) VALUES (?, ?, ?)",
+                (pid, now, snapshot),
+            )
+            conn.execute("DELETE FROM pool_workers WHERE updated_at < ?", (now - self.worker_ttl,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO worker_shared (pid, name, updated_at, data) VALUES (?, ?, ?, ?)", shared)
+            conn.execute("DELETE FROM worker_shared WHERE updated_at < ?", (now - self.worker_ttl,))
+        rows = conn.execute(
+            "SELECT pid, updated_at, snapshot FROM pool_workers WHERE pid != ? ORDER BY pid", (pid,)
+        ).fetchall()
+        # Sustitución atómica de la referencia: los lectores no necesitan lock
+        self._view = tuple((row_pid, round(now - updated, 3), json.loads(data))
+                           for row_pid, updated, data in rows)
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except sqlite3.Error:
+                pass  # Reintentar en la siguiente ronda (p. ej. base de datos ocupada)
+            if self._stop.wait(self.sync_interval):
+                break
+
+    def suspend(self):
+        """
+        Deja de publicar en este proceso (p. ej. el maestro pre-fork, que no
+        atiende peticiones); los procesos hijos lanzados después sí publican.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM pool_workers WHERE pid = ?", (os.getpid(),))
+            conn.execute("DELETE FROM worker_shared WHERE pid = ?", (os.getpid(),))
+        self._view = ()
+
+    def close(self):
+        self._closed = True
+        self.suspend()
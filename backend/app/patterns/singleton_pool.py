@@ -1,54 +1,299 @@
-class FactoryYaExiste(Exception):
-    """Excepción lanzada cuando se intenta crear una fábrica que ya existe en el pool."""
-    pass
+import os
+import threading
+import time
+
+from .pool_state import ALL_FACTORIES, LocalPoolState
+
+
+# Segundos que una fábrica puede permanecer sin uso antes de ser desalojada.
+# ``None`` desactiva el desalojo por inactividad.
+DEFAULT_IDLE_TTL = 600.0
+
+
+class _FactoryEntry:
+    """Registro interno de una fábrica viva dentro del pool."""
+
+    __slots__ = ("factory", "factory_type", "created_at", "created_wall", "last_used", "hits")
+
+    def __init__(self, factory, factory_type):
+        now = time.monotonic()
+        self.factory = factory
+        self.factory_type = factory_type
+        self.created_at = now
+        # Reloj de pared para comparar con eliminaciones pedidas desde otros procesos
+        self.created_wall = time.time()
+        self.last_used = now
+        self.hits = 0
+
+    def info(self):
+        now = time.monotonic()
+        return {
+            "has_factory": True,
+            "factory_type": self.factory_type.__name__,
+            "factory_instance": str(self.factory),
+            "age_seconds": round(now - self.created_at, 3),
+            "idle_seconds": round(now - self.last_used, 3),
+            "hits": self.hits,
+        }
 
 
 class Pool:
+    """
+    Registro singleton de fábricas indexado por tipo.
+
+    Mantiene una fábrica viva por cada clase solicitada, construida de forma
+    perezosa la primera vez que se pide. La construcción de cada tipo se
+    serializa con su propio lock, de modo que peticiones concurrentes para
+    razas distintas no se bloquean entre sí y dos peticiones simultáneas del
+    mismo tipo nunca construyen dos fábricas.
+
+    Las fábricas sin uso durante ``idle_ttl`` segundos se desalojan, y si se
+    define ``max_factories`` se desaloja la menos usada recientemente al
+    superar el límite.
+
+    Con un estado compartido (``pool_state.SQLitePoolState``) el estado y las
+    eliminaciones abarcan todos los workers; ``get_factory`` y las lecturas
+    de estado siguen siendo locales, sin locks entre procesos.
+    """
+
     _instance = None
-    _factory = None
-    _factory_type = None
+    _instance_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(Pool, cls).__new__(cls)
+            with cls._instance_lock:
+                if cls._instance is None:
+                    instance = super(Pool, cls).__new__(cls)
+                    instance._lock = threading.Lock()
+                    instance._build_locks = {}
+                    instance._entries = {}
+                    instance._idle_ttl = DEFAULT_IDLE_TTL
+                    instance._max_factories = None
+                    instance._stats = {"hits": 0, "misses": 0, "evictions": 0}
+                    instance._state = LocalPoolState()
+                    cls._instance = instance
         return cls._instance
-        
+
+    def configure(self, idle_ttl=DEFAULT_IDLE_TTL, max_factories=None, state=None):
+        """
+        Ajusta la política de desalojo del pool.
+
+        Args:
+            idle_ttl: segundos de inactividad antes de desalojar (None = nunca)
+            max_factories: número máximo de fábricas vivas (None = sin límite)
+            state: backend de estado compartido entre workers (None = mantener el actual)
+        """
+        if max_factories is not None and max_factories < 1:
+            raise ValueError("max_factories debe ser al menos 1")
+        with self._lock:
+            self._idle_ttl = idle_ttl
+            self._max_factories = max_factories
+            self._evict_locked(time.monotonic())
+            previous = None
+            if state is not None and state is not self._state:
+                previous, self._state = self._state, state
+        if previous is not None:
+            previous.close()
+            state.attach(self)
+
+    @property
+    def state(self):
+        return self._state
+
     def get_factory(self, factory_class):
-        if self._factory is not None:
-            if self._factory_type != factory_class:
-                raise FactoryYaExiste(f"Ya existe la fabrica {self._factory_type.__name__} elimina la anterior para rear una nueva")
-            return self._factory
-        
-        self._factory = factory_class()
-        self._factory_type = factory_class
-        return self._factory
-    
+        now = time.monotonic()
+        with self._lock:
+            self._evict_locked(now)
+            entry = self._entries.get(factory_class)
+            if entry is not None:
+                entry.last_used = now
+                entry.hits += 1
+                self._stats["hits"] += 1
+                return entry.factory
+            build_lock = self._build_locks.setdefault(factory_class, threading.Lock())
+
+        # Construir fuera del lock global: solo se bloquean peticiones del mismo tipo
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(factory_class)
+                if entry is not None:
+                    entry.last_used = time.monotonic()
+                    entry.hits += 1
+                    self._stats["hits"] += 1
+                    return entry.factory
+
+            factory = factory_class()
+
+            with self._lock:
+                self._stats["misses"] += 1
+                entry = _FactoryEntry(factory, factory_class)
+                entry.hits = 1
+                self._entries[factory_class] = entry
+                self._evict_locked(entry.created_at, keep=factory_class)
+                return factory
+
     def remove_factory(self, factory_class=None):
         """
-        Elimina la fábrica del pool solo si coincide con el tipo especificado.
-        Si no se especifica factory_class, elimina cualquier fábrica.
-        """
-        if factory_class is None:
-            # Sin validación - eliminar cualquier fábrica
-            self._factory = None
-            self._factory_type = None
-            return True
-            
-        if self._factory is None:
-            return False  # No hay fábrica que eliminar
-            
-        if self._factory_type == factory_class:
-            # Solo eliminar si es del mismo tipo
-            self._factory = None
-            self._factory_type = None
-            return True
-        else:
-            return False  # No se puede eliminar una fábrica de diferente tipo
-    
-    def get_current_factory_info(self):
-        """Obtiene información sobre la fábrica actual en el pool"""
+        Elimina la fábrica del tipo indicado del pool.
+        Si no se especifica factory_class, elimina todas las fábricas.
+
+        Returns:
+            True si se eliminó alguna fábrica, False si no había nada que eliminar
+        """
+        with self._lock:
+            if factory_class is None:
+                removed = bool(self._entries)
+                self._entries.clear()
+            else:
+                removed = self._entries.pop(factory_class, None) is not None
+
+        state = self._state
+        if state.shared:
+            # Propagar al resto de workers (la aplican en su próxima sincronización)
+            name = ALL_FACTORIES if factory_class is None else factory_class.__name__
+            removed = removed or any(
+                name == ALL_FACTORIES and snapshot["factories"]
+                or any(f["factory_type"] == name for f in snapshot["factories"])
+                for _, _, snapshot in state.cluster_view()
+            )
+            state.request_removal(name)
+        return removed
+
+    def _apply_removal(self, factory_type=None, requested_at=None):
+        """
+        Aplica una eliminación pedida en otro worker: quita las fábricas de ese
+        tipo (o todas) creadas antes de ``requested_at``.
+        """
+        with self._lock:
+            for cls in list(self._entries):
+                entry = self._entries[cls]
+                if factory_type is not None and cls.__name__ != factory_type:
+                    continue
+                if requested_at is None or entry.created_wall <= requested_at:
+                    del self._entries[cls]
+
+    def _local_snapshot(self):
+        """Estado local serializable que se publica para el resto de workers."""
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            return {
+                "factories": [entry.info() for entry in self._entries.values()],
+                "stats": dict(self._stats),
+            }
+
+    def local_stats(self):
+        """
+        Contadores de este proceso y estadísticas de los pools de objetos de
+        sus fábricas, sin mezclar la vista de otros workers.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            factories = {cls.__name__: entry.factory for cls, entry in self._entries.items()}
         return {
-            "has_factory": self._factory is not None,
-            "factory_type": self._factory_type.__name__ if self._factory_type else None,
-            "factory_instance": str(self._factory) if self._factory else None
-        }
\ No newline at end of file
+            "stats": stats,
+            "factory_count": len(factories),
+            "object_pools": {name: factory.get_pool_stats() for name, factory in factories.items()
+                             if hasattr(factory, "get_pool_stats")},
+        }
+
+    def has_factory(self, factory_class):
+        with self._lock:
+            return factory_class in self._entries
+
+    def get_current_factory_info(self, factory_class=None):
+        """
+        Obtiene información sobre las fábricas del pool.
+
+        Con ``factory_class`` devuelve el estado de ese tipo concreto; sin él
+        devuelve un resumen de todas las fábricas vivas.
+        """
+        # Vista de los demás workers ya publicada en memoria: sin acceso al backend
+        state = self._state
+        others = state.cluster_view()
+
+        with self._lock:
+            self._evict_locked(time.monotonic())
+            if factory_class is not None:
+                entry = self._entries.get(factory_class)
+                if entry is not None:
+                    return entry.info()
+                for pid, _, snapshot in others:
+                    for info in snapshot["factories"]:
+                        if info["factory_type"] == factory_class.__name__:
+                            return dict(info, pid=pid)
+                return {
+                    "has_factory": False,
+                    "factory_type": factory_class.__name__,
+                    "factory_instance": None,
+                }
+
+            factories = [entry.info() for entry in self._entries.values()]
+            stats = dict(self._stats)
+
+        if not state.shared:
+            return {
+                "has_factory": bool(factories),
+                "factory_count": len(factories),
+                "factory_types": [f["factory_type"] for f in factories],
+                "factories": factories,
+                "idle_ttl": self._idle_ttl,
+                "max_factories": self._max_factories,
+                "stats": stats,
+            }
+
+        pid = os.getpid()
+        workers = [{"pid": pid, "age_seconds": 0.0,
+                    "factory_types": [f["factory_type"] for f in factories], "stats": dict(stats)}]
+        factories = [dict(f, pid=pid) for f in factories]
+        for other_pid, age, snapshot in others:
+            workers.append({"pid": other_pid, "age_seconds": age,
+                            "factory_types": [f["factory_type"] for f in snapshot["factories"]],
+                            "stats": snapshot["stats"]})
+            factories.extend(dict(f, pid=other_pid) for f in snapshot["factories"])
+            for key, value in snapshot["stats"].items():
+                stats[key] = stats.get(key, 0) + value
+
+        factory_types = list(dict.fromkeys(f["factory_type"] for f in factories))
+        return {
+            "has_factory": bool(factory_types),
+            "factory_count": len(factory_types),
+            "factory_types": factory_types,
+            "factories": factories,
+            "idle_ttl": self._idle_ttl,
+            "max_factories": self._max_factories,
+            "stats": stats,
+            "state": {"backend": state.name, "sync_interval": state.sync_interval,
+                      "worker_pid": pid, "workers": workers},
+        }
+
+    def _evict_locked(self, now, keep=None):
+        """Desaloja fábricas inactivas o sobrantes. Requiere ``self._lock``."""
+        if self._idle_ttl is not None:
+            expired = [
+                cls for cls, entry in self._entries.items()
+                if cls is not keep and now - entry.last_used > self._idle_ttl
+            ]
+            for cls in expired:
+                del self._entries[cls]
+            self._stats["evictions"] += len(expired)
+
+        if self._max_factories is not None:
+            while len(self._entries) > self._max_factories:
+                candidates = [cls for cls in self._entries if cls is not keep]
+                if not candidates:
+                    break
+                lru = min(candidates, key=lambda cls: self._entries[cls].last_used)
+                del self._entries[lru]
+                self._stats["evictions"] += 1
+
+
+def _after_fork_in_child():
+    # Un único hook por proceso para el estado activo del registro; los
+    # estados sustituidos por otro ``configure`` no se reactivan
+    pool = Pool._instance
+    if pool is not None:
+        pool.state.after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -1,33 +1,78 @@
-from flask import Blueprint, send_from_directory, request, Response
+from flask import Blueprint, current_app, request, Response, send_file, stream_with_context
+from werkzeug.exceptions import NotFound
 import json
+import math
 import time
 from typing import Dict, Type
 import os
 from pathlib import Path
 
-from .factories import FabricarElfos, FabricarEnanos, FabricarHumanos, FabricarOrcos
+from .factories import race_registry
+from .patterns.object_pool import PoolExhausted
 from .patterns.singleton_pool import Pool
-from .utils.image_manager import image_manager
+from .utils import serialization
+from .utils.admission import admission
+from .utils.batch_stream import parse_mix, stream_batch
+from .utils.character_catalog import character_catalog
+from .utils.character_store import MAX_PAGE_SIZE as MAX_STORE_PAGE_SIZE, character_store
+from .utils.coalescing import coalescer
+from .utils.combat import CombatError, SimulationBusyError, simulation_jobs
+from .utils.http_cache import (cache_control_for, etag_for_bytes, is_not_modified,
+                               not_modified_response, send_image, with_validators)
+from .utils.image_manager import UploadTooLarge, image_manager
+from .utils.lifecycle import readiness
+from .utils.metrics import pool_exhausted
+from .utils.population import (
+    PopulationBusyError, PopulationError, PopulationQuotaError, StatModel, available as numpy_available,
+    population_store,
+)
+from .utils.profiling import dump_pstats, format_folded, format_pstats, request_profiler
+from .utils.tracing import span, tracer
+from .utils.sprite_atlas import DEFAULT_CELL, MAX_CELL, available_formats, sprite_renderer
 
 bp = Blueprint("api", __name__, url_prefix="/api")
 
 
-FACTORIES = {
-    "elfos": FabricarElfos,
-    "enanos": FabricarEnanos,
-    "humanos": FabricarHumanos,
-    "orcos": FabricarOrcos,
-}
+# kind -> clase de fábrica; cada raza se compila desde su JSON al usarse por primera vez
+FACTORIES = race_registry
+
+
+_factories_body = None
+
+# Tamaño máximo de página en /images/<category>
+MAX_PAGE_SIZE = 1000
 
 
 @bp.route("/factories", methods=["GET"])
 def list_factories():
-    return make_json_response(list(FACTORIES.keys()))
+    global _factories_body
+    # Cuerpo y ETag calculados una sola vez (se recalculan si cambia FACTORIES)
+    kinds = list(FACTORIES.keys())
+    encoder = serialization.get_json_encoder()
+    if _factories_body is None or _factories_body[0] != kinds or _factories_body[1] is not encoder:
+        payload = encoder.dumps(kinds)
+        _factories_body = (kinds, encoder, payload, etag_for_bytes(payload))
+    _, _, payload, etag = _factories_body
+
+    etag = serialization.variant_etag(etag)
+    cache_control = cache_control_for("api")
+    if is_not_modified(etag):
+        return not_modified_response(etag, cache_control)
+    return with_validators(make_raw_json_response(payload, source=lambda: kinds), etag, cache_control)
+
+
+@bp.route("/ready", methods=["GET"])
+def get_readiness():
+    """Disponibilidad del worker: 200 si acepta tráfico, 503 al arrancar o reciclarse"""
+    state = readiness.snapshot()
+    response = make_json_response(state, status=200 if state["ready"] else 503)
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 
 @bp.route("/pool/status", methods=["GET"])
 def get_pool_status():
-    """Obtiene el estado actual del pool singleton"""
+    """Obtiene el estado actual del pool singleton (todas las fábricas vivas)"""
     pool = Pool()
     return make_json_response(pool.get_current_factory_info())
 
@@ -36,7 +81,7 @@ def get_pool_status():
 def delete_factory_from_pool(kind: str):
     """
     Elimina una fábrica específica del pool singleton.
-    Solo permite eliminar si es la misma fábrica que está actualmente en uso.
+    Solo tiene éxito si esa fábrica está actualmente cargada en el pool.
     """
     kind = kind.lower()
     Factory = FACTORIES.get(kind)
@@ -44,7 +89,7 @@ def delete_factory_from_pool(kind: str):
         return make_json_response({"error": "Fabrica desconocida"}, status=404)
     
     pool = Pool()
-    current_info = pool.get_current_factory_info()
+    current_info = pool.get_current_factory_info(Factory)
     
     # Intentar eliminar la fábrica específica
     success = pool.remove_factory(Factory)
@@ -59,8 +104,8 @@ def delete_factory_from_pool(kind: str):
     else:
         return make_json_response({
             "error": "No se puede eliminar la fábrica",
-            "message": f"La fábrica actual en el pool es '{current_info['factory_type']}', no se puede eliminar '{kind}'",
-            "current_factory": current_info,
+            "message": f"La fábrica '{kind}' no está cargada en el pool",
+            "current_factory": pool.get_current_factory_info(),
             "requested_deletion": kind,
             "success": False
         }, status=400)
@@ -69,20 +114,20 @@ def delete_factory_from_pool(kind: str):
 @bp.route("/pool/force-clear", methods=["DELETE", "POST"])
 def force_clear_pool():
     """
-    Fuerza la eliminación de cualquier fábrica del pool (sin validación de tipo).
+    Fuerza la eliminación de todas las fábricas del pool (sin validación de tipo).
     Usar con cuidado - elimina cualquier fábrica sin importar el tipo.
     """
     pool = Pool()
     current_info = pool.get_current_factory_info()
     
     # Forzar eliminación sin validación
-    pool.remove_factory()  # Sin parámetros = eliminar cualquier fábrica
+    pool.remove_factory()  # Sin parámetros = eliminar todas las fábricas
     
     return make_json_response({
         "message": "Pool limpiado forzadamente",
         "previous_factory": current_info,
         "success": True,
-        "warning": "Se eliminó cualquier fábrica sin validación de tipo"
+        "warning": "Se eliminaron todas las fábricas sin validación de tipo"
     })
 
 
@@ -99,7 +144,7 @@ def create_sample(kind: str):
         delete_param = request.args.get('delete', '').lower()
         if delete_param == 'true':
             pool = Pool()
-            current_info = pool.get_current_factory_info()
+            current_info = pool.get_current_factory_info(Factory)
             
             # Intentar eliminar la fábrica específica
             success = pool.remove_factory(Factory)
@@ -113,53 +158,65 @@ def create_sample(kind: str):
             else:
                 return make_json_response({
                     "error": "No se puede eliminar la fábrica",
-                    "message": f"La fábrica actual en el pool es '{current_info['factory_type']}', no se puede eliminar '{kind}'",
-                    "current_factory": current_info,
+                    "message": f"La fábrica '{kind}' no está cargada en el pool",
+                    "current_factory": pool.get_current_factory_info(),
                     "requested_deletion": kind
                 }, status=400)
 
-        pool = Pool()
+        timeout = request.args.get('timeout', type=float)
+        if timeout is None:
+            # Sin timeout explícito, la espera del pool se limita al plazo de admisión
+            timeout = admission.remaining()
 
-        fabrica = pool.get_factory(Factory)
-        
+        pool = Pool()
 
+        with span("Pool.get_factory", "pool", kind=kind):
+            fabrica = pool.get_factory(Factory)
 
         # Obtener objetos del pool con timeout personalizable
-        cuerpo = fabrica.crear_cuerpo()
-        montura = fabrica.crear_montura()
-        armadura = fabrica.crear_armadura()
-        arma = fabrica.crear_arma()
-
-        # Ejecutar métodos de acción
-        cuerpo.analizar()
-        montura.montar()
-        armadura.equipar()
-        arma.atacar()
-
-        # Obtener información con imágenes
-        personaje_info = {
+        with span("crear_personaje", "factory"):
+            cuerpo, montura, armadura, arma = fabrica.crear_personaje(timeout)
+
+        try:
+            # Ejecutar métodos de acción
+            with span("cuerpo.analizar", "action"):
+                cuerpo.analizar()
+            with span("montura.montar", "action"):
+                montura.montar()
+            with span("armadura.equipar", "action"):
+                armadura.equipar()
+            with span("arma.atacar", "action"):
+                arma.atacar()
+
+            # Información con imágenes precompilada por el catálogo
+            with span("character_catalog.get", "catalog"):
+                race = character_catalog.get(kind, Factory)
+        finally:
+            # Los objetos se devuelven siempre: ninguna petición puede dejarlos prestados
+            with span("devolver_personaje", "factory"):
+                fabrica.devolver_personaje(cuerpo, montura, armadura, arma)
+
+        # Se guarda en segundo plano (write-behind); no retrasa la respuesta
+        character_store.record(kind, race)
+
+        return make_raw_json_response(race.create_body, source=lambda: {
             "status": "created",
             "kind": kind,
-            "character": {
-                "cuerpo": cuerpo.obtener_informacion(),
-                "montura": montura.obtener_informacion(),
-                "armadura": armadura.obtener_informacion(),
-                "arma": arma.obtener_informacion()
-            },
-        }
-
-
-        return make_json_response(personaje_info)
+            "character": race.to_dict(),
+        })
         
-    except RuntimeError as e:
+    except PoolExhausted as e:
+        pool_exhausted.inc((kind,))
         stats = fabrica.get_pool_stats() if 'fabrica' in locals() else {}
-        return make_json_response({
+        response = make_json_response({
             "error": "Pool exhausted",
             "message": str(e),
             "kind": kind,
             "pool_stats": stats,
-            "suggestion": f"Usar /pools/{kind}/clear o esperar a que se devuelvan objetos"
+            "suggestion": f"Usar /api/pool/delete/{kind} o esperar a que se devuelvan objetos"
         }, status=429)  # Too Many Requests
+        response.headers["Retry-After"] = str(admission.retry_after())
+        return response
     except Exception as e:
         return make_json_response({
             "error": "Internal error", 
@@ -168,29 +225,105 @@ def create_sample(kind: str):
         }, status=500)
 
 
+@bp.route("/batch/create", methods=["GET", "POST"])
+def create_batch():
+    """
+    Crea personajes en lote y los transmite como NDJSON (una línea por personaje).
+
+    Parámetros (query o cuerpo JSON):
+        kind: raza única, o
+        mix: mezcla ponderada 'elfos:3,orcos:1'
+        count: número de personajes (máximo BATCH_MAX_COUNT)
+        timeout: segundos de espera por las partes de cada raza
+    """
+    params = dict(request.args)
+    if request.is_json:
+        params.update(request.get_json(silent=True) or {})
+
+    spec = params.get('mix') or params.get('kind')
+    if not spec:
+        return make_json_response({"error": "Se requiere 'kind' o 'mix'"}, status=400)
+
+    try:
+        plan = parse_mix(str(spec), FACTORIES)
+        count = int(params.get('count', 1))
+        timeout = float(params['timeout']) if params.get('timeout') is not None else None
+    except ValueError as e:
+        return make_json_response({"error": "Parámetros inválidos", "message": str(e)}, status=400)
+
+    max_count = current_app.config.get("BATCH_MAX_COUNT", 100000)
+    if not 1 <= count <= max_count:
+        return make_json_response({"error": f"'count' debe estar entre 1 y {max_count}"}, status=400)
+
+    # Con el contexto de la petición vivo hasta que termina (o se corta) el stream
+    return Response(
+        stream_with_context(stream_batch(plan, count, FACTORIES, timeout)),
+        mimetype='application/x-ndjson; charset=utf-8',
+    )
+
+
 @bp.route("/images/<category>", methods=["GET"])
 def list_images(category: str):
     """Lista todas las imágenes de una categoría"""
     if category not in ['characters', 'avatars', 'ui']:
         return make_json_response({"error": "Invalid category"}, status=400)
     
-    images = image_manager.list_images(category)
+    try:
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return make_json_response({"error": "'limit' debe ser un entero"}, status=400)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return make_json_response({"error": f"'limit' debe estar entre 1 y {MAX_PAGE_SIZE}"}, status=400)
+
+    ext = request.args.get('ext')
+    try:
+        page = image_manager.list_images_page(
+            category,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            prefix=request.args.get('prefix'),
+            extensions=ext.split(',') if ext else None,
+            sort=request.args.get('sort', 'name'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+        )
+    except ValueError as e:
+        return make_json_response({"error": str(e)}, status=400)
+
     return make_json_response({
         "category": category,
-        "images": [image_manager.get_web_path(category, img) for img in images]
+        "images": [item["path"] for item in page["items"]],
+        "items": page["items"],
+        "next_cursor": page["next_cursor"],
+        "total": page["total"],
+    })
+
+
+@bp.route("/characters/classes", methods=["GET"])
+def list_character_classes():
+    """Lista las clases de personajes (subcarpetas de characters) desde el índice"""
+    return make_json_response({"classes": image_manager.list_classes()})
+
+
+@bp.route("/characters/classes/<class_name>", methods=["GET"])
+def list_class_characters(class_name: str):
+    """Lista las carpetas de personajes de una clase"""
+    if class_name not in image_manager.list_classes():
+        return make_json_response({"error": f"Clase desconocida: '{class_name}'"}, status=404)
+    return make_json_response({
+        "class": class_name,
+        "characters": image_manager.list_characters(class_name),
     })
 
 
-@bp.route("/images/<category>/<filename>", methods=["GET"])
+@bp.route("/images/<category>/<path:filename>", methods=["GET"])
 def serve_image(category: str, filename: str):
     """Sirve una imagen específica"""
     if category not in ['characters', 'avatars', 'ui']:
         return make_json_response({"error": "Invalid category"}, status=400)
     
     try:
-        image_path = image_manager.get_image_path(category)
-        return send_from_directory(str(image_path), filename)
-    except FileNotFoundError:
+        return send_image(category, filename)
+    except NotFound:
         return make_json_response({"error": "Image not found"}, status=404)
 
 
@@ -214,15 +347,265 @@ def upload_image(category: str):
         return make_json_response({"error": "Invalid file type"}, status=400)
     
     try:
-        web_path = image_manager.save_image(category, file.filename, file.read())
+        # Copia por bloques a un temporal con hash; se guarda por contenido
+        stored = image_manager.save_image_stream(
+            category, file.filename, file.stream,
+            max_bytes=current_app.config["UPLOAD_MAX_BYTES"]
+        )
+        # Las listas de imágenes guardadas con COALESCE_TTL ya no son válidas
+        coalescer.clear()
         return make_json_response({
             "message": "Image uploaded successfully",
-            "path": web_path
+            **stored
         })
+    except UploadTooLarge as e:
+        return make_json_response({"error": str(e)}, status=413)
+    except ValueError as e:
+        return make_json_response({"error": str(e)}, status=400)
     except Exception as e:
         return make_json_response({"error": str(e)}, status=500)
 
 
+@bp.route("/characters", methods=["GET"])
+def list_stored_characters():
+    """Personajes creados y guardados, paginados por cursor (?kind=, since=, until=, limit=, order=)"""
+    if not character_store.enabled:
+        return make_json_response({"error": "Character store disabled"}, status=404)
+    kind = request.args.get('kind')
+    if kind is not None:
+        kind = kind.lower()
+        if kind not in FACTORIES:
+            return make_json_response({"error": "Fabrica desconocida"}, status=404)
+    since, until = request.args.get('since'), request.args.get('until')
+    try:
+        limit = int(request.args.get('limit', 100))
+        since = float(since) if since is not None else None
+        until = float(until) if until is not None else None
+    except ValueError:
+        return make_json_response({
+            "error": "'limit' debe ser un entero y 'since'/'until' instantes en segundos epoch"
+        }, status=400)
+    if any(bound is not None and not math.isfinite(bound) for bound in (since, until)):
+        return make_json_response({"error": "'since' y 'until' deben ser finitos"}, status=400)
+    if not 1 <= limit <= MAX_STORE_PAGE_SIZE:
+        return make_json_response({"error": f"'limit' debe estar entre 1 y {MAX_STORE_PAGE_SIZE}"}, status=400)
+
+    try:
+        page = character_store.query(
+            kind=kind,
+            since=since,
+            until=until,
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            descending=request.args.get('order', 'asc').lower() == 'desc',
+        )
+    except ValueError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    return make_json_response({"kind": kind, **page})
+
+
+@bp.route("/characters/<int:character_id>", methods=["GET"])
+def get_stored_character(character_id: int):
+    """Un personaje guardado por id"""
+    if not character_store.enabled:
+        return make_json_response({"error": "Character store disabled"}, status=404)
+    character = character_store.get(character_id)
+    if character is None:
+        return make_json_response({"error": "Character not found"}, status=404)
+    return make_json_response(character)
+
+
+@bp.route("/characters/stats", methods=["GET"])
+def get_character_store_stats():
+    """Estado del almacén: cola, lotes escritos, descartes y personajes por raza"""
+    if not character_store.enabled:
+        return make_json_response({"error": "Character store disabled"}, status=404)
+    return make_json_response({**character_store.stats(), "counts": character_store.counts()})
+
+
+def _population_unavailable():
+    return make_json_response({
+        "error": "NumPy no disponible",
+        "message": "Instalar numpy para generar y consultar poblaciones"
+    }, status=501)
+
+
+def _load_population(name: str):
+    """Población por nombre, o (None, respuesta de error)."""
+    if not numpy_available():
+        return None, _population_unavailable()
+    try:
+        population = population_store.load(name)
+    except PopulationError as e:
+        return None, make_json_response({"error": str(e)}, status=400)
+    if population is None:
+        return None, make_json_response({"error": "Population not found"}, status=404)
+    return population, None
+
+
+@bp.route("/populations", methods=["GET"])
+def list_populations():
+    """Poblaciones exportadas y modelo de estadísticas de cada raza"""
+    return make_json_response({
+        "available": numpy_available(),
+        "max_count": population_store.max_count,
+        "max_bytes": population_store.max_bytes,
+        "used_bytes": population_store.usage(),
+        "model": StatModel(FACTORIES).describe(),
+        "populations": population_store.list(),
+    })
+
+
+@bp.route("/populations", methods=["POST"])
+def create_population():
+    """Genera una población (?name=, count=, seed=, mix=, overwrite=) y la exporta por columnas"""
+    if not numpy_available():
+        return _population_unavailable()
+    mix = request.args.get('mix')
+    try:
+        count = int(request.args.get('count', 10000))
+        seed = int(request.args.get('seed', 0))
+    except ValueError:
+        return make_json_response({"error": "'count' y 'seed' deben ser enteros"}, status=400)
+    try:
+        plan = parse_mix(mix, FACTORIES) if mix else [(kind, 1) for kind in FACTORIES]
+        factories = {kind: FACTORIES[kind] for kind, _ in plan}
+        meta = population_store.create(
+            request.args.get('name', ''),
+            factories,
+            count,
+            weights=[weight for _, weight in plan],
+            seed=seed,
+            overwrite=request.args.get('overwrite', '').lower() == 'true',
+        )
+    except FileExistsError as e:
+        return make_json_response({"error": "Population already exists", "name": str(e)}, status=409)
+    except PopulationBusyError as e:
+        response = make_json_response({"error": str(e)}, status=429)
+        response.headers["Retry-After"] = "1"
+        return response
+    except PopulationQuotaError as e:
+        return make_json_response({"error": str(e), "max_bytes": population_store.max_bytes}, status=507)
+    except ValueError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    return make_json_response(meta, status=201)
+
+
+@bp.route("/populations/<name>", methods=["GET"])
+def get_population(name: str):
+    """Metadatos de una población exportada"""
+    population, error = _load_population(name)
+    if error is not None:
+        return error
+    return make_json_response(population.meta)
+
+
+@bp.route("/populations/<name>", methods=["DELETE"])
+def delete_population(name: str):
+    """Elimina una población exportada"""
+    try:
+        deleted = population_store.delete(name)
+    except PopulationError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    if not deleted:
+        return make_json_response({"error": "Population not found"}, status=404)
+    return make_json_response({"message": f"Población '{name}' eliminada", "name": name})
+
+
+@bp.route("/populations/<name>/sample", methods=["GET"])
+def sample_population(name: str):
+    """Muestra sin reemplazo en columnas (?n=, seed=, kind=, columns=)"""
+    population, error = _load_population(name)
+    if error is not None:
+        return error
+    try:
+        size = int(request.args.get('n', 100))
+        seed = request.args.get('seed')
+        seed = int(seed) if seed is not None else None
+    except ValueError:
+        return make_json_response({"error": "'n' y 'seed' deben ser enteros"}, status=400)
+    columns = request.args.get('columns')
+    kind = request.args.get('kind')
+    try:
+        sample = population.sample(
+            size,
+            seed=seed,
+            kind=kind.lower() if kind else None,
+            fields=columns.split(',') if columns else None,
+        )
+    except PopulationError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    return make_json_response(sample)
+
+
+@bp.route("/populations/<name>/summary", methods=["GET"])
+def summarize_population(name: str):
+    """Media, desviación, mínimo y máximo por raza y columna (?columns=)"""
+    population, error = _load_population(name)
+    if error is not None:
+        return error
+    columns = request.args.get('columns')
+    try:
+        summary = population.summary(columns.split(',') if columns else None)
+    except PopulationError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    return make_json_response(summary)
+
+
+@bp.route("/simulations", methods=["GET"])
+def list_simulations():
+    """Simulaciones de combate recientes de este worker (sin resultados)"""
+    return make_json_response({
+        "available": numpy_available(),
+        "max_duels": simulation_jobs.max_duels,
+        "max_pending": simulation_jobs.max_pending,
+        "pending": simulation_jobs.pending,
+        "jobs": simulation_jobs.list(),
+    })
+
+
+@bp.route("/simulations", methods=["POST"])
+def create_simulation():
+    """Encola un torneo todos contra todos (?duels=, seed=, kinds=, mirror=); responde 202"""
+    if not numpy_available():
+        return _population_unavailable()
+    try:
+        duels = int(request.args.get('duels', 10000))
+        seed = int(request.args.get('seed', 0))
+    except ValueError:
+        return make_json_response({"error": "'duels' y 'seed' deben ser enteros"}, status=400)
+    kinds = request.args.get('kinds')
+    kinds = [kind.strip().lower() for kind in kinds.split(',')] if kinds else list(FACTORIES)
+    unknown = [kind for kind in kinds if kind not in FACTORIES]
+    if unknown:
+        return make_json_response({"error": "unknown factory", "kinds": unknown}, status=400)
+    try:
+        job = simulation_jobs.submit(
+            {kind: FACTORIES[kind] for kind in dict.fromkeys(kinds)},
+            duels,
+            seed=seed,
+            mirror=request.args.get('mirror', 'true').lower() != 'false',
+        )
+    except SimulationBusyError as e:
+        response = make_json_response({"error": str(e)}, status=429)
+        response.headers["Retry-After"] = "5"
+        return response
+    except CombatError as e:
+        return make_json_response({"error": str(e)}, status=400)
+    response = make_json_response({**job, "url": f"/api/simulations/{job['id']}"}, status=202)
+    response.headers["Location"] = f"/api/simulations/{job['id']}"
+    return response
+
+
+@bp.route("/simulations/<job_id>", methods=["GET"])
+def get_simulation(job_id: str):
+    """Estado de una simulación y, al terminar, sus matrices de resultados"""
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        return make_json_response({"error": "Simulation not found"}, status=404)
+    return make_json_response(job)
+
+
 @bp.route("/character/<kind>/info", methods=["GET"])
 def get_character_info(kind: str):
     """Obtiene información detallada de un personaje usando el pool singleton"""
@@ -231,31 +614,220 @@ def get_character_info(kind: str):
     if not Factory:
         return make_json_response({"error": "unknown factory"}, status=404)
 
+    # La información de las partes sale del catálogo; solo pool_stats es dinámico,
+    # por eso el ETag es débil (contenido semánticamente equivalente)
+    with span("character_catalog.get", "catalog"):
+        race = character_catalog.get(kind, Factory)
+    etag = serialization.variant_etag(race.etag)
+    cache_control = cache_control_for("api")
+    if is_not_modified(etag):
+        return not_modified_response(etag, cache_control, weak=True)
+
     # Usar Singleton - siempre obtenemos la misma instancia
-    fabrica = Factory()
-    cuerpo = fabrica.crear_cuerpo()
-    montura = fabrica.crear_montura()
-    armadura = fabrica.crear_armadura()
-    arma = fabrica.crear_arma()
+    fabrica = Pool().get_factory(Factory)
+    pool_stats = fabrica.get_pool_stats()
+    with span("CompiledRace.info_body", "serialize"):
+        body = race.info_body(pool_stats)
+    response = make_raw_json_response(
+        body,
+        source=lambda: {"kind": kind, **race.to_dict(), "pool_stats": pool_stats},
+    )
+    return with_validators(response, etag, cache_control, weak=True)
+
+def _sprite_params():
+    """
+    Valida ?format= y ?cell= de las rutas de sprites; devuelve (fmt, cell) o
+    una respuesta de error. Sin Pillow no hay formatos y ``fmt`` es None.
+    """
+    formats = available_formats()
+    fmt = request.args.get('format') or (formats[0] if formats else None)
+    if fmt is not None and fmt not in formats:
+        return None, make_json_response({
+            "error": "Formato no disponible",
+            "available_formats": formats
+        }, status=400)
+    cell = request.args.get('cell', DEFAULT_CELL, type=int)
+    if not 16 <= cell <= MAX_CELL:
+        return None, make_json_response({"error": f"'cell' debe estar entre 16 y {MAX_CELL}"}, status=400)
+    return (fmt, cell), None
+
+
+@bp.route("/character/<kind>/sprite", methods=["GET"])
+def get_character_sprite(kind: str):
+    """Devuelve las cuatro imágenes del personaje compuestas en un único atlas 2x2"""
+    kind = kind.lower()
+    Factory = FACTORIES.get(kind)
+    if not Factory:
+        return make_json_response({"error": "unknown factory"}, status=404)
+    params, error = _sprite_params()
+    if error is not None:
+        return error
+    fmt, cell = params
+    if fmt is None:
+        # Sin Pillow no se compone el atlas: el cliente pide las imágenes por separado
+        layout = sprite_renderer.layout(kind, Factory, cell)
+        return make_json_response({
+            "error": "Pillow no disponible",
+            "message": "Instalar Pillow para componer el atlas; usar las imágenes de 'sources'",
+            "sources": {parte: frame["source"] for parte, frame in layout["frames"].items()},
+        }, status=501)
+
+    # El ETag es la clave del render (formato, celda y tamaño/mtime de las fuentes)
+    etag = sprite_renderer.key(kind, Factory, fmt, cell)
+    cache_control = cache_control_for("characters")
+    if is_not_modified(etag):
+        return not_modified_response(etag, cache_control)
+
+    sprite = sprite_renderer.render(kind, Factory, fmt, cell)
+    response = Response(sprite.body, mimetype=sprite.mimetype)
+    return with_validators(response, sprite.key, cache_control)
+
+
+@bp.route("/character/<kind>/sprite/map", methods=["GET"])
+def get_character_sprite_map(kind: str):
+    """Mapa de coordenadas del atlas de /character/<kind>/sprite"""
+    kind = kind.lower()
+    Factory = FACTORIES.get(kind)
+    if not Factory:
+        return make_json_response({"error": "unknown factory"}, status=404)
+    params, error = _sprite_params()
+    if error is not None:
+        return error
+    fmt, cell = params
 
-    character_info = {
+    layout = sprite_renderer.layout(kind, Factory, cell)
+    return make_json_response({
         "kind": kind,
-        "cuerpo": cuerpo.obtener_informacion(),
-        "montura": montura.obtener_informacion(),
-        "armadura": armadura.obtener_informacion(),
-        "arma": arma.obtener_informacion(),
-        "pool_stats": fabrica.get_pool_stats()
-    }
+        "format": fmt,
+        "url": f"/api/character/{kind}/sprite?format={fmt}&cell={cell}" if fmt else None,
+        **layout
+    })
+
 
-    # Devolver objetos al pool para reutilización
-    fabrica.devolver_cuerpo(cuerpo)
-    fabrica.devolver_montura(montura) 
-    fabrica.devolver_armadura(armadura)
-    fabrica.devolver_arma(arma)
+def _profiles_forbidden():
+    """Las rutas de perfiles exigen la cabecera de confianza; sin token configurado no existen."""
+    if not request_profiler.token:
+        return make_json_response({"error": "Perfilado no configurado (PROFILE_TOKEN)"}, status=404)
+    if not request_profiler.trusted():
+        return make_json_response({"error": "Token de perfilado inválido"}, status=403)
+    return None
+
+
+def _select_profiles():
+    """Perfiles filtrados por ?names=, ?mode=, ?route= y ?limit= (más recientes primero)."""
+    profiles = request_profiler.store.list()
+    names = request.args.get('names')
+    if names:
+        wanted = set(names.split(','))
+        profiles = [p for p in profiles if p["name"] in wanted]
+    mode = request.args.get('mode')
+    if mode:
+        profiles = [p for p in profiles if p["mode"] == mode]
+    route = request.args.get('route')
+    if route:
+        profiles = [p for p in profiles if route in p["route"]]
+    limit = request.args.get('limit', type=int)
+    return profiles[:limit] if limit else profiles
+
+
+@bp.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """Perfiles guardados en este host (todos los workers comparten el directorio)"""
+    forbidden = _profiles_forbidden()
+    if forbidden is not None:
+        return forbidden
+    profiles = _select_profiles()
+    store = request_profiler.store
+    response = make_json_response({
+        "directory": str(store.directory),
+        "max_bytes": store.max_bytes,
+        "sample_rate": request_profiler.sample_rate,
+        "mode": request_profiler.mode,
+        "total_bytes": sum(p["size"] for p in profiles),
+        "profiles": profiles,
+    })
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@bp.route("/admin/profiles/merge", methods=["GET"])
+def merge_profiles():
+    """Combina los perfiles seleccionados: texto pstats, binario pstats (?format=pstats) o pilas colapsadas"""
+    forbidden = _profiles_forbidden()
+    if forbidden is not None:
+        return forbidden
+    mode = request.args.get('mode', 'cprofile')
+    if mode not in ('cprofile', 'stack'):
+        return make_json_response({"error": "Modo inválido", "modes": ["cprofile", "stack"]}, status=400)
+    names = [p["name"] for p in _select_profiles() if p["mode"] == mode]
+    merged = request_profiler.store.merge(names, mode)
+    if merged is None:
+        return make_json_response({"error": "No hay perfiles que combinar", "mode": mode}, status=404)
+
+    headers = {"Cache-Control": "no-store", "X-Profile-Count": str(len(names))}
+    if mode == 'stack':
+        return Response(format_folded(merged), mimetype="text/plain", headers=headers)
+    if request.args.get('format') == 'pstats':
+        headers["Content-Disposition"] = "attachment; filename=merged.prof"
+        return Response(dump_pstats(merged), mimetype="application/octet-stream", headers=headers)
+    sort = request.args.get('sort', 'cumulative')
+    try:
+        text = format_pstats(merged, sort=sort, limit=request.args.get('top', 50, type=int))
+    except KeyError:
+        return make_json_response({"error": f"Orden inválido: '{sort}'"}, status=400)
+    return Response(text, mimetype="text/plain", headers=headers)
+
+
+@bp.route("/admin/profiles/<name>", methods=["GET"])
+def download_profile(name: str):
+    """Descarga un perfil (.prof para pstats/snakeviz, .folded para flamegraph)"""
+    forbidden = _profiles_forbidden()
+    if forbidden is not None:
+        return forbidden
+    path = request_profiler.store.path(name)
+    if path is None:
+        return make_json_response({"error": "Perfil no encontrado"}, status=404)
+    mimetype = "text/plain" if path.suffix == ".folded" else "application/octet-stream"
+    response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=name, etag=False)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@bp.route("/debug/traces", methods=["GET"])
+def get_traces():
+    """Trazas recientes de este worker en formato Chrome trace-event (chrome://tracing, Perfetto)"""
+    if not tracer.enabled:
+        return make_json_response({"error": "Trazado desactivado (TRACE_ENABLED)"}, status=404)
+    traces = tracer.recent(
+        limit=request.args.get('limit', type=int),
+        route=request.args.get('route'),
+        min_ms=request.args.get('min_ms', type=float),
+    )
+    response = make_json_response(tracer.to_chrome(traces))
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
-    return make_json_response(character_info)
 
 def make_json_response(obj, status=200):
-    """Serialize to JSON preserving unicode and ordering, set charset utf-8."""
-    payload = json.dumps(obj, ensure_ascii=False, sort_keys=False)
-    return Response(payload, status=status, mimetype='application/json; charset=utf-8')
+    """Serializa según Accept (JSON, MessagePack o CBOR) aplicando ``?fields=``.
+
+    En JSON se conserva unicode y el orden de las claves, con charset utf-8.
+    """
+    with span("serialization.encode", "serialize"):
+        payload, mimetype = serialization.encode(obj, status)
+    response = Response(payload, status=status, mimetype=mimetype)
+    response.vary.add('Accept')
+    return response
+
+
+def make_raw_json_response(payload: bytes, status=200, source=None):
+    """Respuesta JSON a partir de bytes ya codificados (p. ej. del catálogo).
+
+    Si la petición pide otro formato o una proyección, ``source()`` devuelve
+    el objeto equivalente y se serializa con ``make_json_response``.
+    """
+    if source is not None and serialization.needs_object():
+        return make_json_response(source(), status)
+    response = Response(payload, status=status, mimetype=serialization.JSON_MIMETYPE)
+    response.vary.add('Accept')
+    return response
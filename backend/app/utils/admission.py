@@ -0,0 +1,366 @@
+"""Control de admisión para las rutas de creación y de personajes.
+
+Delante de ``/api/create/<kind>`` y ``/api/character/<kind>/*``:
+
+- **Cubeta de tokens por cliente** (``ADMISSION_RATE``/``ADMISSION_BURST``):
+  un cliente que supera su ritmo recibe 429 con ``Retry-After`` hasta el
+  siguiente token, sin ocupar plazas ni cola.
+- **Plazas concurrentes** (``ADMISSION_MAX_CONCURRENT``): las peticiones
+  admitidas se atienden a la vez; el resto espera en una cola acotada.
+- **Cola con plazos**: cada petición espera como mucho hasta su plazo
+  (``X-Request-Deadline`` en ms, limitado por ``ADMISSION_MAX_WAIT``). Dentro
+  de una raza sale primero el plazo más cercano; entre razas las plazas se
+  reparten por turnos, así que una raza saturada no deja sin servicio a las
+  demás. Si la espera estimada ya no cabe en el plazo, se rechaza al llegar.
+- **Rechazos con ``Retry-After``**: 503 con la espera estimada a partir de
+  la profundidad de la cola y del tiempo medio de servicio.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import Response, g, request
+
+from . import serialization
+from .metrics import admission_requests, admission_wait, metrics
+from .tracing import span
+
+
+DEFAULT_MAX_CONCURRENT = 4
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_MAX_WAIT = 1.0
+DEFAULT_MAX_CLIENTS = 10000
+DEFAULT_DEADLINE_HEADER = "X-Request-Deadline"
+
+# Tiempo de servicio supuesto hasta tener medidas (segundos) y peso de cada medida
+INITIAL_SERVICE_TIME = 0.005
+SERVICE_TIME_ALPHA = 0.2
+
+ADMITTED_ENDPOINTS = frozenset({
+    "api.create_sample",
+    "api.get_character_info",
+    "api.get_character_sprite",
+    "api.get_character_sprite_map",
+})
+
+# Raza con la que se agrupan en la cola los kinds que no existen
+UNKNOWN_KIND = "unknown"
+
+
+class Rejected(Exception):
+    """Petición no admitida: estado HTTP, motivo y segundos de ``Retry-After``."""
+
+    def __init__(self, status: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """Consume un token; devuelve 0 o los segundos hasta que haya uno."""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / rate
+
+
+class ClientBuckets:
+    """Cubetas por cliente, con las menos recientes descartadas al superar ``max_clients``."""
+
+    def __init__(self, rate: float = None, burst: float = None, max_clients: int = DEFAULT_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate or 0)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, client: str) -> float:
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.burst, now)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.take(self.rate, self.burst, now)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class _Waiter:
+    __slots__ = ("kind", "deadline", "event", "state")
+
+    def __init__(self, kind: str, deadline: float):
+        self.kind = kind
+        self.deadline = deadline
+        self.event = threading.Event()
+        # waiting -> granted | expired, siempre bajo el lock del controlador
+        self.state = "waiting"
+
+
+class AdmissionController:
+    """Plazas concurrentes con cola acotada por raza, reparto por turnos y plazos."""
+
+    def __init__(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, max_wait: float = DEFAULT_MAX_WAIT):
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self.configure(max_concurrent, queue_size, max_wait)
+
+    def configure(self, max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                  queue_size: int = DEFAULT_QUEUE_SIZE, max_wait: float = DEFAULT_MAX_WAIT):
+        if max_concurrent < 1 or queue_size < 0:
+            raise ValueError("'max_concurrent' debe ser al menos 1 y 'queue_size' no negativo")
+        with self._lock:
+            self.max_concurrent = max_concurrent
+            self.queue_size = queue_size
+            self.max_wait = max_wait
+            self.in_flight = 0
+            self.queued = 0
+            self.service_time = INITIAL_SERVICE_TIME
+            # kind -> heap de (plazo, secuencia, waiter); turno de las razas con espera
+            self._queues = {}
+            self._turns = deque()
+
+    def retry_after(self, depth: int = None) -> int:
+        """Segundos estimados hasta que una petición nueva obtendría plaza (mínimo 1)."""
+        if depth is None:
+            depth = self.queued
+        return max(1, math.ceil((depth + 1) * self.service_time / self.max_concurrent))
+
+    def acquire(self, kind: str, deadline: float) -> float:
+        """
+        Obtiene una plaza antes de ``deadline`` (``time.monotonic``) y devuelve
+        los segundos esperados. Lanza ``Rejected`` si la cola está llena o el
+        plazo no se puede cumplir.
+        """
+        start = time.monotonic()
+        with self._lock:
+            if self.in_flight < self.max_concurrent and not self.queued:
+                self.in_flight += 1
+                return 0.0
+            if self.queued >= self.queue_size:
+                raise Rejected(503, "queue_full", self.retry_after())
+            estimated = (self.queued + 1) * self.service_time / self.max_concurrent
+            if start + estimated > deadline:
+                raise Rejected(503, "deadline", self.retry_after())
+            waiter = _Waiter(kind, deadline)
+            queue = self._queues.get(kind)
+            if queue is None:
+                queue = self._queues[kind] = []
+                self._turns.append(kind)
+            heapq.heappush(queue, (deadline, next(self._seq), waiter))
+            self.queued += 1
+
+        waiter.event.wait(max(0.0, deadline - start))
+        with self._lock:
+            if waiter.state == "granted":
+                return time.monotonic() - start
+            if waiter.state == "waiting":
+                # El waiter queda en el heap; _next lo descarta al encontrarlo
+                waiter.state = "expired"
+                self.queued -= 1
+            raise Rejected(503, "deadline", self.retry_after())
+
+    def release(self, service_time: float = None):
+        """Libera una plaza y la cede al siguiente waiter según turno y plazo."""
+        with self._lock:
+            self.in_flight -= 1
+            if service_time is not None:
+                self.service_time += SERVICE_TIME_ALPHA * (service_time - self.service_time)
+            now = time.monotonic()
+            while self.in_flight < self.max_concurrent:
+                waiter = self._next(now)
+                if waiter is None:
+                    break
+                waiter.state = "granted"
+                self.queued -= 1
+                self.in_flight += 1
+                waiter.event.set()
+
+    def _next(self, now: float):
+        """Siguiente waiter vivo: la raza del turno cede su plazo más cercano y pasa al final."""
+        while self._turns:
+            kind = self._turns.popleft()
+            queue = self._queues[kind]
+            waiter = None
+            while queue:
+                _, _, candidate = heapq.heappop(queue)
+                if candidate.state != "waiting":
+                    continue
+                if candidate.deadline <= now:
+                    candidate.state = "expired"
+                    self.queued -= 1
+                    candidate.event.set()
+                    continue
+                waiter = candidate
+                break
+            if queue:
+                self._turns.append(kind)
+            else:
+                del self._queues[kind]
+            if waiter is not None:
+                return waiter
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "queue_size": self.queue_size,
+                "service_time": self.service_time,
+                "queued_by_kind": {
+                    kind: depth for kind, depth in (
+                        (kind, sum(1 for _, _, w in queue if w.state == "waiting"))
+                        for kind, queue in self._queues.items()
+                    ) if depth
+                },
+            }
+
+
+class Admission:
+    """Aplica cubetas por cliente y el controlador de plazas como hooks de Flask."""
+
+    def __init__(self):
+        self.enabled = False
+        self.controller = AdmissionController()
+        self.clients = ClientBuckets()
+        self.client_header = None
+        self.deadline_header = DEFAULT_DEADLINE_HEADER
+
+    def client_id(self) -> str:
+        if self.client_header:
+            client = request.headers.get(self.client_header)
+            if client:
+                return client
+        return request.remote_addr or "-"
+
+    def _deadline(self, now: float) -> float:
+        budget = self.controller.max_wait
+        requested = request.headers.get(self.deadline_header, type=float)
+        if requested is not None and requested >= 0:
+            budget = min(budget, requested / 1000.0)
+        return now + budget
+
+    def remaining(self):
+        """Segundos que quedan del plazo de la petición en curso (None si no se admitió aquí)."""
+        deadline = g.get("_admission_deadline")
+        if deadline is None:
+            return None
+        return max(0.0, deadline - time.monotonic())
+
+    def retry_after(self) -> int:
+        return self.controller.retry_after()
+
+    def _kind(self) -> str:
+        from ..factories import race_registry
+
+        kind = (request.view_args or {}).get("kind", "").lower()
+        return kind if kind in race_registry else UNKNOWN_KIND
+
+    def _reject(self, kind: str, error: Rejected):
+        admission_requests.inc((kind, error.reason))
+        payload, mimetype = serialization.encode({
+            "error": "Too many requests" if error.status == 429 else "Service overloaded",
+            "reason": error.reason,
+            "kind": kind,
+            "retry_after": error.retry_after,
+        }, error.status)
+        response = Response(payload, status=error.status, mimetype=mimetype)
+        response.headers["Retry-After"] = str(error.retry_after)
+        response.vary.add("Accept")
+        return response
+
+    def _charge_client(self):
+        # Se registra antes que la agrupación: también paga quien se agrupa o sale de la caché
+        if request.endpoint not in ADMITTED_ENDPOINTS:
+            return None
+        wait = self.clients.take(self.client_id())
+        if wait:
+            return self._reject(self._kind(), Rejected(429, "rate_limited", max(1, math.ceil(wait))))
+        return None
+
+    def _acquire_slot(self):
+        # Se registra después de la agrupación: solo ocupa plaza quien calcula la respuesta
+        if request.endpoint not in ADMITTED_ENDPOINTS:
+            return None
+        kind = self._kind()
+        now = time.monotonic()
+        deadline = self._deadline(now)
+        try:
+            with span("admission.acquire", "admission", kind=kind):
+                waited = self.controller.acquire(kind, deadline)
+        except Rejected as error:
+            return self._reject(kind, error)
+        admission_requests.inc((kind, "queued" if waited else "admitted"))
+        admission_wait.observe((kind,), waited)
+        g._admission_deadline = deadline
+        g._admission_start = time.monotonic()
+        return None
+
+    def _teardown_request(self, exc):
+        start = g.pop("_admission_start", None)
+        if start is not None:
+            self.controller.release(time.monotonic() - start)
+
+    def _collector(self):
+        state = self.controller.snapshot()
+        yield ("fabrica_admission_in_flight", "gauge", "Peticiones admitidas en curso.",
+               [({}, state["in_flight"])])
+        yield ("fabrica_admission_concurrency_limit", "gauge", "Plazas concurrentes del control de admisión.",
+               [({}, state["max_concurrent"])])
+        yield ("fabrica_admission_queue_depth", "gauge", "Peticiones esperando plaza por raza.",
+               [({"kind": kind}, depth) for kind, depth in sorted(state["queued_by_kind"].items())])
+        yield ("fabrica_admission_clients", "gauge", "Clientes con cubeta de tokens en memoria.",
+               [({}, len(self.clients))])
+
+    def install(self, app):
+        """
+        Configura la admisión desde ``app.config`` y, si está activa, registra
+        el cobro de las cubetas por cliente. Las plazas se registran aparte con
+        ``install_slots`` para poder intercalar la agrupación entre ambas fases.
+        """
+        config = app.config
+        self.enabled = bool(config["ADMISSION_ENABLED"])
+        self.controller.configure(
+            max_concurrent=config["ADMISSION_MAX_CONCURRENT"],
+            queue_size=config["ADMISSION_QUEUE_SIZE"],
+            max_wait=config["ADMISSION_MAX_WAIT"],
+        )
+        self.clients = ClientBuckets(config["ADMISSION_RATE"], config["ADMISSION_BURST"],
+                                     max_clients=config["ADMISSION_MAX_CLIENTS"])
+        self.client_header = config["ADMISSION_CLIENT_HEADER"]
+        self.deadline_header = config["ADMISSION_DEADLINE_HEADER"]
+        if self.enabled:
+            app.before_request(self._charge_client)
+
+    def install_slots(self, app):
+        """Registra la fase de plazas y cola (tras ``install`` y la agrupación)."""
+        if self.enabled:
+            app.before_request(self._acquire_slot)
+            app.teardown_request(self._teardown_request)
+            metrics.register_collector(self._collector)
+
+
+# Instancia global
+admission = Admission()
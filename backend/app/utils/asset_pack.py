@@ -0,0 +1,283 @@
+"""Paquetes de assets: todas las imágenes de una categoría en un único archivo mmap.
+
+Construcción (paso de build):
+
+    python -m backend.app.utils.asset_pack build [categoria ...]
+
+Formato del paquete::
+
+    MAGIC (8 bytes) | longitud del índice (uint64 LE) | índice JSON | datos
+
+El índice asocia cada ruta relativa a ``[offset, longitud, mtime, sha256]``.
+Los offsets son relativos al inicio de los datos, que empiezan en la primera
+página tras el índice.
+"""
+import hashlib
+import json
+import mimetypes
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .image_manager import image_manager
+
+
+MAGIC = b"FPACK01\0"
+_HEADER = struct.Struct("<8sQ")
+# Alineación de cada archivo dentro del paquete (páginas para sendfile/mmap)
+_ALIGN = 4096
+# Tamaño de los bloques al copiar archivos al paquete
+_CHUNK = 1024 * 1024
+
+
+def _data_start(header_len: int) -> int:
+    start = _HEADER.size + header_len
+    return start + (-start % _ALIGN)
+
+
+def default_pack_dir() -> Path:
+    return image_manager.project_root / "build" / "asset-packs"
+
+
+def pack_path(category: str, pack_dir=None) -> Path:
+    return Path(pack_dir or default_pack_dir()) / f"{category}.pack"
+
+
+def build_pack(category: str, pack_dir=None) -> Path:
+    """
+    Empaqueta todos los archivos de ``category`` en un solo archivo.
+
+    El paquete se escribe en un temporal y se renombra de forma atómica, así
+    que los workers que tengan mapeado el anterior no se ven afectados.
+
+    Cada archivo se copia por bloques (calculando su SHA-256 al vuelo) a un
+    temporal de datos, porque el índice va delante y su longitud no se
+    conoce hasta el final; después se vuelca ese temporal tras el índice.
+    La memoria usada no depende del tamaño de la categoría.
+    """
+    image_manager.invalidate(category)
+    base = image_manager.get_image_path(category)
+    files = sorted(image_manager.indexed_files(category))
+
+    target = pack_path(category, pack_dir)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryFile(dir=str(target.parent)) as data_file:
+        entries = {}
+        offset = end = 0
+        for rel in files:
+            try:
+                with open(base / rel, "rb") as src:
+                    mtime = os.fstat(src.fileno()).st_mtime
+                    digest = hashlib.sha256()
+                    length = 0
+                    data_file.seek(offset)
+                    while True:
+                        chunk = src.read(_CHUNK)
+                        if not chunk:
+                            break
+                        digest.update(chunk)
+                        data_file.write(chunk)
+                        length += len(chunk)
+            except OSError:
+                continue
+            entries[rel] = [offset, length, mtime, digest.hexdigest()]
+            end = offset + length
+            offset = end + (-length % _ALIGN)
+        # Descarta lo escrito por un archivo que falló a medio copiar
+        data_file.truncate(end)
+
+        header = json.dumps({"category": category, "created": time.time(), "entries": entries}).encode("utf-8")
+        data_start = _data_start(len(header))
+
+        fd, tmp = tempfile.mkstemp(dir=str(target.parent), prefix=f".{category}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, len(header)))
+                f.write(header)
+                f.seek(data_start)
+                data_file.seek(0)
+                shutil.copyfileobj(data_file, f, _CHUNK)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    return target
+
+
+class AssetPack:
+    """Paquete de una categoría mapeado en memoria (compartido entre workers vía page cache)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} no es un paquete de assets válido")
+        header = json.loads(self._mmap[_HEADER.size:_HEADER.size + header_len])
+        self.category = header["category"]
+        self.created = header["created"]
+        data_start = _data_start(header_len)
+        self.entries = {
+            rel: (data_start + offset, length, mtime, sha)
+            for rel, (offset, length, mtime, sha) in header["entries"].items()
+        }
+        self._view = memoryview(self._mmap)
+
+    def lookup(self, rel: str, loose_size: int = None, loose_mtime: float = None):
+        """
+        Devuelve la entrada ``(offset, longitud, mtime, sha256)`` de ``rel``, o
+        None si no está en el paquete o si el archivo suelto cambió (tamaño o
+        mtime distintos de los empaquetados).
+
+        ``loose_size``/``loose_mtime`` deben venir de un ``stat`` reciente del
+        archivo suelto, no del índice de imágenes.
+        """
+        entry = self.entries.get(rel)
+        if entry is None:
+            return None
+        if (loose_size is not None and loose_size != entry[1]) or (
+                loose_mtime is not None and loose_mtime != entry[2]):
+            return None
+        return entry
+
+    def view(self, entry) -> memoryview:
+        """Slice sin copia del contenido de una entrada."""
+        offset, length = entry[0], entry[1]
+        return self._view[offset:offset + length]
+
+    def close(self):
+        # Si aún hay slices en uso el mapeo se libera cuando los recoja el GC
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+class AssetPackRegistry:
+    """Paquetes cargados por categoría."""
+
+    def __init__(self):
+        self._packs = {}
+        self._lock = threading.Lock()
+
+    def load(self, categories=None, pack_dir=None) -> list:
+        """Mapea los paquetes existentes; devuelve las categorías cargadas."""
+        loaded = []
+        for category in categories or image_manager.categories():
+            path = pack_path(category, pack_dir)
+            if not path.exists():
+                continue
+            pack = AssetPack(path)
+            with self._lock:
+                previous = self._packs.get(category)
+                self._packs[category] = pack
+            if previous is not None:
+                previous.close()
+            loaded.append(category)
+        return loaded
+
+    def get(self, category: str):
+        return self._packs.get(category)
+
+    def unload(self):
+        with self._lock:
+            packs, self._packs = self._packs, {}
+        for pack in packs.values():
+            pack.close()
+
+
+class _BoundedFile:
+    """
+    Archivo limitado a ``length`` bytes desde su posición actual.
+
+    ``read`` se detiene al final de la entrada aunque el paquete siga, y
+    ``fileno`` se conserva para los servidores que usan ``os.sendfile`` desde
+    la posición del descriptor con Content-Length (gunicorn).
+    """
+
+    def __init__(self, f, length: int):
+        self._file = f
+        self._remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size) if size else b""
+        self._remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+
+class PackSlice:
+    """
+    Cuerpo WSGI para una entrada del paquete.
+
+    Con ``wsgi.file_wrapper`` se entrega un descriptor posicionado en el
+    offset y limitado a la longitud de la entrada, para que el servidor use
+    ``os.sendfile``. Si no, se itera en bloques como memoryview o como bytes
+    según ``as_bytes``.
+    """
+
+    CHUNK = 256 * 1024
+
+    def __init__(self, pack: AssetPack, entry, as_bytes: bool = True):
+        self.pack = pack
+        self.entry = entry
+        self.as_bytes = as_bytes
+
+    def file_wrapper(self, environ):
+        wrapper = environ.get("wsgi.file_wrapper")
+        if wrapper is None:
+            return None
+        # Sin buffer: la posición del descriptor es exactamente el offset de la entrada
+        f = open(self.pack.path, "rb", buffering=0)
+        f.seek(self.entry[0])
+        return wrapper(_BoundedFile(f, self.entry[1]), self.CHUNK)
+
+    def __iter__(self):
+        view = self.pack.view(self.entry)
+        for start in range(0, len(view), self.CHUNK):
+            chunk = view[start:start + self.CHUNK]
+            yield bytes(chunk) if self.as_bytes else chunk
+
+
+def guess_mimetype(rel: str) -> str:
+    return mimetypes.guess_type(rel)[0] or "application/octet-stream"
+
+
+# Instancia global
+asset_packs = AssetPackRegistry()
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] != "build":
+        print("Uso: python -m backend.app.utils.asset_pack build [categoria ...]")
+        return 2
+    for category in argv[1:] or image_manager.categories():
+        if not image_manager.get_image_path(category).exists():
+            continue
+        path = build_pack(category)
+        pack = AssetPack(path)
+        print(f"{category}: {len(pack.entries)} archivos -> {path}")
+        pack.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
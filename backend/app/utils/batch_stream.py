@@ -0,0 +1,142 @@
+from ..patterns.singleton_pool import Pool
+from .character_catalog import character_catalog
+from .serialization import dumps_json, get_json_encoder
+
+
+# Líneas NDJSON agrupadas por cada escritura al socket
+DEFAULT_CHUNK_LINES = 256
+# Máximo de mensajes de error distintos que se reportan en el resumen
+MAX_ERROR_KINDS = 20
+
+
+def parse_mix(spec: str, factories: dict) -> list:
+    """
+    Interpreta una mezcla ponderada de razas.
+
+    Args:
+        spec: cadena 'elfos:3,orcos:1' (el peso por defecto es 1)
+        factories: mapa kind -> clase de fábrica válido
+
+    Returns:
+        lista de (kind, peso) con pesos enteros positivos
+
+    Raises:
+        ValueError: si alguna raza es desconocida o algún peso no es válido
+    """
+    plan = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        kind, _, weight = item.partition(":")
+        kind = kind.strip().lower()
+        if kind not in factories:
+            raise ValueError(f"Fabrica desconocida: '{kind}'")
+        try:
+            weight = int(weight) if weight.strip() else 1
+        except ValueError:
+            raise ValueError(f"Peso inválido para '{kind}': '{weight}'")
+        if weight < 1:
+            raise ValueError(f"El peso de '{kind}' debe ser positivo")
+        plan.append((kind, weight))
+    if not plan:
+        raise ValueError("La mezcla de razas está vacía")
+    return plan
+
+
+def _weighted_round_robin(plan: list):
+    """
+    Reparto ponderado suave (como el de nginx): determinista, sin aleatoriedad
+    y con memoria constante independientemente del número de elementos.
+    """
+    total = sum(weight for _, weight in plan)
+    current = [0] * len(plan)
+    while True:
+        best = 0
+        for i, (_, weight) in enumerate(plan):
+            current[i] += weight
+            if current[i] > current[best]:
+                best = i
+        current[best] -= total
+        yield plan[best][0]
+
+
+def _encode(obj) -> bytes:
+    return dumps_json(obj)
+
+
+def stream_batch(plan: list, count: int, factories: dict, timeout: float = None,
+                 chunk_lines: int = DEFAULT_CHUNK_LINES):
+    """
+    Generador de personajes en formato NDJSON.
+
+    Cada raza obtiene su fábrica y su representación del catálogo una sola
+    vez para todo el lote; las partes se piden al pool y se devuelven en cada
+    personaje, así que entre escrituras al socket (un cliente lento) el lote
+    no retiene objetos. Si una raza no consigue sus partes antes de
+    ``timeout`` no se reintenta en el resto del lote. La última línea es un
+    resumen con los personajes creados y fallidos por raza.
+    """
+    encoder = get_json_encoder()
+    sep, colon = encoder.item_separator, encoder.key_separator
+    recursos = {}
+    fallidas = {}
+    by_kind = {kind: {"created": 0, "failed": 0} for kind, _ in plan}
+    errores = {}
+    created = failed = 0
+    chunk = []
+
+    kinds = _weighted_round_robin(plan)
+    for index in range(count):
+        kind = next(kinds)
+        try:
+            # No reintentar (ni esperar otro timeout) una raza que ya falló
+            if kind in fallidas:
+                raise fallidas[kind]
+            try:
+                recurso = recursos.get(kind)
+                if recurso is None:
+                    Factory = factories[kind]
+                    fabrica = Pool().get_factory(Factory)
+                    prefijo = (b'"status"' + colon + b'"created"' + sep + b'"kind"' + colon + _encode(kind)
+                               + sep + b'"character"' + colon)
+                    recurso = recursos[kind] = (fabrica, prefijo + character_catalog.get(kind, Factory).character_json)
+                fabrica = recurso[0]
+                cuerpo, montura, armadura, arma = fabrica.crear_personaje(timeout)
+            except Exception as e:
+                fallidas[kind] = e
+                raise
+
+            try:
+                cuerpo.analizar()
+                montura.montar()
+                armadura.equipar()
+                arma.atacar()
+            finally:
+                fabrica.devolver_personaje(cuerpo, montura, armadura, arma)
+
+            chunk.append(b'{"index"' + colon + str(index).encode() + sep + recurso[1] + b"}\n")
+            created += 1
+            by_kind[kind]["created"] += 1
+        except Exception as e:
+            mensaje = str(e)
+            chunk.append(_encode({"index": index, "status": "error", "kind": kind, "error": mensaje}) + b"\n")
+            failed += 1
+            by_kind[kind]["failed"] += 1
+            if mensaje in errores or len(errores) < MAX_ERROR_KINDS:
+                errores[mensaje] = errores.get(mensaje, 0) + 1
+
+        if len(chunk) >= chunk_lines:
+            yield b"".join(chunk)
+            chunk.clear()
+
+    chunk.append(_encode({
+        "summary": {
+            "requested": count,
+            "created": created,
+            "failed": failed,
+            "by_kind": by_kind,
+            "errors": [{"message": m, "count": c} for m, c in errores.items()],
+        }
+    }) + b"\n")
+    yield b"".join(chunk)
@@ -0,0 +1,294 @@
+"""Codificadores binarios compactos en Python puro: MessagePack y CBOR (RFC 8949).
+
+Cubren los tipos que producen las respuestas JSON de la API: None, bool,
+int (64 bits), float, str, bytes, listas/tuplas y mapeos. Los demás objetos
+se convierten con ``default`` si se indica; si no, se lanza TypeError.
+Los decodificadores (``*_loads``) sirven a los clientes en Python y a las
+pruebas de ida y vuelta.
+"""
+import struct
+from collections.abc import Mapping
+
+
+_B = struct.Struct(">B")
+_H = struct.Struct(">H")
+_I = struct.Struct(">I")
+_Q = struct.Struct(">Q")
+_b = struct.Struct(">b")
+_h = struct.Struct(">h")
+_i = struct.Struct(">i")
+_q = struct.Struct(">q")
+_d = struct.Struct(">d")
+
+
+# --- MessagePack -------------------------------------------------------------
+
+def _msgpack_int(out: bytearray, value: int):
+    if 0 <= value < 0x80:
+        out.append(value)
+    elif -32 <= value < 0:
+        out.append(value & 0xFF)
+    elif value >= 0:
+        if value <= 0xFF:
+            out += b"\xcc" + _B.pack(value)
+        elif value <= 0xFFFF:
+            out += b"\xcd" + _H.pack(value)
+        elif value <= 0xFFFFFFFF:
+            out += b"\xce" + _I.pack(value)
+        elif value <= 0xFFFFFFFFFFFFFFFF:
+            out += b"\xcf" + _Q.pack(value)
+        else:
+            raise OverflowError("Entero demasiado grande para MessagePack")
+    else:
+        if value >= -0x80:
+            out += b"\xd0" + _b.pack(value)
+        elif value >= -0x8000:
+            out += b"\xd1" + _h.pack(value)
+        elif value >= -0x80000000:
+            out += b"\xd2" + _i.pack(value)
+        elif value >= -0x8000000000000000:
+            out += b"\xd3" + _q.pack(value)
+        else:
+            raise OverflowError("Entero demasiado grande para MessagePack")
+
+
+def _msgpack_len(out: bytearray, n: int, fix_base: int, fix_max: int, codes: bytes):
+    # codes: prefijos de 8, 16 y 32 bits (0 si el tipo no tiene variante de 8 bits)
+    if n < fix_max:
+        out.append(fix_base | n)
+    elif codes[0] and n <= 0xFF:
+        out += bytes((codes[0],)) + _B.pack(n)
+    elif n <= 0xFFFF:
+        out += bytes((codes[1],)) + _H.pack(n)
+    else:
+        out += bytes((codes[2],)) + _I.pack(n)
+
+
+def _msgpack(out: bytearray, obj, default):
+    if obj is None:
+        out.append(0xC0)
+    elif obj is True:
+        out.append(0xC3)
+    elif obj is False:
+        out.append(0xC2)
+    elif isinstance(obj, int):
+        _msgpack_int(out, obj)
+    elif isinstance(obj, float):
+        out += b"\xcb" + _d.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _msgpack_len(out, len(data), 0xA0, 32, b"\xd9\xda\xdb")
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        _msgpack_len(out, len(data), 0, 0, b"\xc4\xc5\xc6")
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        _msgpack_len(out, len(obj), 0x90, 16, b"\x00\xdc\xdd")
+        for item in obj:
+            _msgpack(out, item, default)
+    elif isinstance(obj, Mapping):
+        _msgpack_len(out, len(obj), 0x80, 16, b"\x00\xde\xdf")
+        for key, value in obj.items():
+            _msgpack(out, key, default)
+            _msgpack(out, value, default)
+    elif default is not None:
+        _msgpack(out, default(obj), None)
+    else:
+        raise TypeError(f"Tipo no serializable en MessagePack: {type(obj).__name__}")
+
+
+def msgpack_dumps(obj, default=None) -> bytes:
+    out = bytearray()
+    _msgpack(out, obj, default)
+    return bytes(out)
+
+
+# Valores de tamaño fijo y tipos con longitud explícita
+_MSGPACK_FIXED = {0xCA: struct.Struct(">f"), 0xCB: _d,
+                  0xCC: _B, 0xCD: _H, 0xCE: _I, 0xCF: _Q,
+                  0xD0: _b, 0xD1: _h, 0xD2: _i, 0xD3: _q}
+_MSGPACK_SIZED = {0xD9: (_B, "str"), 0xDA: (_H, "str"), 0xDB: (_I, "str"),
+                  0xC4: (_B, "bin"), 0xC5: (_H, "bin"), 0xC6: (_I, "bin"),
+                  0xDC: (_H, "array"), 0xDD: (_I, "array"),
+                  0xDE: (_H, "map"), 0xDF: (_I, "map")}
+
+
+def msgpack_loads(data: bytes):
+    value, offset = _msgpack_decode(memoryview(data), 0)
+    if offset != len(data):
+        raise ValueError("Datos sobrantes tras el objeto MessagePack")
+    return value
+
+
+def _msgpack_decode(view, pos: int):
+    code = view[pos]
+    pos += 1
+    if code < 0x80:
+        return code, pos
+    if code >= 0xE0:
+        return code - 0x100, pos
+    if 0x80 <= code <= 0x8F:
+        return _msgpack_map(view, pos, code & 0x0F)
+    if 0x90 <= code <= 0x9F:
+        return _msgpack_array(view, pos, code & 0x0F)
+    if 0xA0 <= code <= 0xBF:
+        n = code & 0x1F
+        return str(view[pos:pos + n], "utf-8"), pos + n
+    if code == 0xC0:
+        return None, pos
+    if code == 0xC2:
+        return False, pos
+    if code == 0xC3:
+        return True, pos
+    fmt = _MSGPACK_FIXED.get(code)
+    if fmt is not None:
+        return fmt.unpack_from(view, pos)[0], pos + fmt.size
+    if code not in _MSGPACK_SIZED:
+        raise ValueError(f"Código MessagePack no soportado: 0x{code:02x}")
+    fmt, kind = _MSGPACK_SIZED[code]
+    n = fmt.unpack_from(view, pos)[0]
+    pos += fmt.size
+    if kind == "str":
+        return str(view[pos:pos + n], "utf-8"), pos + n
+    if kind == "bin":
+        return bytes(view[pos:pos + n]), pos + n
+    if kind == "array":
+        return _msgpack_array(view, pos, n)
+    return _msgpack_map(view, pos, n)
+
+
+def _msgpack_array(view, pos: int, n: int):
+    items = []
+    for _ in range(n):
+        item, pos = _msgpack_decode(view, pos)
+        items.append(item)
+    return items, pos
+
+
+def _msgpack_map(view, pos: int, n: int):
+    result = {}
+    for _ in range(n):
+        key, pos = _msgpack_decode(view, pos)
+        result[key], pos = _msgpack_decode(view, pos)
+    return result, pos
+
+
+# --- CBOR --------------------------------------------------------------------
+
+def _cbor_head(out: bytearray, major: int, n: int):
+    base = major << 5
+    if n < 24:
+        out.append(base | n)
+    elif n <= 0xFF:
+        out += bytes((base | 24,)) + _B.pack(n)
+    elif n <= 0xFFFF:
+        out += bytes((base | 25,)) + _H.pack(n)
+    elif n <= 0xFFFFFFFF:
+        out += bytes((base | 26,)) + _I.pack(n)
+    elif n <= 0xFFFFFFFFFFFFFFFF:
+        out += bytes((base | 27,)) + _Q.pack(n)
+    else:
+        raise OverflowError("Entero demasiado grande para CBOR")
+
+
+def _cbor(out: bytearray, obj, default):
+    if obj is None:
+        out.append(0xF6)
+    elif obj is True:
+        out.append(0xF5)
+    elif obj is False:
+        out.append(0xF4)
+    elif isinstance(obj, int):
+        if obj >= 0:
+            _cbor_head(out, 0, obj)
+        else:
+            _cbor_head(out, 1, -1 - obj)
+    elif isinstance(obj, float):
+        out += b"\xfb" + _d.pack(obj)
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        _cbor_head(out, 3, len(data))
+        out += data
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        _cbor_head(out, 2, len(data))
+        out += data
+    elif isinstance(obj, (list, tuple)):
+        _cbor_head(out, 4, len(obj))
+        for item in obj:
+            _cbor(out, item, default)
+    elif isinstance(obj, Mapping):
+        _cbor_head(out, 5, len(obj))
+        for key, value in obj.items():
+            _cbor(out, key, default)
+            _cbor(out, value, default)
+    elif default is not None:
+        _cbor(out, default(obj), None)
+    else:
+        raise TypeError(f"Tipo no serializable en CBOR: {type(obj).__name__}")
+
+
+def cbor_dumps(obj, default=None) -> bytes:
+    out = bytearray()
+    _cbor(out, obj, default)
+    return bytes(out)
+
+
+def cbor_loads(data: bytes):
+    value, offset = _cbor_decode(memoryview(data), 0)
+    if offset != len(data):
+        raise ValueError("Datos sobrantes tras el objeto CBOR")
+    return value
+
+
+def _cbor_decode(view, pos: int):
+    initial = view[pos]
+    pos += 1
+    major, info = initial >> 5, initial & 0x1F
+
+    if major == 7:
+        if info == 20:
+            return False, pos
+        if info == 21:
+            return True, pos
+        if info in (22, 23):
+            return None, pos
+        if info == 25:
+            return struct.unpack_from(">e", view, pos)[0], pos + 2
+        if info == 26:
+            return struct.unpack_from(">f", view, pos)[0], pos + 4
+        if info == 27:
+            return _d.unpack_from(view, pos)[0], pos + 8
+        raise ValueError(f"Valor simple CBOR no soportado: {info}")
+
+    if info < 24:
+        n = info
+    elif info in (24, 25, 26, 27):
+        fmt = (_B, _H, _I, _Q)[info - 24]
+        n = fmt.unpack_from(view, pos)[0]
+        pos += fmt.size
+    else:
+        raise ValueError("Longitudes indefinidas de CBOR no soportadas")
+
+    if major == 0:
+        return n, pos
+    if major == 1:
+        return -1 - n, pos
+    if major == 2:
+        return bytes(view[pos:pos + n]), pos + n
+    if major == 3:
+        return str(view[pos:pos + n], "utf-8"), pos + n
+    if major == 4:
+        items = []
+        for _ in range(n):
+            item, pos = _cbor_decode(view, pos)
+            items.append(item)
+        return items, pos
+    if major == 5:
+        result = {}
+        for _ in range(n):
+            key, pos = _cbor_decode(view, pos)
+            result[key], pos = _cbor_decode(view, pos)
+        return result, pos
+    raise ValueError("Etiquetas CBOR no soportadas")
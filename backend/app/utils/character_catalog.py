@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from types import MappingProxyType
+
+from .image_manager import image_manager
+from .serialization import dumps_json, get_json_encoder
+from .tracing import span
+
+
+PARTES = ("cuerpo", "montura", "armadura", "arma")
+
+
+def _freeze(value):
+    """Convierte dicts y listas en estructuras inmutables (recursivamente)."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    """Inverso de ``_freeze``: devuelve dicts y listas normales."""
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _encode(obj) -> bytes:
+    # Mismo formato que routes.make_json_response
+    return dumps_json(obj)
+
+
+class CompiledRace:
+    """Información precompilada de una raza: estructuras congeladas y JSON en bytes."""
+
+    __slots__ = ("kind", "factory_class", "generation", "parts", "parts_json",
+                 "character_json", "create_body", "info_prefix", "separators", "etag")
+
+    def __init__(self, kind: str, factory_class, generation: int):
+        self.kind = kind
+        self.factory_class = factory_class
+        self.generation = generation
+
+        # Solo hace falta la información: instancias compartidas, sin crear pools
+        fabrica = factory_class(modo="flyweight")
+        productos = (
+            fabrica.crear_cuerpo(),
+            fabrica.crear_montura(),
+            fabrica.crear_armadura(),
+            fabrica.crear_arma(),
+        )
+        info = {}
+        for parte, producto in zip(PARTES, productos):
+            with span(f"{parte}.obtener_informacion", "catalog", kind=kind):
+                info[parte] = producto.obtener_informacion()
+
+        self.parts = _freeze(info)
+        self.parts_json = MappingProxyType({parte: _encode(info[parte]) for parte in PARTES})
+
+        encoder = get_json_encoder()
+        sep, colon = encoder.item_separator, encoder.key_separator
+        self.separators = (sep, colon)
+
+        kind_json = _encode(kind)
+        fields = sep.join(_encode(parte) + colon + self.parts_json[parte] for parte in PARTES)
+        self.character_json = b"{" + fields + b"}"
+
+        # Respuesta completa de /api/create/<kind>
+        self.create_body = (
+            b'{"status"' + colon + b'"created"' + sep + b'"kind"' + colon + kind_json
+            + sep + b'"character"' + colon + self.character_json + b"}"
+        )
+        # Respuesta de /api/character/<kind>/info sin cerrar, para añadir pool_stats
+        self.info_prefix = b'{"kind"' + colon + kind_json + sep + fields
+        # Validador (débil en /info, que añade pool_stats dinámicos)
+        self.etag = f"{kind}-{hashlib.sha256(self.create_body).hexdigest()[:24]}"
+
+    def info_body(self, pool_stats) -> bytes:
+        """Cuerpo de /api/character/<kind>/info con las estadísticas del pool."""
+        sep, colon = self.separators
+        return self.info_prefix + sep + b'"pool_stats"' + colon + _encode(pool_stats) + b"}"
+
+    def to_dict(self) -> dict:
+        """Copia mutable de la información de las cuatro partes."""
+        return _thaw(self.parts)
+
+
+class CharacterCatalog:
+    """
+    Catálogo de personajes precompilado por raza.
+
+    Cada raza se compila una vez (al arrancar o en su primer uso) y solo se
+    recompila cuando cambia su clase de fábrica o el índice de imágenes.
+    """
+
+    def __init__(self):
+        self._races = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, factory_class) -> CompiledRace:
+        """Devuelve la raza compilada, recompilándola si está obsoleta."""
+        generation = image_manager.generation()
+        race = self._races.get(kind)
+        if race is not None and race.factory_class is factory_class and race.generation == generation:
+            return race
+
+        with self._lock:
+            race = self._races.get(kind)
+            if race is None or race.factory_class is not factory_class or race.generation != generation:
+                race = CompiledRace(kind, factory_class, generation)
+                self._races[kind] = race
+            return race
+
+    def build(self, factories: dict):
+        """Compila todas las razas de ``factories`` (kind -> clase de fábrica)."""
+        for kind, factory_class in factories.items():
+            self.get(kind, factory_class)
+
+    def invalidate(self, kind: str = None):
+        """Descarta una raza compilada (o todas) para forzar su recompilación."""
+        with self._lock:
+            if kind is None:
+                self._races.clear()
+            else:
+                self._races.pop(kind, None)
+
+
+# Instancia global
+character_catalog = CharacterCatalog()
@@ -0,0 +1,375 @@
+"""Almacén persistente de los personajes creados (SQLite en modo WAL).
+
+``record`` solo añade el personaje a una cola en memoria; un hilo en segundo
+plano la vacía por lotes, cada lote en una única transacción (group commit)
+con una sentencia preparada. La información de las cuatro partes no se
+repite por personaje: cada representación distinta del catálogo (por su
+ETag) se guarda una vez en ``catalog_entries`` y los personajes la
+referencian.
+
+Las consultas van por índices ``(kind, created_at, id)`` y
+``(created_at, id)`` con paginación por cursor. Lo recién creado aparece en
+ellas tras el siguiente volcado (como mucho ``flush_interval``).
+
+Con ``retention`` el mismo hilo borra periódicamente los personajes más
+antiguos que ese número de segundos; sin ella el archivo solo crece.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from .cursors import decode_cursor, encode_cursor
+
+
+DEFAULT_CAPACITY = 65536
+DEFAULT_BATCH_SIZE = 4096
+DEFAULT_FLUSH_INTERVAL = 0.05
+DEFAULT_RETENTION = None
+MAX_PAGE_SIZE = 1000
+
+# Espera tras un volcado fallido (el lote sigue en la cola) y entre purgas de retención
+_RETRY_INTERVAL = 1.0
+_PRUNE_INTERVAL = 60.0
+
+# Clave de orden de los cursores: (created_at, id)
+_CURSOR_SORT = "created_at"
+_CURSOR_TYPES = ((int, float), (int,))
+
+# Representaciones del catálogo decodificadas que se mantienen en memoria
+_DECODED_CACHE = 256
+
+
+class CharacterStore:
+    """
+    Personajes creados con escritura diferida por lotes.
+
+    ``record`` no toma locks: ``deque.append`` es atómico y la cola está
+    acotada; si se llena se descartan los más antiguos y se cuentan como
+    perdidos. Sin ``path`` el almacén está desactivado y ``record`` no hace nada.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS catalog_entries ("
+        " id INTEGER PRIMARY KEY, etag TEXT NOT NULL UNIQUE, kind TEXT NOT NULL,"
+        " character TEXT NOT NULL, created_at REAL NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS characters ("
+        " id INTEGER PRIMARY KEY, kind TEXT NOT NULL, created_at REAL NOT NULL,"
+        " catalog_id INTEGER NOT NULL REFERENCES catalog_entries(id))",
+        "CREATE INDEX IF NOT EXISTS characters_kind_time ON characters (kind, created_at, id)",
+        "CREATE INDEX IF NOT EXISTS characters_time ON characters (created_at, id)",
+    )
+
+    _INSERT = "INSERT INTO characters (kind, created_at, catalog_id) VALUES (?, ?, ?)"
+
+    def __init__(self):
+        self.path = None
+        self.capacity = DEFAULT_CAPACITY
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.retention = DEFAULT_RETENTION
+        self._pruned_at = 0.0
+        self.logger = logging.getLogger("app.characters")
+        self._buffer = deque(maxlen=DEFAULT_CAPACITY)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._local = threading.local()
+        # Solo el hilo de volcado escribe: serializa volcados explícitos y en segundo plano
+        self._write_lock = threading.Lock()
+        self._catalog_ids = {}
+        self._decoded = {}
+        self._counter_lock = threading.Lock()
+        self._dropped = 0
+        self._written = 0
+        self._batches = 0
+        self._failed = 0
+        self._pruned = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def configure(self, path=None, capacity: int = DEFAULT_CAPACITY, batch_size: int = DEFAULT_BATCH_SIZE,
+                  flush_interval: float = DEFAULT_FLUSH_INTERVAL, retention: float = DEFAULT_RETENTION):
+        """
+        Abre (o desactiva, con ``path=None``) el almacén; vuelca antes lo pendiente.
+
+        Args:
+            retention: segundos que se conservan los personajes (None = siempre)
+        """
+        self.close()
+        self.path = None if path is None else str(path)
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._pruned_at = 0.0
+        self._buffer = deque(maxlen=capacity)
+        self._local = threading.local()
+        self._catalog_ids = {}
+        self._decoded = {}
+        if self.path is None:
+            return
+        self._closed = False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self._SCHEMA:
+            conn.execute(statement)
+        self._start()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, kind: str, race) -> None:
+        """Encola un personaje creado a partir de su raza compilada (``CompiledRace``)."""
+        if self.path is None:
+            return
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            with self._counter_lock:
+                self._dropped += 1
+        buffer.append((time.time(), kind, race))
+        if len(buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _catalog_id(self, conn, kind: str, race, created: dict) -> int:
+        catalog_id = self._catalog_ids.get(race.etag) or created.get(race.etag)
+        if catalog_id is None:
+            conn.execute(
+                "INSERT OR IGNORE INTO catalog_entries (etag, kind, character, created_at) VALUES (?, ?, ?, ?)",
+                (race.etag, kind, race.character_json.decode("utf-8"), time.time()),
+            )
+            catalog_id = conn.execute(
+                "SELECT id FROM catalog_entries WHERE etag = ?", (race.etag,)
+            ).fetchone()[0]
+            created[race.etag] = catalog_id
+        return catalog_id
+
+    def _requeue(self, batch: list) -> None:
+        """Devuelve un lote fallido al frente de la cola; lo que ya no cabe se cuenta como perdido."""
+        buffer = self._buffer
+        overflow = max(0, len(buffer) + len(batch) - self.capacity)
+        # extendleft descarta por la derecha (los más recientes) si la cola está llena
+        buffer.extendleft(reversed(batch))
+        with self._counter_lock:
+            self._failed += 1
+            self._dropped += overflow
+
+    def flush(self) -> int:
+        """
+        Escribe los personajes pendientes, un lote por transacción; devuelve cuántos.
+
+        Si una transacción falla, su lote vuelve a la cola para el siguiente
+        volcado y se relanza el error.
+        """
+        if self.path is None:
+            return 0
+        total = 0
+        with self._write_lock:
+            buffer = self._buffer
+            conn = self._connection()
+            while buffer:
+                batch = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(buffer.popleft())
+                except IndexError:
+                    pass
+                if not batch:
+                    break
+                # Los ids de catálogo nuevos solo se recuerdan si la transacción se confirma
+                created = {}
+                try:
+                    with conn:
+                        conn.execute("BEGIN IMMEDIATE")
+                        rows = [(kind, created_at, self._catalog_id(conn, kind, race, created))
+                                for created_at, kind, race in batch]
+                        conn.executemany(self._INSERT, rows)
+                except BaseException:
+                    self._requeue(batch)
+                    raise
+                self._catalog_ids.update(created)
+                total += len(batch)
+                with self._counter_lock:
+                    self._written += len(batch)
+                    self._batches += 1
+        return total
+
+    def prune(self, now: float = None) -> int:
+        """Borra los personajes anteriores a ``retention`` segundos; devuelve cuántos."""
+        if self.path is None or self.retention is None:
+            return 0
+        now = time.time() if now is None else now
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                removed = conn.execute(
+                    "DELETE FROM characters WHERE created_at < ?", (now - self.retention,)
+                ).rowcount
+        self._pruned_at = now
+        with self._counter_lock:
+            self._pruned += removed
+        return removed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if self.retention is not None and time.time() - self._pruned_at >= _PRUNE_INTERVAL:
+                    self.prune()
+            except sqlite3.Error:
+                self.logger.exception("Error guardando personajes")
+                # El lote sigue en la cola: reintentar sin inundar el registro
+                self._stop.wait(_RETRY_INTERVAL)
+        try:
+            self.flush()
+        except sqlite3.Error:
+            self.logger.exception("Error guardando personajes al cerrar")
+
+    def _start(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="character-store-writer", daemon=True)
+        self._thread.start()
+
+    def _after_fork(self) -> None:
+        # Ni la conexión ni el hilo sobreviven a fork(): recrearlos en el hijo
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        # Lo encolado en el padre lo escribe el padre
+        self._buffer = deque(maxlen=self.capacity)
+        if self.path is not None and not self._closed:
+            self._start()
+
+    def suspend(self) -> None:
+        """
+        Detiene el hilo de volcado tras escribir los personajes pendientes sin
+        cerrar el almacén (p. ej. el maestro pre-fork): los hijos lo relanzan.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+
+    def close(self) -> None:
+        """Detiene el hilo de volcado tras escribir los personajes pendientes."""
+        self._closed = True
+        self.suspend()
+
+    def _character(self, catalog_id: int, character: str) -> dict:
+        decoded = self._decoded.get(catalog_id)
+        if decoded is None:
+            if len(self._decoded) >= _DECODED_CACHE:
+                self._decoded.clear()
+            decoded = self._decoded[catalog_id] = json.loads(character)
+        return decoded
+
+    def query(self, kind: str = None, since: float = None, until: float = None,
+              limit: int = 100, cursor: str = None, descending: bool = False) -> dict:
+        """
+        Página de personajes ordenados por ``(created_at, id)``.
+
+        Args:
+            kind: solo esta raza
+            since / until: intervalo ``[since, until)`` en segundos epoch
+            cursor: valor ``next_cursor`` de la página anterior
+
+        Returns:
+            dict con ``items`` (id, kind, created_at, character) y ``next_cursor``
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"'limit' debe estar entre 1 y {MAX_PAGE_SIZE}")
+        where, params = [], []
+        if kind is not None:
+            where.append("c.kind = ?")
+            params.append(kind)
+        if since is not None:
+            where.append("c.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("c.created_at < ?")
+            params.append(until)
+        if cursor:
+            after = decode_cursor(cursor, _CURSOR_SORT, descending, _CURSOR_TYPES)
+            if not -2 ** 63 <= after[1] < 2 ** 63:
+                raise ValueError("Cursor inválido")
+            where.append(f"(c.created_at, c.id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        order = "DESC" if descending else "ASC"
+        sql = ("SELECT c.id, c.kind, c.created_at, c.catalog_id, e.character"
+               " FROM characters c JOIN catalog_entries e ON e.id = c.catalog_id"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY c.created_at {order}, c.id {order} LIMIT ?")
+        rows = self._connection().execute(sql, (*params, limit + 1)).fetchall()
+
+        items = [{
+            "id": character_id,
+            "kind": row_kind,
+            "created_at": created_at,
+            "character": self._character(catalog_id, character),
+        } for character_id, row_kind, created_at, catalog_id, character in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = items[-1]
+            next_cursor = encode_cursor(_CURSOR_SORT, descending, (last["created_at"], last["id"]))
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get(self, character_id: int):
+        row = self._connection().execute(
+            "SELECT c.id, c.kind, c.created_at, c.catalog_id, e.character"
+            " FROM characters c JOIN catalog_entries e ON e.id = c.catalog_id WHERE c.id = ?",
+            (character_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        character_id, kind, created_at, catalog_id, character = row
+        return {"id": character_id, "kind": kind, "created_at": created_at,
+                "character": self._character(catalog_id, character)}
+
+    def counts(self) -> dict:
+        """Personajes guardados por raza."""
+        rows = self._connection().execute("SELECT kind, COUNT(*) FROM characters GROUP BY kind ORDER BY kind")
+        return dict(rows.fetchall())
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            dropped, written, batches = self._dropped, self._written, self._batches
+            failed, pruned = self._failed, self._pruned
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "queued": len(self._buffer),
+            "capacity": self.capacity,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "written": written,
+            "batches": batches,
+            "failed_batches": failed,
+            "dropped": dropped,
+            "retention": self.retention,
+            "pruned": pruned,
+            "catalog_entries": len(self._catalog_ids),
+        }
+
+
+# Instancia global
+character_store = CharacterStore()
+
+if hasattr(os, "register_at_fork"):
+    # Un solo hook para la instancia global (los hooks de fork no se pueden quitar)
+    os.register_at_fork(after_in_child=character_store._after_fork)
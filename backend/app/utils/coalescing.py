@@ -0,0 +1,202 @@
+"""Agrupación de peticiones idénticas simultáneas (single-flight).
+
+Para las rutas de lectura de personajes e imágenes, la primera petición con
+una clave dada (endpoint, argumentos de ruta, query string, formato
+negociado y validadores condicionales) calcula la respuesta; las idénticas
+que llegan mientras tanto esperan y reciben una copia de sus bytes ya
+codificados. Con ``COALESCE_TTL`` > 0 la respuesta además se reutiliza
+durante ese tiempo.
+
+Los hooks se registran entre las dos fases del control de admisión: las
+cubetas por cliente ya se cobraron, pero quien espera a otra petición o se
+sirve de la caché no ocupa plaza.
+
+La caché y los vuelos son de cada proceso: con varios workers, ``clear()``
+(p. ej. al subir una imagen) solo vacía la del worker que atiende la subida;
+en los demás las respuestas caducan con ``COALESCE_TTL``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, g, request
+
+from . import serialization
+from .metrics import coalesce_requests, metrics
+from .tracing import span
+
+
+DEFAULT_TTL = 0.0
+DEFAULT_MAX_WAIT = 5.0
+DEFAULT_MAX_ENTRIES = 1024
+
+COALESCED_ENDPOINTS = frozenset({
+    "api.get_character_info",
+    "api.get_character_sprite",
+    "api.get_character_sprite_map",
+    "api.list_images",
+    "api.list_character_classes",
+    "api.list_class_characters",
+})
+
+RESULTS = ("leader", "follower", "cached", "fallback")
+
+
+class _Flight:
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class _Result:
+    """Respuesta compartible: estado, cabeceras y cuerpo ya codificado."""
+
+    __slots__ = ("status", "headers", "body", "expires")
+
+    def __init__(self, response: Response, expires: float):
+        self.status = response.status_code
+        self.headers = list(response.headers.items())
+        self.body = response.get_data()
+        self.expires = expires
+
+    def response(self) -> Response:
+        return Response(self.body, status=self.status, headers=self.headers)
+
+
+def shareable(response: Response) -> bool:
+    """Solo se comparten respuestas completas en memoria y que no dependen de la carga."""
+    return (not response.is_streamed and not response.direct_passthrough
+            and response.status_code < 500 and response.status_code != 429)
+
+
+class Coalescer:
+    """Vuelos en curso por clave y, opcionalmente, resultados recientes con TTL."""
+
+    def __init__(self):
+        self.enabled = False
+        self.ttl = DEFAULT_TTL
+        self.max_wait = DEFAULT_MAX_WAIT
+        self.max_entries = DEFAULT_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._results = OrderedDict()
+
+    @staticmethod
+    def key() -> tuple:
+        return (
+            request.endpoint,
+            tuple(sorted((request.view_args or {}).items())),
+            request.query_string,
+            serialization.negotiate(),
+            request.headers.get("If-None-Match"),
+            request.headers.get("If-Modified-Since"),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+    def _cached(self, key, now: float):
+        result = self._results.get(key)
+        if result is None:
+            return None
+        if result.expires <= now:
+            del self._results[key]
+            return None
+        return result
+
+    def _store(self, key, result: _Result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def _before_request(self):
+        if request.endpoint not in COALESCED_ENDPOINTS or request.method != "GET":
+            return None
+        key = self.key()
+        route = request.url_rule.rule
+        with self._lock:
+            result = self._cached(key, time.monotonic()) if self.ttl > 0 else None
+            if result is None:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    g._coalesce = (key, flight)
+                    coalesce_requests.inc((route, "leader"))
+                    return None
+        if result is not None:
+            coalesce_requests.inc((route, "cached"))
+            return result.response()
+
+        with span("coalesce.wait", "coalesce"):
+            flight.event.wait(self.max_wait)
+        result = flight.result
+        if result is None:
+            # El líder falló, no era compartible o tardó demasiado: se calcula aparte
+            coalesce_requests.inc((route, "fallback"))
+            return None
+        coalesce_requests.inc((route, "follower"))
+        return result.response()
+
+    def _finish(self, response: Response = None):
+        state = g.pop("_coalesce", None)
+        if state is None:
+            return
+        key, flight = state
+        if response is not None and shareable(response):
+            now = time.monotonic()
+            flight.result = _Result(response, now + self.ttl)
+        with self._lock:
+            self._flights.pop(key, None)
+            if flight.result is not None and self.ttl > 0:
+                self._store(key, flight.result)
+        flight.event.set()
+
+    def _after_request(self, response):
+        self._finish(response)
+        return response
+
+    def _teardown_request(self, exc):
+        # Excepción sin manejar: se libera a quien espera para que calcule por su cuenta
+        self._finish()
+
+    def _collector(self):
+        yield ("fabrica_coalesce_in_flight", "gauge", "Cálculos líderes en curso.",
+               [({}, len(self._flights))])
+
+    @staticmethod
+    def _ratio_collector(view):
+        # Derivada: se calcula sobre los contadores ya sumados de todos los workers
+        totals = {}
+        for route, result in view.labels("fabrica_coalesce_requests_total"):
+            count = view.value("fabrica_coalesce_requests_total", (route, result))
+            totals.setdefault(route, dict.fromkeys(RESULTS, 0))[result] += count
+        ratios = []
+        for route, counts in sorted(totals.items()):
+            total = sum(counts.values())
+            if total:
+                ratios.append(({"route": route}, round((counts["follower"] + counts["cached"]) / total, 6)))
+        yield ("fabrica_coalesce_collapse_ratio", "gauge",
+               "Proporción de peticiones servidas con la respuesta de otra (en vuelo o en caché).", ratios)
+
+    def install(self, app):
+        """Configura la agrupación desde ``app.config`` y registra los hooks si está activa."""
+        config = app.config
+        self.enabled = bool(config["COALESCE_ENABLED"])
+        self.ttl = float(config["COALESCE_TTL"])
+        self.max_wait = float(config["COALESCE_MAX_WAIT"])
+        self.max_entries = int(config["COALESCE_MAX_ENTRIES"])
+        self.clear()
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+            metrics.register_collector(self._collector)
+            metrics.register_collector(self._ratio_collector, derived=True)
+
+
+# Instancia global
+coalescer = Coalescer()
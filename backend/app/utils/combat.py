@@ -0,0 +1,428 @@
+"""Simulación de combates entre razas (NumPy + pool de procesos).
+
+Cada duelo enfrenta a dos personajes generados con el modelo de
+``estadisticas`` de su raza (ver ``population``). Las acciones de las
+interfaces se traducen a cálculo numérico:
+
+- ``IMontura.montar``: iniciativa = ``velocidad_kmh`` + 20·log10(1 + ``alcance_m``);
+  ataca primero quien tiene más (empate al azar).
+- ``IArmadura.equipar``: el daño recibido se multiplica por 100 / (100 + ``defensa``)
+  y la esquiva es (``velocidad_kmh`` − 2·``peso_kg`` de armadura) / 400, entre 0 y 0.25.
+- ``IArma.parry``: probabilidad de parar un golpe 0.05 + ``defensa`` / 1000, hasta 0.15.
+- ``IArma.atacar``: acierta con 0.95·(1 − esquiva)·(1 − parada) del defensor y quita
+  ``dano`` × defensa × U(0.8, 1.2) de ``vida``.
+
+Cada ronda se resuelve para todos los duelos vivos a la vez; los terminados
+se retiran de los arrays. Si tras ``max_rounds`` siguen los dos en pie gana
+quien conserva más fracción de vida (igual = empate).
+
+Los torneos se dividen en fragmentos de ``shard_size`` duelos que se
+reparten en un pool de procesos. La semilla de cada fragmento sale de
+``SeedSequence(seed, spawn_key=(i, j, fragmento))``, así que el resultado no
+depende del número de procesos ni del orden en que terminan.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+from .population import StatModel, _require_numpy, draw, np
+
+
+DEFAULT_SHARD_SIZE = 50_000
+DEFAULT_MAX_ROUNDS = 50
+DEFAULT_MAX_DUELS = 1_000_000
+DEFAULT_MAX_JOBS = 100
+# Trabajos en cola o en ejecución admitidos por proceso
+DEFAULT_MAX_PENDING = 2
+
+# Columnas del modelo que usa el combate
+REQUIRED_COLUMNS = (
+    "cuerpo_vida",
+    "montura_velocidad_kmh",
+    "armadura_defensa",
+    "armadura_peso_kg",
+    "arma_dano",
+    "arma_alcance_m",
+)
+
+_JOB_ID_LENGTH = 16
+
+
+class CombatError(ValueError):
+    """Parámetros de simulación inválidos."""
+    pass
+
+
+class SimulationBusyError(CombatError):
+    """Ya hay ``max_pending`` trabajos en cola o en ejecución en este proceso."""
+    pass
+
+
+def _side(stats: dict) -> dict:
+    """Magnitudes derivadas de un lado del duelo (arrays float64)."""
+    vida = stats["cuerpo_vida"].astype(np.float64)
+    velocidad = stats["montura_velocidad_kmh"].astype(np.float64)
+    defensa = stats["armadura_defensa"].astype(np.float64)
+    return {
+        "vida": vida,
+        "iniciativa": velocidad + 20 * np.log10(1 + stats["arma_alcance_m"].astype(np.float64)),
+        "dano": stats["arma_dano"].astype(np.float64),
+        "mitigacion": 100 / (100 + defensa),
+        "esquiva": np.clip((velocidad - 2 * stats["armadura_peso_kg"]) / 400, 0, 0.25),
+        "parada": np.clip(0.05 + defensa / 1000, 0.05, 0.15),
+    }
+
+
+def simulate_duels(stats_a: dict, stats_b: dict, rng, max_rounds: int = DEFAULT_MAX_ROUNDS) -> dict:
+    """
+    Resuelve ``len(stats_a[...])`` duelos A contra B.
+
+    Args:
+        stats_a / stats_b: columnas del modelo (``REQUIRED_COLUMNS``) de igual longitud
+        rng: ``numpy.random.Generator``
+
+    Returns:
+        dict con ``a`` y ``b`` (victorias), ``draws`` y ``rounds`` (suma de rondas)
+    """
+    a, b = _side(stats_a), _side(stats_b)
+    count = len(a["vida"])
+    a_first = (a["iniciativa"] > b["iniciativa"]) | (
+        (a["iniciativa"] == b["iniciativa"]) & (rng.random(count) < 0.5))
+
+    # Lado que ataca primero (f) y segundo (s) en cada duelo
+    def pick(key_f, key_s):
+        return np.where(a_first, key_f, key_s)
+
+    hit_f = 0.95 * (1 - pick(b["esquiva"], a["esquiva"])) * (1 - pick(b["parada"], a["parada"]))
+    hit_s = 0.95 * (1 - pick(a["esquiva"], b["esquiva"])) * (1 - pick(a["parada"], b["parada"]))
+    dano_f = pick(a["dano"], b["dano"]) * pick(b["mitigacion"], a["mitigacion"])
+    dano_s = pick(b["dano"], a["dano"]) * pick(a["mitigacion"], b["mitigacion"])
+    vida_f0, vida_s0 = pick(a["vida"], b["vida"]), pick(b["vida"], a["vida"])
+    vida_f, vida_s = vida_f0.copy(), vida_s0.copy()
+
+    # 1 = gana quien ataca primero, 2 = el segundo, 0 = empate
+    winner = np.zeros(count, dtype=np.int8)
+    rounds = np.full(count, max_rounds, dtype=np.int64)
+    active = np.arange(count)
+    live = (hit_f, hit_s, dano_f, dano_s, vida_f, vida_s, vida_f0, vida_s0)
+    for round_number in range(1, max_rounds + 1):
+        if not len(active):
+            break
+        hit_f, hit_s, dano_f, dano_s, vida_f, vida_s, vida_f0, vida_s0 = live
+        n = len(active)
+        vida_s -= (rng.random(n) < hit_f) * dano_f * rng.uniform(0.8, 1.2, n)
+        dead_s = vida_s <= 0
+        vida_f -= ((rng.random(n) < hit_s) & ~dead_s) * dano_s * rng.uniform(0.8, 1.2, n)
+        dead_f = vida_f <= 0
+        done = dead_s | dead_f
+        if done.any():
+            winner[active[dead_s]] = 1
+            winner[active[dead_f]] = 2
+            rounds[active[done]] = round_number
+            keep = ~done
+            active = active[keep]
+            live = tuple(array[keep] for array in live)
+
+    if len(active):
+        _, _, _, _, vida_f, vida_s, vida_f0, vida_s0 = live
+        ratio_f, ratio_s = vida_f / vida_f0, vida_s / vida_s0
+        winner[active] = np.where(ratio_f > ratio_s, 1, np.where(ratio_s > ratio_f, 2, 0))
+
+    a_wins = int(np.count_nonzero(((winner == 1) & a_first) | ((winner == 2) & ~a_first)))
+    draws = int(np.count_nonzero(winner == 0))
+    return {"a": a_wins, "b": count - a_wins - draws, "draws": draws, "rounds": int(rounds.sum())}
+
+
+def _run_shard(task: tuple) -> tuple:
+    """Un fragmento de un enfrentamiento; se ejecuta en los procesos del pool."""
+    i, j, shard, count, seed, stats_a, stats_b, max_rounds = task
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i, j, shard)))
+    side_a = draw(stats_a, count, rng)
+    side_b = draw(stats_b, count, rng)
+    return i, j, simulate_duels(side_a, side_b, rng, max_rounds)
+
+
+def _mp_context():
+    # spawn: los procesos del pool no heredan hilos ni locks del servidor
+    return multiprocessing.get_context("spawn")
+
+
+def run_tournament(factories: dict, duels: int = 10_000, seed: int = 0, workers: int = None,
+                   shard_size: int = DEFAULT_SHARD_SIZE, max_rounds: int = DEFAULT_MAX_ROUNDS,
+                   mirror: bool = True) -> dict:
+    """
+    Todos contra todos: ``duels`` duelos por pareja de razas (y contra sí
+    misma con ``mirror``), agregados en matrices ``[i][j]`` desde el punto de
+    vista de la raza de la fila.
+
+    Con un solo fragmento o ``workers=0`` se ejecuta en este proceso.
+    """
+    _require_numpy()
+    if duels < 1:
+        raise CombatError("'duels' debe ser al menos 1")
+    if seed < 0:
+        raise CombatError("'seed' no puede ser negativa")
+    if shard_size < 1 or max_rounds < 1:
+        raise CombatError("'shard_size' y 'max_rounds' deben ser al menos 1")
+    model = StatModel(factories)
+    kinds = model.kinds
+    stats = {}
+    for kind in kinds:
+        race = model.race_stats(kind)
+        missing = [column for column in REQUIRED_COLUMNS if column not in race]
+        if missing:
+            raise CombatError(f"La raza '{kind}' no declara {missing}")
+        stats[kind] = {column: tuple(race[column]) for column in REQUIRED_COLUMNS}
+
+    tasks = []
+    for i, kind_a in enumerate(kinds):
+        for j in range(i if mirror else i + 1, len(kinds)):
+            for shard, start in enumerate(range(0, duels, shard_size)):
+                tasks.append((i, j, shard, min(shard_size, duels - start), seed,
+                              stats[kind_a], stats[kinds[j]], max_rounds))
+    if not tasks:
+        raise CombatError("Se necesitan al menos dos razas (o mirror=true)")
+
+    started = time.perf_counter()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        results = map(_run_shard, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context())
+        results = executor.map(_run_shard, tasks)
+    size = len(kinds)
+    wins = np.zeros((size, size), dtype=np.int64)
+    draws = np.zeros((size, size), dtype=np.int64)
+    rounds = np.zeros((size, size), dtype=np.int64)
+    played = np.zeros((size, size), dtype=np.int64)
+    try:
+        for i, j, result in results:
+            total = result["a"] + result["b"] + result["draws"]
+            wins[i, j] += result["a"]
+            draws[i, j] += result["draws"]
+            rounds[i, j] += result["rounds"]
+            played[i, j] += total
+            if i != j:
+                wins[j, i] += result["b"]
+                draws[j, i] += result["draws"]
+                rounds[j, i] += result["rounds"]
+                played[j, i] += total
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    def ratio(matrix):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values = np.round(matrix / played, 6)
+        return [[None if played[i, j] == 0 else float(values[i, j]) for j in range(size)] for i in range(size)]
+
+    return {
+        "kinds": kinds,
+        "duels": duels,
+        "seed": seed,
+        "max_rounds": max_rounds,
+        "mirror": mirror,
+        "shards": len(tasks),
+        "workers": max(workers, 1),
+        "win_rate": ratio(wins),
+        "draw_rate": ratio(draws),
+        "mean_rounds": ratio(rounds),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
+def _alive(pid) -> bool:
+    """Si el proceso ``pid`` de esta máquina sigue vivo."""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SimulationJobs:
+    """
+    Torneos en segundo plano, uno a la vez por proceso y como mucho
+    ``max_pending`` entre en cola y en ejecución (el resto se rechaza).
+
+    El estado de cada trabajo se guarda como JSON en ``directory`` en cada
+    cambio (queued, running, done, failed), así que cualquier worker puede
+    responder por él; en memoria solo se guardan los ``max_jobs`` más recientes
+    y en disco, al terminar cada trabajo, se borran los archivos más antiguos
+    que los ``max_jobs`` más recientes (salvo trabajos aún en curso).
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.options = {}
+        self.max_duels = DEFAULT_MAX_DUELS
+        self.max_jobs = DEFAULT_MAX_JOBS
+        self.max_pending = DEFAULT_MAX_PENDING
+        self.logger = logging.getLogger("app.simulations")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    def configure(self, directory, workers: int = None, shard_size: int = DEFAULT_SHARD_SIZE,
+                  max_rounds: int = DEFAULT_MAX_ROUNDS, max_duels: int = DEFAULT_MAX_DUELS,
+                  max_jobs: int = DEFAULT_MAX_JOBS, max_pending: int = DEFAULT_MAX_PENDING):
+        self.directory = Path(directory)
+        self.options = {"workers": workers, "shard_size": shard_size, "max_rounds": max_rounds}
+        self.max_duels = max_duels
+        self.max_jobs = max_jobs
+        self.max_pending = max_pending
+
+    def _after_fork(self):
+        # El hilo del executor no sobrevive a fork(): se recrea al primer trabajo del hijo
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Trabajos de este proceso en cola o en ejecución."""
+        return self._pending
+
+    def _save(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._jobs.move_to_end(job["id"])
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp, self.directory / f"{job['id']}.json")
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if job["status"] in ("done", "failed"):
+            self._prune()
+
+    def _prune(self) -> int:
+        """Borra del directorio los trabajos terminados más allá de los ``max_jobs`` más recientes."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    continue
+        entries.sort(reverse=True)
+        removed = 0
+        for _, path in entries[self.max_jobs:]:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+            except (OSError, ValueError):
+                job = {}
+            if job.get("status") in ("queued", "running") and _alive(job.get("pid")):
+                # En curso en otro worker: se guardará (y podará) al terminar
+                continue
+            try:
+                os.unlink(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def submit(self, factories: dict, duels: int, seed: int = 0, mirror: bool = True) -> dict:
+        """Encola un torneo y devuelve el trabajo en estado ``queued``."""
+        _require_numpy()
+        if not 1 <= duels <= self.max_duels:
+            raise CombatError(f"'duels' debe estar entre 1 y {self.max_duels}")
+        if seed < 0:
+            # Se rechaza al encolar: en el hilo del trabajo acabaría como 'failed'
+            raise CombatError("'seed' no puede ser negativa")
+        job = {
+            "id": secrets.token_hex(_JOB_ID_LENGTH // 2),
+            "status": "queued",
+            "pid": os.getpid(),
+            "params": {"kinds": list(factories), "duels": duels, "seed": seed, "mirror": mirror},
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise SimulationBusyError(
+                    f"Ya hay {self._pending} simulaciones en cola o en ejecución (máximo {self.max_pending})")
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation")
+            executor = self._executor
+        try:
+            self._save(job)
+            executor.submit(self._run, dict(job), factories)
+        except BaseException:
+            self._done()
+            raise
+        return job
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, job: dict, factories: dict):
+        try:
+            job.update(status="running", started_at=time.time())
+            self._save(dict(job))
+            try:
+                result = run_tournament(factories, job["params"]["duels"], seed=job["params"]["seed"],
+                                        mirror=job["params"]["mirror"], **self.options)
+                job.update(status="done", result=result)
+            except Exception as e:
+                self.logger.exception("Error en la simulación %s", job["id"])
+                job.update(status="failed", error=str(e))
+            job["finished_at"] = time.time()
+            self._save(job)
+        finally:
+            self._done()
+
+    def get(self, job_id: str):
+        """Trabajo por id (de memoria o del directorio compartido), o None."""
+        if len(job_id) != _JOB_ID_LENGTH or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            with open(self.directory / f"{job_id}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def list(self) -> list:
+        """Trabajos recientes de este proceso, del más nuevo al más antiguo (sin resultados)."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [{key: value for key, value in job.items() if key != "result"} for job in reversed(jobs)]
+
+
+# Instancia global
+simulation_jobs = SimulationJobs()
+
+if hasattr(os, "register_at_fork"):
+    # Un solo hook para la instancia global (los hooks de fork no se pueden quitar)
+    os.register_at_fork(after_in_child=simulation_jobs._after_fork)
@@ -0,0 +1,34 @@
+"""Cursores opacos de paginación por clave (keyset).
+
+Un cursor es la clave de orden del último elemento de la página, junto con
+el criterio y el sentido del listado que lo emitió, en JSON y base64 url-safe.
+Lo usan el listado de imágenes y el almacén de personajes.
+"""
+import base64
+import json
+
+
+def encode_cursor(sort: str, descending: bool, key: tuple) -> str:
+    # El orden va dentro del cursor: solo vale para el listado que lo emitió
+    raw = json.dumps([sort, "desc" if descending else "asc", *key], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool, key_types) -> tuple:
+    """
+    Clave de orden de un cursor de ``encode_cursor``; ``key_types`` da los
+    tipos admitidos de cada elemento. Lanza ValueError si el cursor está mal
+    formado o pertenece a otro orden.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, direction, *key = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    if cursor_sort != sort or direction != ("desc" if descending else "asc"):
+        raise ValueError("El cursor pertenece a otro orden: pedir de nuevo la primera página")
+    # La clave se compara con la de los elementos: los tipos deben coincidir
+    if len(key) != len(key_types) or any(
+            isinstance(value, bool) or not isinstance(value, types) for value, types in zip(key, key_types)):
+        raise ValueError("Cursor inválido")
+    return tuple(key)
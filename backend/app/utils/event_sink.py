@@ -0,0 +1,150 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from ..interfaces.interfaces import IEventSink, get_event_sink
+
+
+class SampledEventSink(IEventSink):
+    """
+    Sink de eventos de acción con muestreo, buffer circular y volcado asíncrono.
+
+    ``emit`` no toma locks: el muestreo usa un contador atómico y el buffer es
+    un ``deque`` acotado cuyo ``append`` es atómico. Cuando el buffer está
+    lleno el evento más antiguo se descarta y se cuenta como perdido. Un hilo
+    en segundo plano vacía el buffer por lotes hacia un archivo o un logger.
+    """
+
+    def __init__(self, capacity: int = 4096, sample_rate: float = 1.0,
+                 flush_interval: float = 1.0, batch_size: int = 512,
+                 path: str = None, logger: logging.Logger = None):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate debe estar entre 0 y 1")
+        self.capacity = capacity
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.path = path
+        self.logger = logger or logging.getLogger("app.actions")
+
+        # Muestreo determinista: se acepta uno de cada ``_every`` eventos
+        self._every = 0 if sample_rate == 0 else max(1, round(1 / sample_rate))
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._buffer = deque(maxlen=capacity)
+
+        # Contadores de la ruta lenta (solo se tocan al descartar o volcar)
+        self._counter_lock = threading.Lock()
+        self._dropped = 0
+        self._flushed = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._closed = False
+        self._start()
+
+    def emit(self, origen: str, accion: str, mensaje: str) -> None:
+        every = self._every
+        if not every:
+            return
+        n = next(self._seq)
+        self._last_seq = n
+        if n % every:
+            return
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            with self._counter_lock:
+                self._dropped += 1
+        buffer.append((time.time(), origen, accion, mensaje))
+
+    def flush(self) -> int:
+        """Vuelca los eventos pendientes; devuelve cuántos se escribieron."""
+        total = 0
+        buffer = self._buffer
+        while buffer:
+            batch = []
+            try:
+                for _ in range(self.batch_size):
+                    batch.append(buffer.popleft())
+            except IndexError:
+                pass
+            if not batch:
+                break
+            self._write(batch)
+            total += len(batch)
+        if total:
+            with self._counter_lock:
+                self._flushed += total
+        return total
+
+    def _write(self, batch: list) -> None:
+        lines = "".join(
+            f"{ts:.6f}\t{origen}\t{accion}\t{mensaje}\n" for ts, origen, accion, mensaje in batch
+        )
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        else:
+            self.logger.info("%d eventos de acción\n%s", len(batch), lines.rstrip("\n"))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                self.logger.exception("Error volcando eventos de acción")
+        self.flush()
+
+    def _start(self) -> None:
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="action-event-flusher", daemon=True)
+        self._thread.start()
+
+    def _start_after_fork(self) -> None:
+        if not self._closed:
+            self._counter_lock = threading.Lock()
+            self._start()
+
+    def suspend(self) -> None:
+        """
+        Detiene el hilo de volcado tras escribir los eventos pendientes sin
+        cerrar el sink (p. ej. el maestro pre-fork): los hijos lo relanzan.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        self._thread = None
+
+    def close(self) -> None:
+        """Detiene el hilo de volcado tras escribir los eventos pendientes."""
+        self._closed = True
+        self.suspend()
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            dropped, flushed = self._dropped, self._flushed
+        seen = self._last_seq
+        return {
+            "sample_rate": self.sample_rate,
+            "capacity": self.capacity,
+            "seen": seen,
+            "sampled": seen // self._every if self._every else 0,
+            "buffered": len(self._buffer),
+            "dropped": dropped,
+            "flushed": flushed,
+        }
+
+
+def _after_fork_in_child():
+    # El hilo de volcado no sobrevive a fork(): se relanza solo el del sink
+    # instalado. Registrado una vez por módulo, no por cada sink creado
+    sink = get_event_sink()
+    if isinstance(sink, SampledEventSink):
+        sink._start_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,156 @@
+import hashlib
+import os
+import posixpath
+import threading
+from datetime import datetime, timezone
+
+from flask import Response, current_app, request, send_from_directory
+from werkzeug.exceptions import NotFound
+
+from .asset_pack import PackSlice, asset_packs, guess_mimetype
+from .image_manager import CAS_DIR, image_manager
+from .metrics import cache_requests, image_bytes
+
+
+# Política Cache-Control por categoría ("api" para respuestas JSON)
+DEFAULT_CACHE_CONTROL = {
+    "characters": "public, max-age=86400",
+    "avatars": "public, max-age=3600",
+    "ui": "public, max-age=86400",
+    "default": "public, max-age=3600",
+    "api": "no-cache",
+    # Blobs del almacén por contenido: la URL cambia si cambia el contenido
+    "immutable": "public, max-age=31536000, immutable",
+}
+
+
+class _EtagCache:
+    """ETags fuertes (hash del contenido) por archivo, válidos mientras no cambie su tamaño/mtime."""
+
+    def __init__(self):
+        self._etags = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, size: int, mtime: float) -> str:
+        cached = self._etags.get(path)
+        if cached is not None and cached[0] == size and cached[1] == mtime:
+            cache_requests.inc(("etag", "hit"))
+            return cached[2]
+        cache_requests.inc(("etag", "miss"))
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        etag = f"sha256-{digest.hexdigest()[:32]}"
+        with self._lock:
+            self._etags[path] = (size, mtime, etag)
+        return etag
+
+
+file_etags = _EtagCache()
+
+
+def etag_for_bytes(payload: bytes) -> str:
+    """ETag fuerte para un cuerpo ya codificado."""
+    return f"sha256-{hashlib.sha256(payload).hexdigest()[:32]}"
+
+
+def cache_control_for(category: str) -> str:
+    policy = current_app.config.get("CACHE_CONTROL") or DEFAULT_CACHE_CONTROL
+    return policy.get(category) or policy.get("default") or DEFAULT_CACHE_CONTROL["default"]
+
+
+def is_not_modified(etag: str, last_modified: float = None) -> bool:
+    """
+    Evalúa If-None-Match / If-Modified-Since de la petición actual.
+    If-None-Match tiene prioridad; se compara de forma débil como indica RFC 9110.
+    """
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag
+    elif last_modified is not None and request.if_modified_since is not None:
+        matched = int(last_modified) <= request.if_modified_since.timestamp()
+    else:
+        return False
+    cache_requests.inc(("http_conditional", "hit" if matched else "miss"))
+    return matched
+
+
+def not_modified_response(etag: str, cache_control: str, weak: bool = False,
+                          last_modified: float = None) -> Response:
+    response = Response(status=304)
+    response.set_etag(etag, weak=weak)
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    return response
+
+
+def with_validators(response: Response, etag: str, cache_control: str, weak: bool = False,
+                    last_modified: float = None) -> Response:
+    """Añade ETag, Last-Modified y Cache-Control a una respuesta completa."""
+    response.set_etag(etag, weak=weak)
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc)
+    return response
+
+
+def send_image(category: str, filename: str) -> Response:
+    """
+    Sirve una imagen de ``category`` con validadores HTTP.
+
+    La existencia se resuelve con el índice en memoria y el tamaño/mtime con
+    un ``stat`` del archivo en cada petición (el índice no ve las
+    sobrescrituras en el sitio): ETag, Last-Modified y la elección entre
+    paquete y archivo suelto dependen del contenido actual. Lanza NotFound si
+    la imagen no existe.
+    """
+    rel = posixpath.normpath(str(filename).replace("\\", "/").lstrip("/"))
+    if rel.startswith("..") or rel == ".":
+        raise NotFound()
+
+    base = image_manager.get_image_path(category)
+    if category in image_manager.categories():
+        info = image_manager.stat_file(category, rel)
+        if info is None:
+            raise NotFound()
+        size, mtime = info
+    else:
+        try:
+            st = os.stat(base / rel)
+        except OSError:
+            raise NotFound()
+        size, mtime = st.st_size, st.st_mtime
+
+    # Preferir el paquete mmap salvo que el archivo suelto haya cambiado desde
+    # que se empaquetó (size y mtime son del stat de esta petición)
+    pack = asset_packs.get(category)
+    entry = pack.lookup(rel, size, mtime) if pack is not None else None
+    if entry is not None:
+        etag = f"sha256-{entry[3][:32]}"
+    else:
+        etag = file_etags.get(str(base / rel), size, mtime)
+
+    cache_control = cache_control_for("immutable" if rel.startswith(CAS_DIR + "/") else category)
+    if is_not_modified(etag, mtime):
+        return not_modified_response(etag, cache_control, last_modified=mtime)
+
+    if entry is not None and not request.range:
+        response = _pack_response(pack, entry, rel)
+        source = "pack"
+    else:
+        response = send_from_directory(str(base), rel, etag=False)
+        source = "file"
+    image_bytes.inc((category, source), response.content_length or 0)
+    return with_validators(response, etag, cache_control, last_modified=mtime)
+
+
+def _pack_response(pack, entry, rel: str) -> Response:
+    """Respuesta servida desde el paquete según ASSET_PACK_BODY (bytes|memoryview|sendfile)."""
+    mode = current_app.config.get("ASSET_PACK_BODY", "bytes")
+    body = PackSlice(pack, entry, as_bytes=mode != "memoryview")
+    if mode == "sendfile":
+        body = body.file_wrapper(request.environ) or body
+    response = Response(body, mimetype=guess_mimetype(rel), direct_passthrough=True)
+    response.content_length = entry[1]
+    return response
@@ -1,11 +1,131 @@
 import os
 import json
+import bisect
+import hashlib
+import posixpath
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+from .cursors import decode_cursor, encode_cursor
+from .tracing import traced
+
+try:  # Bloqueo entre procesos del manifiesto de nombres (solo POSIX)
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+# Segundos entre comprobaciones de mtime de directorios del índice
+DEFAULT_REFRESH_INTERVAL = 2.0
+
+# Almacén direccionado por contenido de las subidas, dentro de cada categoría
+CAS_DIR = "_cas"
+CAS_MANIFEST = "names.json"
+# Los directorios ocultos (temporales de subida) no se indexan
+CAS_INCOMING = ".incoming"
+UPLOAD_CHUNK_SIZE = 64 * 1024
+DEFAULT_UPLOAD_MAX_BYTES = 10 * 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Excepción lanzada cuando una subida supera el tamaño máximo permitido."""
+    pass
+
+
+class _CategoryIndex:
+    """Índice en memoria de los archivos de una categoría de imágenes."""
+
+    __slots__ = ("base", "files", "dirs", "subdirs", "top_level", "version", "checked_at")
+
+    def __init__(self, base: Path, version: int = 0):
+        self.base = base
+        self.files = {}     # ruta relativa posix -> (tamaño, mtime)
+        self.dirs = {}      # ruta absoluta de directorio -> mtime_ns
+        self.subdirs = {}   # ruta relativa de directorio ('' = raíz) -> subdirectorios
+        self.top_level = []
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def scan(self):
+        """Recorre el directorio base una sola vez y rellena el índice."""
+        pending = [(str(self.base), "")]
+        while pending:
+            abs_dir, rel_dir = pending.pop()
+            try:
+                self.dirs[abs_dir] = os.stat(abs_dir).st_mtime_ns
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            children = self.subdirs.setdefault(rel_dir.rstrip("/"), [])
+            for entry in entries:
+                rel = f"{rel_dir}{entry.name}"
+                try:
+                    if entry.is_dir():
+                        if not entry.name.startswith('.'):
+                            children.append(entry.name)
+                            pending.append((entry.path, rel + "/"))
+                    elif entry.is_file():
+                        st = entry.stat()
+                        self.files[rel] = (st.st_size, st.st_mtime)
+                        if not rel_dir:
+                            self.top_level.append(entry.name)
+                except OSError:
+                    continue
+
+    def is_stale(self) -> bool:
+        """
+        True si algún directorio indexado cambió (o desapareció) desde el escaneo.
+
+        Solo detecta altas, bajas y renombrados: sobrescribir un archivo en su
+        sitio no cambia el mtime del directorio (ver ``ImagePathManager.stat_file``).
+        """
+        for abs_dir, mtime_ns in self.dirs.items():
+            try:
+                if os.stat(abs_dir).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        # Directorio base creado después de construir el índice
+        return not self.dirs and self.base.exists()
+
+
+class _Listing:
+    """Listado de una categoría ordenado por nombre, tamaño y mtime (derivado del índice)."""
+
+    SORT_KEYS = ("name", "size", "mtime")
+
+    __slots__ = ("version", "orders")
+
+    def __init__(self, version: int, items: list):
+        # items: (nombre, ruta web, tamaño, mtime)
+        self.version = version
+        self.orders = {}
+        for position, key in enumerate(self.SORT_KEYS):
+            if key == "name":
+                ordered = sorted(items, key=lambda item: item[0])
+                keys = [(item[0], item[0]) for item in ordered]
+            else:
+                field = position + 1
+                ordered = sorted(items, key=lambda item: (item[field], item[0]))
+                keys = [(item[field], item[0]) for item in ordered]
+            self.orders[key] = (keys, ordered)
+
+
+# Tipos de cada elemento de la clave de orden (valor, nombre) por criterio
+_CURSOR_TYPES = {
+    "name": ((str,), (str,)),
+    "size": ((int,), (str,)),
+    "mtime": ((int, float), (str,)),
+}
+
+
 class ImagePathManager:
     """Maneja las rutas de imágenes compartidas entre frontend y backend"""
     
-    def __init__(self):
+    def __init__(self, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
         # Intentar detectar la raíz del proyecto buscando shared-config.json o la carpeta 'public'
         candidate = Path(__file__).parent.parent.parent
         # Subir hasta 4 niveles buscando pistas de raíz
@@ -19,6 +139,21 @@ class ImagePathManager:
         self.project_root = candidate
         self.config_path = self.project_root / "shared-config.json"
         self.config = self._load_config()
+
+        # Índice de archivos por categoría; se construye una vez y se refresca
+        # comprobando el mtime de los directorios cada ``refresh_interval`` s.
+        self.refresh_interval = refresh_interval
+        self._base_paths = {}
+        self._index = {}
+        self._index_lock = threading.Lock()
+
+        # Manifiestos nombre original -> blob del almacén por contenido,
+        # cacheados junto a la versión del índice con la que se leyeron
+        self._cas_names = {}
+        self._cas_lock = threading.Lock()
+
+        # Listados ordenados por categoría, cacheados por versión del índice
+        self._listings = {}
     
     def _load_config(self):
         """Carga la configuración compartida"""
@@ -37,6 +172,7 @@ class ImagePathManager:
                 }
             }
     
+    @traced("ImagePathManager.get_image_path", "images")
     def get_image_path(self, category: str, filename: str = None):
         """
         Obtiene la ruta completa de una imagen
@@ -48,6 +184,16 @@ class ImagePathManager:
         Returns:
             Path completo de la imagen
         """
+        base_path = self._base_paths.get(category)
+        if base_path is None:
+            base_path = self._resolve_base_path(category)
+            self._base_paths[category] = base_path
+        if filename:
+            return base_path / filename
+        return base_path
+
+    def _resolve_base_path(self, category: str) -> Path:
+        """Resuelve el directorio de una categoría a partir del config."""
         # Leer rutas desde el config si existe, sino usar convención por defecto
         try:
             paths = self.config.get('paths', {}).get('images', {})
@@ -63,11 +209,103 @@ class ImagePathManager:
         except Exception:
             rel = f'./public/images/{category}'
 
-        base_path = (self.project_root / rel).resolve()
-        if filename:
-            return base_path / filename
-        return base_path
+        return (self.project_root / rel).resolve()
+
+    def _get_index(self, category: str) -> _CategoryIndex:
+        """Devuelve el índice de la categoría, reconstruyéndolo si está obsoleto."""
+        index = self._index.get(category)
+        now = time.monotonic()
+        if index is not None and now - index.checked_at < self.refresh_interval:
+            return index
+
+        with self._index_lock:
+            index = self._index.get(category)
+            if index is not None and now - index.checked_at < self.refresh_interval:
+                return index
+            if index is None or index.is_stale():
+                version = index.version + 1 if index is not None else 0
+                index = _CategoryIndex(self.get_image_path(category), version)
+                index.scan()
+                self._index[category] = index
+            else:
+                index.checked_at = now
+            return index
+
+    def categories(self) -> list:
+        """Categorías de imágenes declaradas en el config."""
+        paths = self.config.get('paths', {}).get('images', {})
+        return [c for c in paths if c != 'root'] or ['characters', 'avatars', 'ui']
+
+    def build_index(self, categories=None):
+        """
+        Construye el índice de las categorías indicadas (todas las del config
+        si no se indica ninguna). Pensado para llamarse al arrancar la app.
+        """
+        if categories is None:
+            categories = self.categories()
+        for category in categories:
+            self._get_index(category)
+
+    def invalidate(self, category: str = None):
+        """Descarta el índice de una categoría (o de todas) para forzar un reescaneo."""
+        with self._index_lock:
+            if category is None:
+                for index in self._index.values():
+                    index.checked_at = float("-inf")
+                    index.dirs.clear()
+            elif category in self._index:
+                self._index[category].checked_at = float("-inf")
+                self._index[category].dirs.clear()
+
+    def index_version(self, category: str) -> int:
+        """Versión del índice de la categoría; cambia cada vez que cambia su contenido."""
+        return self._get_index(category).version
+
+    @traced("ImagePathManager.file_info", "images")
+    def file_info(self, category: str, filename: str):
+        """
+        Devuelve (tamaño, mtime) de un archivo indexado, o None si no existe.
+        No toca el disco salvo el refresco periódico del índice.
+        """
+        path = posixpath.normpath(str(filename).replace('\\', '/').lstrip('/'))
+        return self._get_index(category).files.get(path)
+
+    def stat_file(self, category: str, filename: str):
+        """
+        Devuelve (tamaño, mtime) actuales de un archivo indexado, leídos del disco.
+
+        Para validadores HTTP y decisiones que dependen del contenido: el
+        índice no ve las sobrescrituras en el sitio. Si el archivo cambió se
+        actualiza su entrada (y la versión del índice). Devuelve None si no
+        está indexado o ya no existe.
+        """
+        path = posixpath.normpath(str(filename).replace('\\', '/').lstrip('/'))
+        index = self._get_index(category)
+        cached = index.files.get(path)
+        if cached is None:
+            return None
+        file_path = index.base / path
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        info = (st.st_size, st.st_mtime)
+        if info != cached:
+            self._index_file(category, file_path)
+        return info
+
+    def indexed_files(self, category: str) -> dict:
+        """Copia del índice de la categoría: ruta relativa -> (tamaño, mtime)."""
+        return dict(self._get_index(category).files)
+
+    def generation(self) -> int:
+        """
+        Contador global que aumenta cuando cambia cualquier categoría indexada.
+        Permite a cachés derivadas (catálogo, ETags) detectar cambios de assets.
+        """
+        return sum(self._get_index(category).version for category in list(self._index))
     
+    @traced("ImagePathManager.get_web_path", "images")
     def get_web_path(self, category: str, filename: str):
         """
         Obtiene la ruta web para usar en el frontend
@@ -86,13 +324,14 @@ class ImagePathManager:
         else:
             path = str(filename).replace('\\', '/').lstrip('/')
 
-        # Verificar existencia en disco: si no existe, devolver None (la clase debe encargarse)
-        try:
-            fs_path = self.get_image_path(category, path)
-            if not fs_path.exists():
-                return None
-        except Exception:
-            # Si hay algún error al resolver la ruta, devolver None
+        # Los nombres subidos apuntan a su blob inmutable del almacén por contenido
+        path = posixpath.normpath(path)
+        blob = self._cas_manifest(category).get(path)
+        if blob is not None:
+            path = blob
+
+        # Verificar existencia en el índice: si no existe, devolver None (la clase debe encargarse)
+        if path not in self._get_index(category).files:
             return None
 
         return f"/images/{category}/{path}"
@@ -111,8 +350,169 @@ class ImagePathManager:
         
         with open(image_path, 'wb') as f:
             f.write(file_data)
-        
+
+        self._index_file(category, image_path)
         return self.get_web_path(category, filename)
+
+    def save_image_stream(self, category: str, filename: str, stream,
+                          max_bytes: int = DEFAULT_UPLOAD_MAX_BYTES) -> dict:
+        """
+        Guarda una subida en el almacén direccionado por contenido.
+
+        El contenido se copia por bloques a un temporal mientras se calcula su
+        SHA-256, y luego se renombra de forma atómica a
+        ``_cas/<aa>/<sha256><ext>``. La deduplicación usa solo el hash: un
+        contenido repetido se guarda una sola vez aunque llegue con otra
+        extensión (``.jpg``/``.jpeg``) y reutiliza el blob existente. El nombre original queda asociado al blob en el manifiesto, así
+        que ``get_web_path(category, filename)`` devuelve la URL inmutable.
+
+        Args:
+            category: 'characters', 'avatars', 'ui'
+            filename: nombre original del archivo
+            stream: objeto con ``read(n)``
+            max_bytes: tamaño máximo aceptado
+
+        Raises:
+            UploadTooLarge: si el contenido supera ``max_bytes``
+        """
+        name = posixpath.normpath(str(filename).replace('\\', '/').lstrip('/'))
+        if name.startswith('..') or name.startswith(CAS_DIR + '/') or name == CAS_DIR:
+            raise ValueError("Nombre de archivo inválido")
+
+        cas_root = self.get_image_path(category) / CAS_DIR
+        incoming = cas_root / CAS_INCOMING
+        incoming.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=str(incoming), suffix=".part")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"La imagen supera el máximo de {max_bytes} bytes")
+                    digest.update(chunk)
+                    f.write(chunk)
+
+            sha = digest.hexdigest()
+            with self._cas_locked(cas_root):
+                blob_path = self._cas_blob(cas_root, sha)
+                deduplicated = blob_path is not None
+                if deduplicated:
+                    os.unlink(tmp)
+                else:
+                    blob_path = cas_root / sha[:2] / f"{sha}{Path(name).suffix.lower()}"
+                    blob_path.parent.mkdir(parents=True, exist_ok=True)
+                    os.chmod(tmp, 0o644)
+                    os.replace(tmp, blob_path)
+                blob_rel = f"{CAS_DIR}/{sha[:2]}/{blob_path.name}"
+                self._index_file(category, blob_path)
+                self._cas_bind(category, name, blob_rel)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+        return {
+            "path": f"/images/{category}/{blob_rel}",
+            "sha256": sha,
+            "size": size,
+            "deduplicated": deduplicated,
+            "filename": name,
+        }
+
+    def _cas_manifest(self, category: str) -> dict:
+        """Manifiesto nombre -> blob de la categoría (se relee solo si cambió el índice)."""
+        version = self._get_index(category).version
+        cached = self._cas_names.get(category)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        manifest_path = self.get_image_path(category) / CAS_DIR / CAS_MANIFEST
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                names = json.load(f)
+        except (OSError, ValueError):
+            names = {}
+        self._cas_names[category] = (version, names)
+        return names
+
+    @contextmanager
+    def _cas_locked(self, cas_root: Path):
+        """Exclusión entre hilos y procesos sobre los blobs y el manifiesto."""
+        with self._cas_lock, open(cas_root / CAS_INCOMING / "names.lock", 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    @staticmethod
+    def _cas_blob(cas_root: Path, sha: str):
+        """Blob ya guardado con ese hash, sea cual sea su extensión (o None)."""
+        try:
+            with os.scandir(cas_root / sha[:2]) as entries:
+                for entry in entries:
+                    if posixpath.splitext(entry.name)[0] == sha:
+                        return Path(entry.path)
+        except FileNotFoundError:
+            pass
+        return None
+
+    def _cas_bind(self, category: str, name: str, blob_rel: str):
+        """
+        Asocia ``name`` a ``blob_rel`` reescribiendo el manifiesto de forma atómica.
+
+        Debe llamarse dentro de ``_cas_locked``.
+        """
+        cas_root = self.get_image_path(category) / CAS_DIR
+        manifest_path = cas_root / CAS_MANIFEST
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                names = json.load(f)
+        except (OSError, ValueError):
+            names = {}
+        names[name] = blob_rel
+        fd, tmp = tempfile.mkstemp(dir=str(cas_root / CAS_INCOMING), suffix=".json")
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(names, f, ensure_ascii=False)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, manifest_path)
+        self._index_file(category, manifest_path)
+        self._cas_names[category] = (self._get_index(category).version, names)
+
+    def _index_file(self, category: str, image_path: Path):
+        """Añade (o actualiza) un archivo recién escrito en el índice de su categoría."""
+        index = self._get_index(category)
+        with self._index_lock:
+            try:
+                rel = image_path.relative_to(index.base).as_posix()
+                st = image_path.stat()
+            except (ValueError, OSError):
+                return
+            if rel not in index.files and '/' not in rel:
+                index.top_level.append(rel)
+            index.files[rel] = (st.st_size, st.st_mtime)
+            # Registrar subdirectorios nuevos (p. ej. _cas/<aa>)
+            parent = ""
+            for part in rel.split('/')[:-1]:
+                children = index.subdirs.setdefault(parent, [])
+                if part not in children:
+                    children.append(part)
+                parent = f"{parent}/{part}" if parent else part
+            index.subdirs.setdefault(parent, [])
+            index.version += 1
+            # Registrar los nuevos mtime para que el refresco no reescanee
+            directory = image_path.parent
+            while True:
+                try:
+                    index.dirs[str(directory)] = directory.stat().st_mtime_ns
+                except OSError:
+                    break
+                if directory == index.base or index.base not in directory.parents:
+                    break
+                directory = directory.parent
     
     def list_images(self, category: str):
         """
@@ -124,27 +524,123 @@ class ImagePathManager:
         Returns:
             Lista de nombres de archivos
         """
-        path = self.get_image_path(category)
-        if path.exists():
-            return [f.name for f in path.iterdir() if f.is_file()]
-        return []
+        names = list(self._get_index(category).top_level)
+        seen = set(names)
+        names.extend(n for n in self._cas_manifest(category) if n not in seen)
+        return names
+
+    def _get_listing(self, category: str) -> _Listing:
+        index = self._get_index(category)
+        listing = self._listings.get(category)
+        if listing is not None and listing.version == index.version:
+            return listing
+        manifest = self._cas_manifest(category)
+        items = []
+        for name in self.list_images(category):
+            rel = manifest.get(name, name)
+            info = index.files.get(rel)
+            if info is not None:
+                items.append((name, f"/images/{category}/{rel}", info[0], info[1]))
+        listing = _Listing(index.version, items)
+        self._listings[category] = listing
+        return listing
+
+    @traced("ImagePathManager.list_images_page", "images")
+    def list_images_page(self, category: str, limit: int = 100, cursor: str = None,
+                         prefix: str = None, extensions=None, sort: str = "name",
+                         descending: bool = False) -> dict:
+        """
+        Página de imágenes de una categoría servida íntegramente desde memoria.
+
+        Args:
+            category: 'characters', 'avatars', 'ui'
+            limit: tamaño máximo de la página
+            cursor: valor ``next_cursor`` de la página anterior
+            prefix: filtrar por prefijo del nombre
+            extensions: iterable de extensiones ('.png', ...) a incluir
+            sort: 'name', 'size' o 'mtime'
+            descending: orden descendente
+
+        Returns:
+            dict con ``items`` (nombre, ruta, tamaño, mtime), ``next_cursor`` y ``total``
+        """
+        if sort not in _Listing.SORT_KEYS:
+            raise ValueError(f"Orden inválido: '{sort}'")
+        keys, ordered = self._get_listing(category).orders[sort]
+        if descending:
+            keys, ordered = keys[::-1], ordered[::-1]
+
+        exts = {e.lower() if e.startswith('.') else f".{e.lower()}" for e in extensions} if extensions else None
+
+        def matches(item):
+            if prefix and not item[0].startswith(prefix):
+                return False
+            return exts is None or os.path.splitext(item[0])[1].lower() in exts
+
+        # Con orden por nombre el prefijo acota el rango por búsqueda binaria
+        start, stop = 0, len(ordered)
+        if prefix and sort == "name" and not descending:
+            start = bisect.bisect_left(keys, (prefix, prefix))
+            stop = bisect.bisect_left(keys, (prefix + '\uffff', prefix + '\uffff'))
+
+        if cursor:
+            after = decode_cursor(cursor, sort, descending, _CURSOR_TYPES[sort])
+            if descending:
+                # keys está invertida: buscar en la original y reflejar el índice
+                original = keys[::-1]
+                start = max(start, len(original) - bisect.bisect_left(original, after))
+            else:
+                start = max(start, bisect.bisect_right(keys, after))
+
+        page = []
+        next_cursor = None
+        position = start
+        while position < stop:
+            item = ordered[position]
+            position += 1
+            if not matches(item):
+                continue
+            if len(page) == limit:
+                next_cursor = encode_cursor(sort, descending, self._last_key(page[-1], sort))
+                break
+            page.append(item)
+
+        total = sum(1 for item in ordered if matches(item)) if (prefix or exts) else len(ordered)
+        return {
+            "items": [
+                {"name": name, "path": path, "size": size, "mtime": mtime}
+                for name, path, size, mtime in page
+            ],
+            "next_cursor": next_cursor,
+            "total": total,
+        }
+
+    @staticmethod
+    def _last_key(item, sort: str) -> tuple:
+        if sort == "name":
+            return (item[0], item[0])
+        return (item[2] if sort == "size" else item[3], item[0])
 
     # Helpers específicos para 'characters' con subcarpetas tipo 'personajes/<clase>/<personaje>'
     def _characters_base(self):
         """Devuelve el directorio base de characters (respetando posible subfolder 'personajes')."""
         base = self.get_image_path('characters')
         # Si hay una carpeta 'personajes' dentro, usarla
-        p = base / 'personajes'
-        if p.exists() and p.is_dir():
-            return p
+        if self._characters_rel() == 'personajes':
+            return base / 'personajes'
         return base
 
+    def _characters_rel(self) -> str:
+        """Ruta relativa (dentro de characters) de la carpeta de clases, según el índice."""
+        if 'personajes' in self._get_index('characters').subdirs.get('', []):
+            return 'personajes'
+        return ''
+
     def list_classes(self):
         """Lista las 'clases' (ej: elfo, enano) dentro de characters/personajes o characters."""
-        base = self._characters_base()
-        if not base.exists():
-            return []
-        return [d.name for d in base.iterdir() if d.is_dir()]
+        rel = self._characters_rel()
+        classes = self._get_index('characters').subdirs.get(rel, [])
+        return [name for name in classes if name != CAS_DIR]
 
     def list_characters(self, class_name: str):
         """Lista carpetas de personajes dentro de una clase específica.
@@ -154,10 +650,9 @@ class ImagePathManager:
         Returns:
             lista de nombres de carpetas de personajes
         """
-        base = self._characters_base() / class_name
-        if not base.exists() or not base.is_dir():
-            return []
-        return [d.name for d in base.iterdir() if d.is_dir()]
+        rel = self._characters_rel()
+        key = f"{rel}/{class_name}" if rel else class_name
+        return list(self._get_index('characters').subdirs.get(key, []))
 
     def get_character_image_path(self, class_name: str, character_folder: str, filename: str = None):
         """Construye la ruta a una imagen de personaje dada su clase y carpeta.
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+from ..patterns.singleton_pool import Pool
+
+
+class Readiness:
+    """
+    Estado de disponibilidad del proceso para ``/api/ready``.
+
+    ``starting`` hasta terminar el calentamiento, ``ready`` mientras acepta
+    tráfico y ``draining`` cuando el worker se está reciclando o apagando.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "starting"
+        self.worker = None
+        self.started_at = time.time()
+        self.warm_up = {}
+        self.requests = 0
+        self.max_requests = None
+
+    def mark_ready(self, worker: int = None, max_requests: int = None):
+        with self._lock:
+            self.status = "ready"
+            if worker is not None:
+                self.worker = worker
+                self.started_at = time.time()
+                self.requests = 0
+            self.max_requests = max_requests
+
+    def mark_draining(self):
+        with self._lock:
+            self.status = "draining"
+
+    def count_request(self) -> int:
+        with self._lock:
+            self.requests += 1
+            return self.requests
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.status == "ready",
+                "status": self.status,
+                "pid": os.getpid(),
+                "worker": self.worker,
+                "uptime": round(time.time() - self.started_at, 3),
+                "requests": self.requests,
+                "max_requests": self.max_requests,
+                "warm_up": dict(self.warm_up),
+            }
+
+
+def warm_up(app, factories: dict) -> dict:
+    """
+    Deja el proceso listo antes de aceptar tráfico: carga cada fábrica en el
+    pool, crea un juego de partes por raza y recorre las rutas de lectura
+    para compilar el enrutado y rellenar las cachés.
+
+    Devuelve los tiempos (en ms) de cada fase.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    pool = Pool()
+    for Factory in factories.values():
+        fabrica = pool.get_factory(Factory)
+        fabrica.devolver_personaje(*fabrica.crear_personaje())
+    timings["factories"] = round((time.perf_counter() - start) * 1000, 3)
+
+    start = time.perf_counter()
+    client = app.test_client()
+    client.get("/api/factories")
+    for kind in factories:
+        client.get(f"/api/character/{kind}/info")
+    for category in ("characters", "avatars", "ui"):
+        client.get(f"/api/images/{category}")
+    timings["routes"] = round((time.perf_counter() - start) * 1000, 3)
+
+    readiness.warm_up = timings
+    return timings
+
+
+# Instancia global (una por proceso; los workers la heredan al hacer fork)
+readiness = Readiness()
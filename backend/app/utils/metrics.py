@@ -0,0 +1,418 @@
+"""Métricas en formato de exposición de texto de Prometheus.
+
+Los contadores, gauges e histogramas se reparten en franjas (stripes) con su
+propio lock; cada hilo escribe siempre en la misma franja, así que bajo
+varios hilos las escrituras casi nunca compiten. La lectura (``/metrics``)
+suma todas las franjas.
+
+Con varios workers y estado compartido del pool (``POOL_STATE="sqlite"``)
+cada proceso publica un snapshot de sus métricas en cada sincronización y
+``/metrics`` suma el propio con los de los demás: cualquier worker que
+atienda el scrape devuelve el total del servidor.
+"""
+import bisect
+import itertools
+import threading
+import time
+
+from flask import Response, g, request
+
+
+# Límites de los histogramas de latencia (segundos)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_STRIPES = 16
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Stripe:
+    __slots__ = ("lock", "values", "histograms")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.histograms = {}
+
+
+class _Metric:
+    __slots__ = ("registry", "name", "help", "type", "labelnames", "buckets")
+
+    def __init__(self, registry, name, help_text, metric_type, labelnames=(), buckets=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.type = metric_type
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+
+
+class Counter(_Metric):
+    def inc(self, labels: tuple = (), amount: float = 1):
+        stripe = self.registry._stripe()
+        key = (self.name, labels)
+        with stripe.lock:
+            stripe.values[key] = stripe.values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    """Gauge sumable entre franjas (p. ej. peticiones en curso)."""
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    def observe(self, labels: tuple, value: float):
+        stripe = self.registry._stripe()
+        key = (self.name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with stripe.lock:
+            data = stripe.histograms.get(key)
+            if data is None:
+                # Un contador por límite + el de +Inf, luego suma y total
+                data = stripe.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        if value == int(value) and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+    return str(value)
+
+
+class _Families:
+    """
+    Series ya leídas y sumables: las del registro, las de los colectores y
+    las de los snapshots de otros procesos. Ofrece la misma lectura que el
+    registro (``value``/``labels``) a los colectores derivados.
+    """
+
+    def __init__(self):
+        self.meta = {}  # nombre -> [tipo, ayuda, etiquetas, límites]
+        self.values = {}
+        self.histograms = {}
+
+    def declare(self, name, metric_type, help_text, labelnames=(), buckets=None):
+        meta = self.meta.get(name)
+        if meta is None:
+            self.meta[name] = [metric_type, help_text, tuple(labelnames), buckets]
+        elif labelnames and not meta[2]:
+            meta[2] = tuple(labelnames)
+
+    def add_samples(self, name, metric_type, help_text, samples, replace: bool = False):
+        """Añade muestras de colector: ``[(etiquetas: dict, valor)]``."""
+        names = ()
+        for labels, value in samples:
+            names = tuple(labels)
+            key = (name, tuple(str(v) for v in labels.values()))
+            self.values[key] = value if replace else self.values.get(key, 0) + value
+        self.declare(name, metric_type, help_text, names)
+
+    def merge(self, snapshot: dict):
+        """Suma un snapshot de ``MetricsRegistry.snapshot()`` (de otro proceso)."""
+        for name, metric_type, help_text, labelnames, buckets in snapshot["meta"]:
+            self.declare(name, metric_type, help_text, labelnames, tuple(buckets) if buckets else None)
+        for name, labels, value in snapshot["values"]:
+            key = (name, tuple(labels))
+            self.values[key] = self.values.get(key, 0) + value
+        for name, labels, data in snapshot["histograms"]:
+            key = (name, tuple(labels))
+            merged = self.histograms.get(key)
+            if merged is None:
+                self.histograms[key] = list(data)
+            elif len(merged) == len(data):
+                for i, count in enumerate(data):
+                    merged[i] += count
+
+    def to_dict(self) -> dict:
+        return {
+            "meta": [[name, *meta[:3], list(meta[3]) if meta[3] else None] for name, meta in self.meta.items()],
+            "values": [[name, list(labels), value] for (name, labels), value in self.values.items()],
+            "histograms": [[name, list(labels), data] for (name, labels), data in self.histograms.items()],
+        }
+
+    def value(self, name: str, labels: tuple = ()):
+        return self.values.get((name, tuple(labels)), 0)
+
+    def labels(self, name: str) -> list:
+        return sorted(labels for metric, labels in self.values if metric == name)
+
+    def render(self) -> str:
+        lines = []
+        for name, (metric_type, help_text, labelnames, buckets) in self.meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if metric_type == "histogram":
+                for (metric, labels), data in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(buckets + (float("inf"),), data):
+                        cumulative += count
+                        le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+                    label_text = _format_labels(labelnames, labels)
+                    lines.append(f"{name}_sum{label_text} {_format_value(data[-2])}")
+                    lines.append(f"{name}_count{label_text} {data[-1]}")
+            else:
+                for (metric, labels), value in sorted(self.values.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """Registro de métricas con escrituras repartidas por franjas."""
+
+    def __init__(self, stripes: int = DEFAULT_STRIPES):
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._next_stripe = itertools.count()
+        self._local = threading.local()
+        self._metrics = {}
+        self._collectors = []
+        self._derived = []
+        self._lock = threading.Lock()
+
+    def _stripe(self) -> _Stripe:
+        stripe = getattr(self._local, "stripe", None)
+        if stripe is None:
+            # Asignación rotatoria: cada hilo nuevo usa la siguiente franja
+            stripe = self._local.stripe = self._stripes[next(self._next_stripe) % len(self._stripes)]
+        return stripe
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames=()) -> Counter:
+        return self._register(Counter(self, name, help_text, "counter", labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(self, name, help_text, "gauge", labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help_text, "histogram", labelnames, tuple(buckets)))
+
+    def register_collector(self, collector, derived: bool = False):
+        """
+        Añade una función que, en cada lectura, devuelve métricas calculadas
+        al momento: iterable de ``(nombre, tipo, ayuda, [(etiquetas: dict, valor)])``.
+
+        Sus valores se suman entre procesos. Los que no son sumables (p. ej.
+        proporciones) se registran con ``derived=True``: la función recibe
+        las series ya sumadas, con ``value``/``labels``, y se calcula después.
+        """
+        with self._lock:
+            collectors = self._derived if derived else self._collectors
+            if collector not in collectors:
+                collectors.append(collector)
+
+    def reset(self):
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.values.clear()
+                stripe.histograms.clear()
+
+    def _merged(self):
+        values = {}
+        histograms = {}
+        for stripe in self._stripes:
+            with stripe.lock:
+                for key, value in stripe.values.items():
+                    values[key] = values.get(key, 0) + value
+                for key, data in stripe.histograms.items():
+                    merged = histograms.get(key)
+                    if merged is None:
+                        histograms[key] = list(data)
+                    else:
+                        for i, count in enumerate(data):
+                            merged[i] += count
+        return values, histograms
+
+    def value(self, name: str, labels: tuple = ()):
+        """Valor actual de un contador o gauge (suma de las franjas)."""
+        total = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                total += stripe.values.get((name, labels), 0)
+        return total
+
+    def labels(self, name: str) -> list:
+        """Combinaciones de etiquetas con valor de un contador o gauge."""
+        found = set()
+        for stripe in self._stripes:
+            with stripe.lock:
+                found.update(labels for metric, labels in stripe.values if metric == name)
+        return sorted(found)
+
+    def _collect(self) -> _Families:
+        values, histograms = self._merged()
+        families = _Families()
+        for metric in list(self._metrics.values()):
+            families.declare(metric.name, metric.type, metric.help, metric.labelnames, metric.buckets)
+        families.values = values
+        families.histograms = histograms
+        for collector in list(self._collectors):
+            for name, metric_type, help_text, samples in collector():
+                families.add_samples(name, metric_type, help_text, samples)
+        return families
+
+    def snapshot(self) -> dict:
+        """Series de este proceso (sin las derivadas) en un dict serializable a JSON."""
+        return self._collect().to_dict()
+
+    def render(self, others=()) -> str:
+        """Exposición de texto; ``others`` son snapshots de otros procesos que se suman."""
+        families = self._collect()
+        for snapshot in others:
+            families.merge(snapshot)
+        for collector in list(self._derived):
+            for name, metric_type, help_text, samples in list(collector(families)):
+                families.add_samples(name, metric_type, help_text, samples, replace=True)
+        return families.render()
+
+
+# Instancia global y métricas de la aplicación
+metrics = MetricsRegistry()
+
+# El total de peticiones por ruta/estado es el ``_count`` del histograma
+http_latency = metrics.histogram(
+    "fabrica_http_request_duration_seconds", "Latencia de las peticiones HTTP.", ("method", "route", "status"))
+http_in_flight = metrics.gauge(
+    "fabrica_http_requests_in_flight", "Peticiones HTTP en curso.")
+pool_exhausted = metrics.counter(
+    "fabrica_pool_exhausted_total", "Peticiones rechazadas con 429 por pool de objetos agotado.", ("kind",))
+image_bytes = metrics.counter(
+    "fabrica_image_bytes_served_total", "Bytes de imágenes enviados.", ("category", "source"))
+cache_requests = metrics.counter(
+    "fabrica_cache_requests_total", "Consultas a cachés por resultado.", ("cache", "result"))
+admission_requests = metrics.counter(
+    "fabrica_admission_requests_total", "Decisiones del control de admisión por raza y resultado.", ("kind", "result"))
+coalesce_requests = metrics.counter(
+    "fabrica_coalesce_requests_total", "Peticiones agrupadas por ruta y papel (leader, follower, cached, fallback).",
+    ("route", "result"))
+admission_wait = metrics.histogram(
+    "fabrica_admission_queue_wait_seconds", "Espera en la cola de admisión hasta obtener plaza.", ("kind",))
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _before_request():
+    g._metrics_start = time.perf_counter()
+    http_in_flight.inc()
+
+
+def _after_request(response):
+    start = g.pop("_metrics_start", None)
+    if start is not None:
+        labels = (request.method, _route_label(), str(response.status_code))
+        http_latency.observe(labels, time.perf_counter() - start)
+    return response
+
+
+def _teardown_request(exc):
+    # Excepción sin manejar: after_request no llegó a registrar la petición
+    start = g.pop("_metrics_start", None)
+    if start is not None:
+        labels = (request.method, _route_label(), "500")
+        http_latency.observe(labels, time.perf_counter() - start)
+    http_in_flight.dec()
+
+
+def _pool_collector():
+    from ..patterns.singleton_pool import Pool
+
+    # Solo este proceso: /metrics suma los snapshots de los demás workers
+    local = Pool().local_stats()
+    stats = local["stats"]
+    yield ("fabrica_pool_factory_lookups_total", "counter", "Búsquedas de fábrica en el pool singleton.",
+           [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])])
+    yield ("fabrica_pool_factory_evictions_total", "counter", "Fábricas desalojadas del pool.",
+           [({}, stats["evictions"])])
+    yield ("fabrica_pool_factories", "gauge", "Fábricas vivas en el pool.",
+           [({}, local["factory_count"])])
+
+    for key, metric_type, help_text in (
+        ("in_use", "gauge", "Objetos prestados por pool de partes."),
+        ("available", "gauge", "Objetos libres por pool de partes."),
+        ("waits", "counter", "Adquisiciones que tuvieron que esperar."),
+        ("timeouts", "counter", "Adquisiciones que agotaron el timeout."),
+        ("discarded", "counter", "Objetos descartados porque falló su reset."),
+    ):
+        samples = [
+            ({"factory": factory, "part": parte}, part_stats[key])
+            for factory, parts in sorted(local["object_pools"].items())
+            for parte, part_stats in parts.items()
+            if key in part_stats
+        ]
+        suffix = "_total" if metric_type == "counter" else ""
+        yield (f"fabrica_object_pool_{key}{suffix}", metric_type, help_text, samples)
+
+
+def _cache_collector():
+    from .sprite_atlas import sprite_renderer
+
+    sprite = sprite_renderer.stats()
+    yield ("fabrica_sprite_cache_requests_total", "counter", "Consultas a la caché de sprites.",
+           [({"result": "hit"}, sprite["hits"]), ({"result": "miss"}, sprite["misses"])])
+
+
+def _cache_ratio_collector(view):
+    counts = {}
+    for cache in ("http_conditional", "etag"):
+        for result in ("hit", "miss"):
+            counts[(cache, result)] = view.value("fabrica_cache_requests_total", (cache, result))
+    for result in ("hit", "miss"):
+        counts[("sprite", result)] = view.value("fabrica_sprite_cache_requests_total", (result,))
+
+    ratios = []
+    for cache in ("http_conditional", "etag", "sprite"):
+        hits, misses = counts[(cache, "hit")], counts[(cache, "miss")]
+        if hits + misses:
+            ratios.append(({"cache": cache}, round(hits / (hits + misses), 6)))
+    yield ("fabrica_cache_hit_ratio", "gauge", "Proporción de aciertos por caché.", ratios)
+
+
+def metrics_view():
+    from ..patterns.singleton_pool import Pool
+
+    others = [snapshot for _pid, snapshot in Pool().state.shared_view("metrics")]
+    return Response(metrics.render(others), content_type=CONTENT_TYPE, headers={"Cache-Control": "no-store"})
+
+
+def install(app, path: str = "/metrics"):
+    """Registra la instrumentación de peticiones y el endpoint de exposición."""
+    from ..patterns.singleton_pool import Pool
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    metrics.register_collector(_pool_collector)
+    metrics.register_collector(_cache_collector)
+    metrics.register_collector(_cache_ratio_collector, derived=True)
+    # Con estado compartido, cada worker publica sus series para los demás
+    Pool().state.share("metrics", metrics.snapshot)
+    app.add_url_rule(path, "metrics", metrics_view, methods=["GET"])
@@ -0,0 +1,430 @@
+"""Poblaciones de personajes con estadísticas numéricas (NumPy).
+
+``StatModel`` reúne las ``estadisticas`` que cada raza declara por parte en
+su JSON y ``generate`` produce en una sola pasada vectorizada un array
+estructurado con una fila por personaje: ``kind`` (índice en ``kinds``) y
+una columna ``float32`` por ``<parte>_<campo>``. Las filas quedan agrupadas
+por raza (``offsets``), de modo que filtrar por raza es tomar un rango. Con
+la misma semilla, el mismo modelo y los mismos pesos sale la misma población.
+
+Cada población se exporta por columnas: un ``.npy`` por columna más
+``meta.json`` en ``POPULATION_DIR/<nombre>/``. Al leerla las columnas se
+abren con mmap, así que muestrear o resumir no carga la población entera ni
+construye un dict por personaje.
+
+La generación es síncrona y está acotada: como mucho ``max_count`` filas
+por población, una generación a la vez por proceso y ``max_bytes`` en
+disco entre todas las poblaciones (contando las que se están escribiendo).
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+try:  # NumPy es opcional: sin él no se generan ni se leen poblaciones
+    import numpy as np
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+
+from ..factories.base import PARTES
+
+
+DEFAULT_MAX_COUNT = 1_000_000
+# Tope del tamaño total de POPULATION_DIR (todas las poblaciones juntas)
+DEFAULT_MAX_BYTES = 1 << 30
+DEFAULT_SAMPLE_SIZE = 100
+MAX_SAMPLE_SIZE = 100_000
+
+KIND_COLUMN = "kind"
+META_FILE = "meta.json"
+
+# Decimales de los valores devueltos al muestrear (las columnas son float32)
+SAMPLE_DECIMALS = 4
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class PopulationError(ValueError):
+    """Parámetros de población inválidos."""
+    pass
+
+
+class PopulationQuotaError(PopulationError):
+    """La nueva población no cabe en ``max_bytes``."""
+    pass
+
+
+class PopulationBusyError(PopulationError):
+    """Ya hay una población generándose en este proceso."""
+    pass
+
+
+def _check_seed(seed):
+    if seed is not None and seed < 0:
+        raise PopulationError("'seed' no puede ser negativa")
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("NumPy no está instalado (pip install numpy)")
+
+
+def _fill(block, dist, uniform=None):
+    """Convierte en su sitio normales estándar (o uniformes ``[0, 1)``) a la distribución ``dist``."""
+    mean, std, low, high = dist
+    if mean is None:
+        block[:] = uniform
+        block *= high - low
+        block += low
+    else:
+        block *= std
+        block += mean
+        np.clip(block, low, high, out=block)
+
+
+def draw(stats: dict, count: int, rng) -> dict:
+    """Columnas ``float32`` de ``count`` personajes de una raza (``stats``: columna -> distribución)."""
+    _require_numpy()
+    columns = {}
+    for name, dist in stats.items():
+        values = rng.standard_normal(count, dtype=np.float32)
+        _fill(values, dist, rng.random(count, dtype=np.float32) if dist[0] is None else None)
+        columns[name] = values
+    return columns
+
+
+class StatModel:
+    """Parámetros por columna y raza: ``columns[nombre][índice de raza] = (media, desv, mín, máx)``."""
+
+    def __init__(self, factories: dict):
+        self.kinds = list(factories)
+        if not 0 < len(self.kinds) <= 255:
+            raise PopulationError("Una población necesita entre 1 y 255 razas")
+        self.columns = {}
+        for index, factory in enumerate(factories.values()):
+            for parte in PARTES:
+                for campo, dist in factory.productos[parte].estadisticas.items():
+                    self.columns.setdefault(f"{parte}_{campo}", {})[index] = dist
+
+    def race_stats(self, kind: str) -> dict:
+        """Distribuciones de una raza: columna -> (media, desv, mín, máx)."""
+        index = self.kinds.index(kind)
+        return {name: dists[index] for name, dists in self.columns.items() if index in dists}
+
+    def dtype(self):
+        _require_numpy()
+        return np.dtype([(KIND_COLUMN, np.uint8)] + [(name, np.float32) for name in self.columns])
+
+    def describe(self) -> dict:
+        """Modelo en JSON: columna -> raza -> distribución."""
+        model = {}
+        for name, dists in self.columns.items():
+            model[name] = {
+                self.kinds[index]: {"media": mean, "desviacion": std, "min": low, "max": high}
+                for index, (mean, std, low, high) in sorted(dists.items())
+            }
+        return model
+
+    def generate(self, count: int, weights: list = None, seed: int = 0):
+        """
+        Genera ``count`` personajes como array estructurado.
+
+        El reparto entre razas sale de una multinomial con ``weights``
+        (iguales por defecto); después cada columna se rellena con normales
+        recortadas a ``[min, max]`` (o uniformes si la raza no da media),
+        aplicando los parámetros de cada raza a su rango de filas. Las razas
+        sin un campo quedan con NaN en esa columna.
+
+        Returns:
+            (población, offsets) con offsets ``{kind: [inicio, fin)}``
+        """
+        _require_numpy()
+        if count < 0:
+            raise PopulationError("'count' no puede ser negativo")
+        _check_seed(seed)
+        rng = np.random.default_rng(seed)
+        if weights is None:
+            weights = [1] * len(self.kinds)
+        if len(weights) != len(self.kinds) or min(weights) < 0 or sum(weights) <= 0:
+            raise PopulationError("Se necesita un peso no negativo por raza (y alguno positivo)")
+        p = np.asarray(weights, dtype=np.float64)
+        counts = rng.multinomial(count, p / p.sum())
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+
+        population = np.empty(count, dtype=self.dtype())
+        population[KIND_COLUMN] = np.repeat(np.arange(len(self.kinds), dtype=np.uint8), counts)
+        for name, dists in self.columns.items():
+            values = rng.standard_normal(count, dtype=np.float32)
+            uniform = None
+            if any(mean is None for mean, _, _, _ in dists.values()):
+                uniform = rng.random(count, dtype=np.float32)
+            for index in range(len(self.kinds)):
+                block = values[bounds[index]:bounds[index + 1]]
+                dist = dists.get(index)
+                if dist is None:
+                    block.fill(np.nan)
+                elif dist[0] is None:
+                    _fill(block, dist, uniform[bounds[index]:bounds[index + 1]])
+                else:
+                    _fill(block, dist)
+            population[name] = values
+        offsets = {kind: [int(bounds[i]), int(bounds[i + 1])] for i, kind in enumerate(self.kinds)}
+        return population, offsets
+
+
+class Population:
+    """Población exportada: metadatos y columnas abiertas con mmap bajo demanda."""
+
+    def __init__(self, directory: Path, meta: dict):
+        self.directory = directory
+        self.meta = meta
+        self._columns = {}
+
+    @property
+    def name(self) -> str:
+        return self.meta["name"]
+
+    def column(self, name: str):
+        array = self._columns.get(name)
+        if array is None:
+            array = self._columns[name] = np.load(self.directory / f"{name}.npy", mmap_mode="r")
+        return array
+
+    def _range(self, kind: str = None) -> tuple:
+        if kind is None:
+            return 0, self.meta["count"]
+        if kind not in self.meta["offsets"]:
+            raise PopulationError(f"La población no tiene la raza '{kind}'")
+        start, end = self.meta["offsets"][kind]
+        return start, end
+
+    def _fields(self, fields: list = None) -> list:
+        columns = self.meta["columns"]
+        if not fields:
+            return columns
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            raise PopulationError(f"Columnas desconocidas: {unknown}")
+        return fields
+
+    def sample(self, size: int = DEFAULT_SAMPLE_SIZE, seed: int = None, kind: str = None,
+               fields: list = None) -> dict:
+        """
+        Muestra sin reemplazo como columnas (listas paralelas), leyendo del
+        mmap solo las filas elegidas.
+        """
+        if not 1 <= size <= MAX_SAMPLE_SIZE:
+            raise PopulationError(f"'n' debe estar entre 1 y {MAX_SAMPLE_SIZE}")
+        _check_seed(seed)
+        start, end = self._range(kind)
+        fields = self._fields(fields)
+        rng = np.random.default_rng(seed)
+        rows = start + rng.choice(end - start, size=min(size, end - start), replace=False)
+        # Orden de archivo: lecturas del mmap más secuenciales
+        rows.sort()
+        kinds = np.asarray(self.meta["kinds"])
+        columns = {KIND_COLUMN: kinds[self.column(KIND_COLUMN)[rows]].tolist()}
+        for field in fields:
+            values = np.round(self.column(field)[rows].astype(np.float64), SAMPLE_DECIMALS)
+            missing = np.isnan(values)
+            # NaN (raza sin ese campo) no es JSON válido: se devuelve null
+            columns[field] = (np.where(missing, None, values) if missing.any() else values).tolist()
+        return {"name": self.name, "kind": kind, "seed": seed, "size": len(rows), "columns": columns}
+
+    def summary(self, fields: list = None) -> dict:
+        """Media, desviación, mínimo y máximo de cada columna por raza."""
+        fields = self._fields(fields)
+        result = {}
+        for kind in self.meta["kinds"]:
+            start, end = self._range(kind)
+            stats = {}
+            for field in fields:
+                values = self.column(field)[start:end]
+                if end == start or np.isnan(values[0]):
+                    stats[field] = None
+                    continue
+                values = values.astype(np.float64)
+                stats[field] = {
+                    "media": round(float(values.mean()), SAMPLE_DECIMALS),
+                    "desviacion": round(float(values.std()), SAMPLE_DECIMALS),
+                    "min": round(float(values.min()), SAMPLE_DECIMALS),
+                    "max": round(float(values.max()), SAMPLE_DECIMALS),
+                }
+            result[kind] = {"count": end - start, "columns": stats}
+        return {"name": self.name, "kinds": result}
+
+
+class PopulationStore:
+    """Directorio con una subcarpeta por población exportada."""
+
+    def __init__(self, directory=None, max_count: int = DEFAULT_MAX_COUNT,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = None if directory is None else Path(directory)
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._creating = threading.Lock()
+        self._loaded = {}
+
+    def configure(self, directory, max_count: int = DEFAULT_MAX_COUNT,
+                  max_bytes: int = DEFAULT_MAX_BYTES):
+        with self._lock:
+            self.directory = Path(directory)
+            self.max_count = max_count
+            self.max_bytes = max_bytes
+            self._loaded = {}
+
+    def usage(self, exclude: str = None) -> int:
+        """
+        Bytes ocupados en ``directory``, incluidas las carpetas temporales de
+        generaciones en curso (también las de otros workers).
+        """
+        if self.directory is None or not self.directory.is_dir():
+            return 0
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            if exclude is not None and Path(root) == self.directory / exclude:
+                continue
+            for filename in files:
+                try:
+                    total += os.stat(os.path.join(root, filename)).st_size
+                except OSError:
+                    continue
+        return total
+
+    @staticmethod
+    def estimate_bytes(model: StatModel, count: int) -> int:
+        """Tamaño aproximado en disco: columnas más cabeceras ``.npy`` y ``meta.json``."""
+        return count * model.dtype().itemsize + 4096 * (len(model.columns) + 2)
+
+    @staticmethod
+    def validate_name(name: str) -> str:
+        if not name or not _NAME_RE.match(name):
+            raise PopulationError("'name' solo admite letras, dígitos, '_' y '-' (máximo 64)")
+        return name
+
+    def create(self, name: str, factories: dict, count: int, weights: list = None, seed: int = 0,
+               overwrite: bool = False) -> dict:
+        """Genera una población y la exporta por columnas; devuelve sus metadatos."""
+        _require_numpy()
+        self.validate_name(name)
+        if not 1 <= count <= self.max_count:
+            raise PopulationError(f"'count' debe estar entre 1 y {self.max_count}")
+        _check_seed(seed)
+        model = StatModel(factories)
+        if not model.columns:
+            raise PopulationError("Ninguna de las razas declara 'estadisticas'")
+
+        if not overwrite and (self.directory / name).exists():
+            raise FileExistsError(name)
+
+        if not self._creating.acquire(blocking=False):
+            raise PopulationBusyError("Ya se está generando otra población")
+        try:
+            # Al sobrescribir, el espacio de la población anterior se libera
+            needed = self.estimate_bytes(model, count)
+            used = self.usage(exclude=name if overwrite else None)
+            if used + needed > self.max_bytes:
+                raise PopulationQuotaError(
+                    f"La población ocuparía ~{needed} bytes y quedan "
+                    f"{max(self.max_bytes - used, 0)} de {self.max_bytes}")
+            return self._create(name, model, count, weights, seed, overwrite)
+        finally:
+            self._creating.release()
+
+    def _create(self, name: str, model: StatModel, count: int, weights: list, seed: int,
+                overwrite: bool) -> dict:
+        start = time.perf_counter()
+        population, offsets = model.generate(count, weights, seed)
+        generated = time.perf_counter() - start
+
+        meta = {
+            "name": name,
+            "count": count,
+            "seed": seed,
+            "kinds": model.kinds,
+            "weights": list(weights) if weights is not None else [1] * len(model.kinds),
+            "offsets": offsets,
+            "columns": list(model.columns),
+            "model": model.describe(),
+            "created_at": time.time(),
+            "generate_ms": round(generated * 1000, 3),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.directory, prefix=f".{name}-"))
+        try:
+            for column in population.dtype.names:
+                # Cada columna contigua en su archivo (el array estructurado intercala campos)
+                np.save(tmp / f"{column}.npy", np.ascontiguousarray(population[column]))
+            meta["bytes"] = sum(entry.stat().st_size for entry in os.scandir(tmp))
+            with open(tmp / META_FILE, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            target = self.directory / name
+            with self._lock:
+                if target.exists():
+                    if not overwrite:
+                        raise FileExistsError(name)
+                    shutil.rmtree(target)
+                os.replace(tmp, target)
+                self._loaded.pop(name, None)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return meta
+
+    def load(self, name: str):
+        """Población por nombre, o None si no existe."""
+        _require_numpy()
+        self.validate_name(name)
+        path = self.directory / name / META_FILE
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        cached = self._loaded.get(name)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, "r", encoding="utf-8") as f:
+            population = Population(path.parent, json.load(f))
+        self._loaded[name] = (mtime, population)
+        return population
+
+    def delete(self, name: str) -> bool:
+        self.validate_name(name)
+        target = self.directory / name
+        with self._lock:
+            self._loaded.pop(name, None)
+            if not target.is_dir():
+                return False
+            shutil.rmtree(target)
+            return True
+
+    def list(self) -> list:
+        """Metadatos (sin el modelo) de las poblaciones exportadas, por nombre."""
+        if self.directory is None or not self.directory.is_dir():
+            return []
+        items = []
+        for entry in sorted(os.scandir(self.directory), key=lambda e: e.name):
+            if entry.name.startswith(".") or not entry.is_dir():
+                continue
+            try:
+                with open(Path(entry.path) / META_FILE, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            meta.pop("model", None)
+            items.append(meta)
+        return items
+
+
+# Instancia global
+population_store = PopulationStore()
@@ -0,0 +1,350 @@
+"""Servidor de producción pre-fork sin gestor de procesos externo.
+
+El proceso maestro crea la aplicación (calentada: índice de imágenes,
+catálogo y fábricas), abre el socket y hace fork de ``workers`` procesos que
+heredan todo ese estado. Cada worker atiende el socket compartido con un
+pool fijo de ``threads`` hilos y se recicla de forma ordenada tras
+``max_requests`` peticiones; el maestro lo reemplaza.
+
+Antes del primer fork el maestro detiene sus hilos en segundo plano
+(volcado de eventos y de personajes, sincronización del pool), de modo que
+ningún lock queda tomado en los hijos; los hooks de ``os.register_at_fork``
+los relanzan en cada worker.
+
+Señales del maestro: SIGTERM/SIGINT apagan de forma ordenada y SIGHUP
+recicla todos los workers.
+"""
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from ..interfaces.interfaces import get_event_sink
+from ..patterns.singleton_pool import Pool
+from .character_store import character_store
+from .event_sink import SampledEventSink
+from .image_manager import image_manager
+from .lifecycle import readiness
+
+
+class ServerConfig:
+    """
+    Configuración del servidor. Prioridad: argumentos > variables de entorno
+    (``FABRICA_<OPCION>``) > sección ``server`` de ``shared-config.json`` >
+    valores por defecto.
+    """
+
+    DEFAULTS = {
+        "host": "127.0.0.1",
+        "port": 5000,
+        "workers": os.cpu_count() or 1,
+        "threads": 8,
+        "backlog": 2048,
+        "max_requests": 10000,
+        "max_requests_jitter": 1000,
+        "graceful_timeout": 30.0,
+        "keepalive": 5.0,
+    }
+
+    def __init__(self, **options):
+        for name, default in self.DEFAULTS.items():
+            value = options.get(name)
+            setattr(self, name, type(default)(value) if value is not None else default)
+        if self.workers < 1 or self.threads < 1:
+            raise ValueError("'workers' y 'threads' deben ser al menos 1")
+
+    @classmethod
+    def load(cls, overrides: dict = None, environ=None) -> "ServerConfig":
+        environ = os.environ if environ is None else environ
+        options = dict(image_manager.config.get("server", {}))
+        for name in cls.DEFAULTS:
+            value = environ.get(f"FABRICA_{name.upper()}")
+            if value not in (None, ""):
+                options[name] = value
+        options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+        return cls(**options)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.DEFAULTS}
+
+
+class _RequestHandler(WSGIRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_request(self, code="-", size="-"):
+        # El registro de accesos por petición es caro bajo carga
+        pass
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    Servidor WSGI sobre un socket heredado con un pool fijo de hilos.
+
+    Cuando todos los hilos están ocupados el bucle deja de aceptar y las
+    conexiones esperan en el backlog del kernel, donde las toma otro worker.
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, fd: int, threads: int, keepalive: float):
+        handler = type("RequestHandler", (_RequestHandler,), {"timeout": keepalive})
+        super().__init__(host, port, app, handler=handler, fd=fd)
+        self._slots = threading.BoundedSemaphore(threads)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        self._executor.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def drain(self):
+        """Espera a que terminen las peticiones en curso."""
+        self._executor.shutdown(wait=True)
+
+
+class _WorkerApp:
+    """Cuenta peticiones y pide el reciclado al llegar a ``max_requests``."""
+
+    def __init__(self, app, max_requests: int, on_limit):
+        self.app = app
+        self.max_requests = max_requests
+        self.on_limit = on_limit
+
+    def __call__(self, environ, start_response):
+        if readiness.count_request() == self.max_requests and self.max_requests:
+            self.on_limit()
+        if readiness.status == "draining":
+            # Cerrar las conexiones keep-alive mientras el worker se recicla
+            def start_closing(status, headers, exc_info=None):
+                return start_response(status, headers + [("Connection", "close")], exc_info)
+            return self.app(environ, start_closing)
+        return self.app(environ, start_response)
+
+
+class PreforkServer:
+    """Proceso maestro: abre el socket, lanza los workers y los reemplaza al salir."""
+
+    def __init__(self, app, config: ServerConfig):
+        self.app = app
+        self.config = config
+        self.socket = None
+        self.workers = {}  # pid -> (índice, instante de arranque)
+        self._stopping = False
+        self._signals = []
+        self._wakeup = None  # (lectura, escritura) del pipe de señales del maestro
+
+    def log(self, message: str):
+        print(f"[prefork {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+    def bind(self):
+        family = socket.AF_INET6 if ":" in self.config.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.config.host, self.config.port))
+        sock.listen(self.config.backlog)
+        sock.set_inheritable(True)
+        self.socket = sock
+        return sock
+
+    def run(self) -> int:
+        if self.socket is None:
+            self.bind()
+        host, port = self.socket.getsockname()[:2]
+        recycle = (f"reciclado cada ~{self.config.max_requests} peticiones"
+                   if self.config.max_requests else "sin reciclado")
+        self.log(f"escuchando en http://{host}:{port} ({self.config.workers} workers x "
+                 f"{self.config.threads} hilos, {recycle})")
+
+        if not hasattr(os, "fork"):
+            # Sin fork (Windows): un único worker en este proceso
+            self._serve(0)
+            return 0
+
+        reader, writer = os.pipe()
+        os.set_blocking(reader, False)
+        os.set_blocking(writer, False)
+        self._wakeup = (reader, writer)
+        signal.set_wakeup_fd(writer)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+
+        self._quiesce()
+        for index in range(self.config.workers):
+            self._spawn(index)
+        try:
+            while self.workers:
+                self._handle_signals()
+                self._reap()
+                if self._stopping:
+                    self._stop_workers()
+                    break
+                select.select([reader], [], [], 1.0)
+                try:
+                    os.read(reader, 4096)
+                except BlockingIOError:
+                    pass
+        finally:
+            signal.set_wakeup_fd(-1)
+            os.close(reader)
+            os.close(writer)
+            self.socket.close()
+        self.log("detenido")
+        return 0
+
+    @staticmethod
+    def _quiesce():
+        """
+        Detiene los hilos en segundo plano del maestro, que no atiende
+        peticiones: un fork() con ellos en marcha podría dejar en el hijo un
+        lock tomado (SQLite, buffers, logging). Cada worker los relanza en su
+        hook de fork.
+        """
+        Pool().state.suspend()
+        character_store.suspend()
+        sink = get_event_sink()
+        if isinstance(sink, SampledEventSink):
+            sink.suspend()
+
+    def _on_signal(self, signum, frame):
+        self._signals.append(signum)
+
+    def _handle_signals(self):
+        while self._signals:
+            signum = self._signals.pop(0)
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                self._stopping = True
+            elif signum == signal.SIGHUP:
+                self.log("reciclando workers")
+                for pid in list(self.workers):
+                    self._kill(pid, signal.SIGTERM)
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                self._serve(index)
+            except BaseException:
+                import traceback
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        self.workers[pid] = (index, time.monotonic())
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            index, started = self.workers.pop(pid, (None, None))
+            if index is None or self._stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and time.monotonic() - started < 1.0:
+                # Evitar un bucle de arranques fallidos
+                self.log(f"worker {index} (pid {pid}) falló al arrancar (código {code})")
+                time.sleep(1.0)
+            self._spawn(index)
+
+    def _kill(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _stop_workers(self):
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.config.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.workers):
+            self.log(f"worker pid {pid} no terminó a tiempo; SIGKILL")
+            self._kill(pid, signal.SIGKILL)
+        while self.workers:
+            pid, _ = os.waitpid(-1, 0)
+            self.workers.pop(pid, None)
+
+    # --- Worker -------------------------------------------------------------
+
+    def _serve(self, index: int):
+        config = self.config
+        server = None
+
+        def stop(*_):
+            if readiness.status != "draining":
+                readiness.mark_draining()
+                if server is not None:
+                    # shutdown() espera al bucle de serve_forever: llamarlo desde otro hilo
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for name in ("SIGHUP", "SIGCHLD"):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), signal.SIG_DFL)
+        if self._wakeup is not None:
+            # Ambos extremos del pipe de señales son del maestro
+            signal.set_wakeup_fd(-1)
+            for fd in self._wakeup:
+                os.close(fd)
+            self._wakeup = None
+
+        limit = config.max_requests
+        if limit and config.max_requests_jitter:
+            limit += random.randint(0, config.max_requests_jitter)
+
+        server = PooledWSGIServer(config.host, config.port, _WorkerApp(self.app, limit, stop),
+                                  fd=self.socket.fileno(), threads=config.threads,
+                                  keepalive=config.keepalive)
+        if readiness.status == "draining":
+            return
+        readiness.mark_ready(worker=index, max_requests=limit or None)
+        server.serve_forever(poll_interval=0.5)
+
+        # Reciclado ordenado: terminar las peticiones en curso con un límite de tiempo
+        drainer = threading.Thread(target=server.drain, daemon=True)
+        drainer.start()
+        drainer.join(config.graceful_timeout)
+        self._retire()
+
+    @staticmethod
+    def _retire():
+        """
+        Cierre ordenado del worker. ``os._exit`` no ejecuta ``atexit``: lo
+        que quede en memoria se escribe aquí o se pierde.
+        """
+        # Retirar este worker de la vista compartida del pool
+        Pool().state.suspend()
+        # Escribir los personajes que queden en la cola antes de salir
+        character_store.close()
+        # Y los eventos de acción muestreados que sigan en el buffer
+        sink = get_event_sink()
+        if isinstance(sink, SampledEventSink):
+            sink.close()
+
+
+def serve(app, overrides: dict = None) -> int:
+    """Arranca el servidor de producción con la configuración resuelta."""
+    return PreforkServer(app, ServerConfig.load(overrides)).run()
@@ -0,0 +1,335 @@
+"""Perfilado de peticiones bajo demanda.
+
+Una fracción configurable de las peticiones (``PROFILE_SAMPLE_RATE``), o las
+que traen la cabecera de confianza con el token correcto, se perfilan con
+cProfile (``.prof``, formato pstats) o con un muestreador de pilas de bajo
+coste (``.folded``, pilas colapsadas compatibles con flamegraph.pl). Los
+perfiles se guardan en un directorio con tamaño máximo; al superarlo se
+borran los más antiguos.
+
+Sin muestreo ni token no se registra ningún hook: coste cero por petición.
+
+Solo una petición por proceso usa cProfile a la vez (desde Python 3.12 se
+apoya en ``sys.monitoring``, que no admite dos perfiladores activos); las
+demás peticiones elegidas mientras tanto se perfilan en modo ``stack``.
+"""
+import cProfile
+import hmac
+import io
+import itertools
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from flask import g, request
+
+from .image_manager import image_manager
+
+
+MODES = ("cprofile", "stack")
+EXTENSIONS = {"cprofile": ".prof", "stack": ".folded"}
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_STACK_INTERVAL = 0.001
+DEFAULT_HEADER = "X-Profile-Token"
+
+# Las rutas de administración usan la misma cabecera y no se perfilan
+ADMIN_ENDPOINTS = frozenset({"api.list_profiles", "api.merge_profiles", "api.download_profile"})
+
+# <epoch ms>-<pid>-<secuencia>-<método>-<ruta>-<duración µs>.<ext>
+_NAME_RE = re.compile(r"^(\d+)-(\d+)-(\d+)-([A-Z]+)-([\w.-]*)-(\d+)\.(prof|folded)$")
+
+
+class ProfileStore:
+    """Directorio de perfiles con límite de tamaño total (borra los más antiguos)."""
+
+    def __init__(self, directory, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+
+    def _name(self, method: str, route: str, duration: float, mode: str) -> str:
+        slug = re.sub(r"[^\w.-]+", "_", route.strip("/")) or "root"
+        return (f"{int(time.time() * 1000)}-{os.getpid()}-{next(self._seq)}-{method}-"
+                f"{slug[:80]}-{int(duration * 1e6)}{EXTENSIONS[mode]}")
+
+    def save(self, write, method: str, route: str, duration: float, mode: str) -> Path:
+        """Escribe un perfil de forma atómica con ``write(path)`` y aplica el límite."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / self._name(method, route, duration, mode)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            write(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        self._enforce_limit()
+        return path
+
+    def _enforce_limit(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and _NAME_RE.match(entry.name):
+                    st = entry.stat()
+                    files.append((st.st_mtime, entry.name, st.st_size))
+            total = sum(size for _, _, size in files)
+            for _, name, size in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.unlink(self.directory / name)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def list(self) -> list:
+        """Perfiles guardados, del más reciente al más antiguo."""
+        if not self.directory.is_dir():
+            return []
+        items = []
+        for entry in os.scandir(self.directory):
+            match = _NAME_RE.match(entry.name)
+            if not match or not entry.is_file():
+                continue
+            created, pid, _, method, route, micros, ext = match.groups()
+            items.append({
+                "name": entry.name,
+                "mode": "cprofile" if ext == "prof" else "stack",
+                "created": int(created) / 1000.0,
+                "pid": int(pid),
+                "method": method,
+                "route": route,
+                "duration_ms": int(micros) / 1000.0,
+                "size": entry.stat().st_size,
+            })
+        items.sort(key=lambda item: item["created"], reverse=True)
+        return items
+
+    def path(self, name: str):
+        """Ruta de un perfil por nombre, o None si no existe o el nombre no es válido."""
+        if not _NAME_RE.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def merge(self, names: list, mode: str):
+        """
+        Combina varios perfiles del mismo modo: ``pstats.Stats`` para cProfile
+        y suma de muestras por pila para el modo stack.
+        """
+        paths = [self.path(name) for name in names]
+        paths = [path for path in paths if path is not None and path.suffix == EXTENSIONS[mode]]
+        if not paths:
+            return None
+        if mode == "cprofile":
+            stats = pstats.Stats(str(paths[0]), stream=io.StringIO())
+            for path in paths[1:]:
+                stats.add(str(path))
+            return stats
+        stacks = Counter()
+        for path in paths:
+            stacks.update(read_folded(path))
+        return stacks
+
+
+def read_folded(path) -> Counter:
+    stacks = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def format_folded(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def format_pstats(stats: pstats.Stats, sort: str = "cumulative", limit: int = 50) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def dump_pstats(stats: pstats.Stats) -> bytes:
+    fd, tmp = tempfile.mkstemp(suffix=".prof")
+    os.close(fd)
+    try:
+        stats.dump_stats(tmp)
+        with open(tmp, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(tmp)
+
+
+class StackSampler:
+    """
+    Un único hilo que, cada ``interval`` segundos, toma la pila de los hilos
+    registrados con ``sys._current_frames()``. El hilo perfilado no ejecuta
+    nada extra por llamada, a diferencia de cProfile.
+    """
+
+    def __init__(self, interval: float = DEFAULT_STACK_INTERVAL):
+        self.interval = interval
+        self._targets = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int) -> Counter:
+        samples = Counter()
+        with self._lock:
+            self._targets[thread_id] = samples
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return samples
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            # Bajo el lock: tras ``stop`` ya nadie escribe en las muestras devueltas
+            with self._lock:
+                idle = not self._targets
+                if not idle:
+                    frames = sys._current_frames()
+                    for thread_id, samples in self._targets.items():
+                        frame = frames.get(thread_id)
+                        if frame is not None:
+                            samples[_collapse(frame)] += 1
+                    del frames
+            if idle:
+                self._wake.wait()
+                self._wake.clear()
+            else:
+                time.sleep(self.interval)
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class RequestProfiler:
+    """Decide qué peticiones se perfilan y guarda el resultado en ``store``."""
+
+    def __init__(self):
+        self.store = None
+        self.sample_rate = 0.0
+        self.mode = "cprofile"
+        self.header = DEFAULT_HEADER
+        self.token = None
+        self.sampler = StackSampler()
+        self.logger = logging.getLogger("app.profiling")
+        self._cprofile = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.store is not None and (self.sample_rate > 0 or bool(self.token))
+
+    def trusted(self) -> bool:
+        """La petición trae la cabecera de confianza con el token configurado."""
+        supplied = request.headers.get(self.header)
+        if not self.token or supplied is None:
+            return False
+        # compare_digest solo admite str ASCII: comparar bytes. WSGI entrega las
+        # cabeceras decodificadas como latin-1, así se recuperan los originales
+        return hmac.compare_digest(supplied.encode("latin-1", "replace"), self.token.encode("utf-8"))
+
+    def _before_request(self):
+        if request.endpoint in ADMIN_ENDPOINTS:
+            return
+        if self.trusted():
+            mode = request.headers.get("X-Profile-Mode", self.mode)
+        elif self.sample_rate > 0 and random.random() < self.sample_rate:
+            mode = self.mode
+        else:
+            return
+        if mode not in MODES:
+            mode = self.mode
+        if mode == "cprofile" and self._cprofile.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Otro perfilador (depurador, cobertura) ocupa sys.monitoring
+                self._cprofile.release()
+            else:
+                g._profile = ("cprofile", profile, time.perf_counter())
+                return
+        samples = self.sampler.start(threading.get_ident())
+        g._profile = ("stack", samples, time.perf_counter())
+
+    def _teardown_request(self, exc):
+        state = g.pop("_profile", None)
+        if state is None:
+            return
+        mode, collector, start = state
+        if mode == "cprofile":
+            try:
+                collector.disable()
+            finally:
+                self._cprofile.release()
+        else:
+            self.sampler.stop(threading.get_ident())
+        duration = time.perf_counter() - start
+        rule = request.url_rule
+        route = rule.rule if rule is not None else request.path
+
+        if mode == "cprofile":
+            collector.create_stats()
+            write = collector.dump_stats
+        else:
+            if not collector:
+                return
+
+            def write(path):
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(format_folded(collector))
+        try:
+            self.store.save(write, request.method, route, duration, mode)
+        except OSError:
+            # La respuesta ya está hecha: un perfil perdido no la convierte en error
+            self.logger.exception("No se pudo guardar el perfil de %s %s", request.method, route)
+
+    def install(self, app):
+        """Configura el perfilador desde ``app.config`` y registra los hooks si está activo."""
+        config = app.config
+        if config["PROFILE_MODE"] not in MODES:
+            raise ValueError(f"PROFILE_MODE desconocido: '{config['PROFILE_MODE']}'")
+        directory = config["PROFILE_DIR"] or image_manager.project_root / "build" / "profiles"
+        self.store = ProfileStore(directory, max_bytes=config["PROFILE_MAX_BYTES"])
+        self.sample_rate = float(config["PROFILE_SAMPLE_RATE"])
+        self.mode = config["PROFILE_MODE"]
+        self.header = config["PROFILE_HEADER"]
+        self.token = config["PROFILE_TOKEN"]
+        self.sampler.interval = config["PROFILE_STACK_INTERVAL"]
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+
+
+# Instancia global
+request_profiler = RequestProfiler()
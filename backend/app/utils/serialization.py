@@ -0,0 +1,203 @@
+"""Serialización de respuestas de la API.
+
+- JSON con codificador intercambiable: ``orjson`` si está instalado y el
+  formato compacto está activo; si no, la librería estándar.
+- Negociación por ``Accept`` a MessagePack o CBOR (codec local en Python puro).
+- Proyección ``?fields=`` con rutas separadas por puntos y comodín ``*``
+  (``fields=kind,character.*.imagen``).
+"""
+import json
+from collections.abc import Mapping
+from functools import lru_cache
+
+from flask import request
+
+from .binary_codec import cbor_dumps, msgpack_dumps
+
+try:  # orjson es opcional: sin él se usa json de la librería estándar
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+
+JSON_MIMETYPE = "application/json; charset=utf-8"
+MSGPACK_MIMETYPE = "application/msgpack"
+CBOR_MIMETYPE = "application/cbor"
+
+# Tipos MIME aceptados en Accept, en orden de preferencia ante empate
+_ACCEPT = {
+    "application/json": "json",
+    "application/msgpack": "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+    "application/cbor": "cbor",
+}
+
+_MISSING = object()
+
+
+def _default(obj):
+    """Convierte los tipos no nativos que aparecen en respuestas (mapeos congelados, sets)."""
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JsonEncoder:
+    """Codificador JSON con separadores conocidos (para empalmar bytes precodificados)."""
+
+    __slots__ = ("name", "compact", "dumps", "item_separator", "key_separator")
+
+    def __init__(self, name: str, compact: bool, dumps):
+        self.name = name
+        self.compact = compact
+        self.dumps = dumps
+        self.item_separator = b"," if compact else b", "
+        self.key_separator = b":" if compact else b": "
+
+
+def _stdlib_encoder(compact: bool) -> JsonEncoder:
+    # Sin compactar produce exactamente los mismos bytes que json.dumps(ensure_ascii=False)
+    separators = (",", ":") if compact else None
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=False,
+                          separators=separators, default=_default).encode("utf-8")
+
+    return JsonEncoder("stdlib", compact, dumps)
+
+
+def _orjson_encoder() -> JsonEncoder:
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, default=_default, option=option)
+
+    # orjson solo genera JSON compacto
+    return JsonEncoder("orjson", True, dumps)
+
+
+_encoder = _stdlib_encoder(compact=False)
+
+
+def configure_json(encoder: str = "auto", compact: bool = False) -> str:
+    """
+    Selecciona el codificador JSON global; devuelve su nombre.
+
+    Args:
+        encoder: 'auto' (orjson si está instalado y ``compact``), 'stdlib' u 'orjson'
+        compact: JSON sin espacios tras ',' y ':'
+
+    ``orjson`` no es idéntico byte a byte a la librería estándar: escribe los
+    floats con exponente sin '+' ni ceros (``1e16``, no ``1e+16``) y ``NaN`` o
+    infinito como ``null``.
+    """
+    global _encoder
+    if encoder == "auto":
+        encoder = "orjson" if compact and orjson is not None else "stdlib"
+    if encoder == "orjson":
+        if orjson is None:
+            raise ValueError("orjson no está instalado")
+        if not compact:
+            raise ValueError("orjson solo genera JSON compacto: activa JSON_COMPACT")
+        _encoder = _orjson_encoder()
+    elif encoder == "stdlib":
+        _encoder = _stdlib_encoder(compact)
+    else:
+        raise ValueError(f"Codificador JSON desconocido: '{encoder}'")
+    return _encoder.name
+
+
+def get_json_encoder() -> JsonEncoder:
+    return _encoder
+
+
+def dumps_json(obj) -> bytes:
+    """JSON en UTF-8 con el codificador configurado."""
+    return _encoder.dumps(obj)
+
+
+def negotiate() -> str:
+    """Formato de respuesta según Accept: 'json' (por defecto), 'msgpack' o 'cbor'."""
+    accept = request.headers.get("Accept", "")
+    if "msgpack" not in accept and "cbor" not in accept:
+        return "json"
+    best = request.accept_mimetypes.best_match(list(_ACCEPT), default="application/json")
+    return _ACCEPT[best]
+
+
+@lru_cache(maxsize=256)
+def _compile_fields(spec: str):
+    """Árbol de proyección: nombre -> subárbol (None = valor completo)."""
+    tree = {}
+    for path in spec.split(","):
+        parts = [p for p in path.strip().split(".") if p]
+        if not parts:
+            continue
+        node = tree
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                break
+            node = child
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+def _project(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, Mapping):
+        wildcard = tree.get("*", _MISSING)
+        result = {}
+        for key, item in value.items():
+            sub = tree.get(key, wildcard)
+            if sub is _MISSING:
+                continue
+            projected = _project(item, sub)
+            if projected is not _MISSING:
+                result[key] = projected
+        return result
+    if isinstance(value, (list, tuple)):
+        return [p for p in (_project(item, tree) for item in value) if p is not _MISSING]
+    return _MISSING
+
+
+def project(obj, fields: str):
+    """Aplica una proyección ``fields`` (rutas separadas por comas) a ``obj``."""
+    tree = _compile_fields(fields)
+    if not tree:
+        return obj
+    projected = _project(obj, tree)
+    return {} if projected is _MISSING else projected
+
+
+def requested_fields():
+    return request.args.get("fields") or None
+
+
+def needs_object() -> bool:
+    """True si la petición no puede servirse con bytes JSON precodificados."""
+    return requested_fields() is not None or negotiate() != "json"
+
+
+def variant_etag(etag: str) -> str:
+    """ETag distinto por representación negociada (la proyección ya va en la URL)."""
+    fmt = negotiate()
+    return etag if fmt == "json" else f"{etag}.{fmt}"
+
+
+def encode(obj, status: int = 200):
+    """Codifica ``obj`` para la petición actual; devuelve ``(cuerpo, mimetype)``."""
+    fields = requested_fields()
+    if fields and 200 <= status < 300:
+        obj = project(obj, fields)
+    fmt = negotiate()
+    if fmt == "msgpack":
+        return msgpack_dumps(obj, default=_default), MSGPACK_MIMETYPE
+    if fmt == "cbor":
+        return cbor_dumps(obj, default=_default), CBOR_MIMETYPE
+    return _encoder.dumps(obj), JSON_MIMETYPE
@@ -0,0 +1,284 @@
+import hashlib
+import io
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+from .character_catalog import PARTES, character_catalog
+from .image_manager import image_manager
+
+try:  # Pillow es opcional: sin él no hay atlas (las rutas devuelven 501)
+    from PIL import Image
+except ImportError:  # pragma: no cover - depende del entorno
+    Image = None
+
+
+DEFAULT_CELL = 512
+MAX_CELL = 2048
+# Bytes máximos de renders en memoria
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Bytes máximos de renders en disco (``SPRITE_CACHE_DIR``)
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+_MIMETYPES = {"png": "image/png"}
+# Dimensiones de fuentes recordadas (por ruta, tamaño y mtime)
+_MAX_DIMENSIONS = 1024
+
+
+def available_formats() -> list:
+    return ["png"] if Image is not None else []
+
+
+def _png_size(path) -> tuple:
+    """Lee ancho y alto de la cabecera IHDR de un PNG sin decodificarlo."""
+    with open(path, "rb") as f:
+        head = f.read(24)
+    if head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR":
+        raise ValueError(f"{path} no es un PNG válido")
+    return struct.unpack(">II", head[16:24])
+
+
+def _image_size(path) -> tuple:
+    """Ancho y alto de una imagen leyendo solo su cabecera (Pillow, o PNG sin él)."""
+    if Image is None:
+        return _png_size(path)
+    with Image.open(path) as img:
+        return img.size
+
+
+class Sprite:
+    """Render del atlas de una raza."""
+
+    __slots__ = ("key", "format", "body", "layout")
+
+    def __init__(self, key: str, fmt: str, body: bytes, layout: dict):
+        self.key = key
+        self.format = fmt
+        self.body = body
+        self.layout = layout
+
+    @property
+    def mimetype(self) -> str:
+        return _MIMETYPES[self.format]
+
+
+class SpriteRenderer:
+    """
+    Compone las cuatro imágenes de una raza (cuerpo, montura, armadura, arma)
+    en un atlas 2x2 con su mapa de coordenadas.
+
+    Los renders se identifican por el tamaño y mtime de sus archivos fuente
+    y se cachean en un LRU en memoria acotado por bytes y en disco, donde al
+    superar ``max_disk_bytes`` se borran los menos usados recientemente.
+    Requiere Pillow.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._dims = {}
+        self._lru = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._render_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_dir(self):
+        return self.cache_dir or str(image_manager.project_root / "build" / "sprites")
+
+    def sources(self, kind: str, factory_class) -> list:
+        """(parte, categoría, ruta relativa, tamaño, mtime) de cada imagen de la raza."""
+        race = character_catalog.get(kind, factory_class)
+        sources = []
+        for parte in PARTES:
+            web_path = next(
+                (v for v in race.parts[parte].values() if isinstance(v, str) and v.startswith("/images/")),
+                None,
+            )
+            if web_path is None:
+                continue
+            category, _, rel = web_path[len("/images/"):].partition("/")
+            # stat real: una fuente sobrescrita en su sitio cambia la clave del render
+            info = image_manager.stat_file(category, rel)
+            if info is not None:
+                sources.append((parte, category, rel, info[0], info[1]))
+        return sources
+
+    def _dimensions(self, category: str, rel: str, size: int, mtime: float):
+        """Ancho y alto de una fuente, leídos una vez por versión del archivo; None si no se puede leer."""
+        key = (category, rel, size, mtime)
+        dims = self._dims.get(key)
+        if dims is None and key not in self._dims:
+            try:
+                dims = _image_size(image_manager.get_image_path(category, rel))
+            except (OSError, ValueError, SyntaxError):
+                dims = None
+            with self._lock:
+                if len(self._dims) >= _MAX_DIMENSIONS:
+                    self._dims.clear()
+                self._dims[key] = dims
+        return dims
+
+    def layout(self, kind: str, factory_class, cell: int = DEFAULT_CELL) -> dict:
+        """
+        Mapa de coordenadas del atlas: cada imagen ajustada y centrada en su celda.
+        Las fuentes que no son imágenes legibles se omiten.
+        """
+        frames = {}
+        for parte, category, rel, size, mtime in self.sources(kind, factory_class):
+            dims = self._dimensions(category, rel, size, mtime)
+            if dims is None or not dims[0] or not dims[1]:
+                continue
+            w, h = dims
+            scale = min(cell / w, cell / h)
+            fw, fh = max(1, round(w * scale)), max(1, round(h * scale))
+            col, row = len(frames) % 2, len(frames) // 2
+            frames[parte] = {
+                "x": col * cell + (cell - fw) // 2,
+                "y": row * cell + (cell - fh) // 2,
+                "w": fw,
+                "h": fh,
+                "source": f"/images/{category}/{rel}",
+            }
+        return {"width": 2 * cell, "height": 2 * cell, "cell": cell, "frames": frames}
+
+    def key(self, kind: str, factory_class, fmt: str, cell: int) -> str:
+        signature = json.dumps([kind, fmt, cell, self.sources(kind, factory_class)])
+        return hashlib.sha256(signature.encode("utf-8")).hexdigest()[:32]
+
+    def render(self, kind: str, factory_class, fmt: str = None, cell: int = DEFAULT_CELL) -> Sprite:
+        fmt = fmt or available_formats()[0]
+        if fmt not in available_formats():
+            raise ValueError(f"Formato no disponible: '{fmt}'")
+        key = self.key(kind, factory_class, fmt, cell)
+
+        sprite = self._lru_get(key)
+        if sprite is not None:
+            return sprite
+
+        with self._lock:
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+        with render_lock:
+            sprite = self._lru_get(key, count=False)
+            if sprite is None:
+                sprite = self._load_from_disk(key, fmt)
+                if sprite is None:
+                    layout = self.layout(kind, factory_class, cell)
+                    sprite = Sprite(key, fmt, self._compose_png(layout), layout)
+                    self._store_on_disk(sprite)
+                self._lru_put(sprite)
+        with self._lock:
+            self._render_locks.pop(key, None)
+        return sprite
+
+    def _lru_get(self, key: str, count: bool = True):
+        with self._lock:
+            sprite = self._lru.get(key)
+            if sprite is not None:
+                self._lru.move_to_end(key)
+                if count:
+                    self.hits += 1
+            elif count:
+                self.misses += 1
+            return sprite
+
+    def _lru_put(self, sprite: Sprite):
+        with self._lock:
+            if sprite.key in self._lru:
+                return
+            self._lru[sprite.key] = sprite
+            self._bytes += len(sprite.body)
+            while self._bytes > self.max_bytes and len(self._lru) > 1:
+                _, old = self._lru.popitem(last=False)
+                self._bytes -= len(old.body)
+
+    def _disk_paths(self, key: str, fmt: str):
+        base = os.path.join(self._cache_dir(), key)
+        return f"{base}.{fmt}", f"{base}.json"
+
+    def _load_from_disk(self, key: str, fmt: str):
+        body_path, layout_path = self._disk_paths(key, fmt)
+        try:
+            with open(layout_path, "r", encoding="utf-8") as f:
+                layout = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # El mtime marca el último uso para el desalojo del disco
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return Sprite(key, fmt, body, layout)
+
+    def _store_on_disk(self, sprite: Sprite):
+        os.makedirs(self._cache_dir(), exist_ok=True)
+        body_path, layout_path = self._disk_paths(sprite.key, sprite.format)
+        for path, data in ((body_path, sprite.body),
+                           (layout_path, json.dumps(sprite.layout).encode("utf-8"))):
+            fd, tmp = tempfile.mkstemp(dir=self._cache_dir(), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Borra los renders en disco menos usados hasta quedar bajo ``max_disk_bytes``; devuelve cuántos."""
+        renders = {}
+        try:
+            entries = list(os.scandir(self._cache_dir()))
+        except OSError:
+            return 0
+        for entry in entries:
+            key, ext = os.path.splitext(entry.name)
+            if ext == ".tmp":
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            # Cuerpo y mapa de un render se cuentan (y se borran) juntos
+            files, size, used = renders.get(key, ([], 0, 0.0))
+            renders[key] = (files + [entry.path], size + st.st_size,
+                            max(used, st.st_mtime) if ext != ".json" else used)
+        total = sum(size for _, size, _ in renders.values())
+        removed = 0
+        for key, (files, size, _) in sorted(renders.items(), key=lambda item: item[1][2]):
+            if total <= self.max_disk_bytes:
+                break
+            for path in files:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def _compose_png(self, layout: dict) -> bytes:
+        atlas = Image.new("RGBA", (layout["width"], layout["height"]), (0, 0, 0, 0))
+        for frame in layout["frames"].values():
+            category, _, rel = frame["source"][len("/images/"):].partition("/")
+            with Image.open(image_manager.get_image_path(category, rel)) as img:
+                img = img.convert("RGBA").resize((frame["w"], frame["h"]), Image.LANCZOS)
+                atlas.paste(img, (frame["x"], frame["y"]))
+        out = io.BytesIO()
+        atlas.save(out, format="PNG")
+        return out.getvalue()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._lru), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# Instancia global
+sprite_renderer = SpriteRenderer()
@@ -0,0 +1,207 @@
+"""Trazas por petición con spans y exportación a Chrome trace-event JSON.
+
+Cada petición muestreada abre una traza en el hilo que la atiende; ``span()``
+anota fases (pool, fábrica, acciones, catálogo, imágenes, serialización) con
+``time.perf_counter_ns``. Las trazas terminadas se guardan en un buffer
+circular y ``/api/debug/traces`` las exporta en el formato que abren
+``chrome://tracing`` y Perfetto.
+
+Fuera de una traza ``span()`` devuelve un objeto vacío compartido, así que la
+instrumentación apenas cuesta una búsqueda en un ``threading.local``.
+"""
+import functools
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from flask import request
+
+
+DEFAULT_BUFFER = 256
+DEFAULT_HEADER = "X-Trace"
+
+# La ruta de exportación no se traza a sí misma
+EXPORT_ENDPOINT = "api.get_traces"
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class Trace:
+    """Spans de una petición: tuplas ``(nombre, categoría, inicio_ns, fin_ns, args)``."""
+
+    __slots__ = ("name", "route", "pid", "tid", "start", "end", "status", "spans")
+
+    def __init__(self, name: str, route: str):
+        self.name = name
+        self.route = route
+        self.pid = os.getpid()
+        self.tid = threading.get_native_id()
+        self.start = time.perf_counter_ns()
+        self.end = None
+        self.status = None
+        self.spans = []
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter_ns()) - self.start) / 1e6
+
+
+class _Span:
+    __slots__ = ("trace", "name", "cat", "args", "start")
+
+    def __init__(self, trace: Trace, name: str, cat: str, args: dict):
+        self.trace = trace
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        args = self.args
+        if exc_type is not None:
+            args = dict(args or {}, error=exc_type.__name__)
+        self.trace.spans.append((self.name, self.cat, self.start, time.perf_counter_ns(), args))
+        return False
+
+
+class Tracer:
+    """Trazas por hilo y buffer con las más recientes."""
+
+    def __init__(self, buffer: int = DEFAULT_BUFFER):
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.header = DEFAULT_HEADER
+        self._local = threading.local()
+        self._traces = deque(maxlen=buffer)
+        self._lock = threading.Lock()
+
+    def span(self, name: str, cat: str = "app", **args):
+        """Context manager que anota una fase en la traza activa del hilo (si la hay)."""
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return _NO_SPAN
+        return _Span(trace, name, cat, args or None)
+
+    def begin(self, name: str, route: str) -> Trace:
+        trace = self._local.trace = Trace(name, route)
+        return trace
+
+    def finish(self, status: int = None):
+        trace = getattr(self._local, "trace", None)
+        if trace is None:
+            return None
+        self._local.trace = None
+        trace.end = time.perf_counter_ns()
+        trace.status = status
+        with self._lock:
+            self._traces.append(trace)
+        return trace
+
+    def recent(self, limit: int = None, route: str = None, min_ms: float = None) -> list:
+        with self._lock:
+            traces = list(self._traces)
+        if route:
+            traces = [t for t in traces if route in t.route]
+        if min_ms is not None:
+            traces = [t for t in traces if t.duration_ms >= min_ms]
+        return traces[-limit:] if limit else traces
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def resize(self, buffer: int):
+        with self._lock:
+            self._traces = deque(self._traces, maxlen=buffer)
+
+    @staticmethod
+    def to_chrome(traces: list) -> dict:
+        """Eventos completos (``ph: X``) en microsegundos, un hilo por fila."""
+        events = []
+        threads = set()
+        for trace in traces:
+            threads.add((trace.pid, trace.tid))
+            events.append({
+                "name": trace.name, "cat": "request", "ph": "X",
+                "ts": trace.start / 1000.0, "dur": (trace.end - trace.start) / 1000.0,
+                "pid": trace.pid, "tid": trace.tid,
+                "args": {"route": trace.route, "status": trace.status},
+            })
+            for name, cat, start, end, args in trace.spans:
+                event = {"name": name, "cat": cat, "ph": "X", "ts": start / 1000.0,
+                         "dur": (end - start) / 1000.0, "pid": trace.pid, "tid": trace.tid}
+                if args:
+                    event["args"] = args
+                events.append(event)
+        for pid in sorted({pid for pid, _ in threads}):
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                           "args": {"name": f"worker {pid}"}})
+        for pid, tid in sorted(threads):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": f"thread {tid}"}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def _before_request(self):
+        if request.endpoint == EXPORT_ENDPOINT:
+            return
+        if request.headers.get(self.header) or (self.sample_rate > 0 and random.random() < self.sample_rate):
+            rule = request.url_rule
+            route = rule.rule if rule is not None else request.path
+            self.begin(f"{request.method} {route}", route)
+
+    def _after_request(self, response):
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            self.finish(trace.status if exc is None else 500)
+
+    def install(self, app):
+        """Configura el trazado desde ``app.config`` y registra los hooks si está activo."""
+        self.enabled = bool(app.config["TRACE_ENABLED"])
+        self.sample_rate = float(app.config["TRACE_SAMPLE_RATE"])
+        self.header = app.config["TRACE_HEADER"]
+        self.resize(app.config["TRACE_BUFFER"])
+        if self.enabled:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+            app.teardown_request(self._teardown_request)
+
+
+# Instancia global
+tracer = Tracer()
+span = tracer.span
+
+
+def traced(name: str, cat: str = "app"):
+    """Decorador: anota cada llamada como span cuando el hilo tiene una traza activa."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = getattr(tracer._local, "trace", None)
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name, cat, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,4 @@
+"""Benchmarks de la API: escenarios de carga, percentiles de latencia y baselines.
+
+Uso: python -m backend.bench --help
+"""
@@ -0,0 +1,118 @@
+"""CLI de benchmarks.
+
+Ejemplos:
+
+    python -m backend.bench --list
+    python -m backend.bench -s create -s mixed -t client -t socket -c 16 -d 10
+    python -m backend.bench -s mixed --save-baseline build/bench/baseline.json
+    python -m backend.bench -s mixed --baseline build/bench/baseline.json --threshold p95=15
+    python -m backend.bench -s create --url http://127.0.0.1:5000   # servidor ya en marcha
+
+Devuelve código 1 si hay regresiones respecto a la baseline.
+"""
+import argparse
+import json
+import sys
+
+from . import report, runner, scenarios
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.bench", description="Benchmarks de la API")
+    parser.add_argument("-s", "--scenario", action="append", dest="scenarios",
+                        help="escenario a ejecutar (repetible; por defecto 'mixed')")
+    parser.add_argument("-t", "--transport", action="append", dest="transports",
+                        choices=("client", "socket"), help="test client o socket HTTP real (repetible)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="segundos medidos por escenario")
+    parser.add_argument("-n", "--requests", type=int, help="peticiones totales (en lugar de --duration)")
+    parser.add_argument("--warmup", type=float, default=1.0, help="segundos de calentamiento sin medir")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="medir un servidor ya en marcha (implica transporte socket)")
+    parser.add_argument("--server-threads", type=int, default=16, help="hilos del servidor local con -t socket")
+    parser.add_argument("-o", "--output", help="guardar el informe JSON en este archivo")
+    parser.add_argument("--save-baseline", help="guardar el informe como baseline")
+    parser.add_argument("--baseline", help="comparar con esta baseline")
+    parser.add_argument("--threshold", action="append", default=[], metavar="METRICA=PCT",
+                        help="umbral de regresión (throughput, p50, p95, p99)")
+    parser.add_argument("--list", action="store_true", help="listar escenarios")
+    return parser.parse_args(argv)
+
+
+def _thresholds(values: list) -> dict:
+    thresholds = {}
+    for value in values:
+        metric, _, pct = value.partition("=")
+        try:
+            if metric not in report.DEFAULT_THRESHOLDS:
+                raise ValueError(metric)
+            thresholds[metric] = float(pct)
+            if not thresholds[metric] >= 0:  # También rechaza NaN
+                raise ValueError(pct)
+        except ValueError:
+            raise SystemExit(f"Umbral inválido: '{value}'")
+    return thresholds
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.list:
+        for name, (description, _) in scenarios.SCENARIOS.items():
+            print(f"{name:12} {description}")
+        return 0
+
+    thresholds = _thresholds(args.threshold)
+    names = args.scenarios or ["mixed"]
+    transports = ["socket"] if args.url else (args.transports or ["client"])
+
+    from ..app import create_app
+    app = create_app()
+
+    results = {}
+    for transport_name in transports:
+        if transport_name == "client":
+            transport = runner.ClientTransport(app)
+        else:
+            transport = runner.SocketTransport(app, url=args.url, threads=args.server_threads)
+        try:
+            for name in names:
+                key = f"{name}@{transport_name}"
+                print(f"-> {key} (c={args.concurrency})", file=sys.stderr, flush=True)
+                results[key] = runner.run(
+                    transport, scenarios.build(name), concurrency=args.concurrency,
+                    duration=args.duration, requests=args.requests, warmup=args.warmup,
+                    seed=args.seed,
+                )
+                results[key]["scenario"] = name
+        finally:
+            transport.close()
+
+    output = {
+        "environment": report.environment(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "url": args.url,
+        },
+        "results": results,
+    }
+
+    status = 0
+    if args.baseline:
+        output["comparison"] = report.compare(output, report.load(args.baseline), thresholds)
+        status = 1 if output["comparison"]["regressions"] else 0
+    if args.output:
+        report.save(output, args.output)
+    if args.save_baseline:
+        report.save(output, args.save_baseline)
+
+    json.dump(output, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Resúmenes de latencia/throughput y comparación contra baselines guardadas."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+# Umbrales de regresión por defecto (porcentaje respecto a la baseline)
+DEFAULT_THRESHOLDS = {"throughput": 10.0, "p50": 15.0, "p95": 20.0, "p99": 30.0}
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _latency(values: list) -> dict:
+    values = sorted(values)
+    ms = 1000.0
+    return {
+        "mean": round(sum(values) / len(values) * ms, 4) if values else 0.0,
+        "p50": round(percentile(values, 50) * ms, 4),
+        "p95": round(percentile(values, 95) * ms, 4),
+        "p99": round(percentile(values, 99) * ms, 4),
+        "max": round(values[-1] * ms, 4) if values else 0.0,
+    }
+
+
+def summarize(records: list, seconds: float) -> dict:
+    """
+    Resume registros ``(nombre, status, segundos, bytes)``.
+
+    Errores: fallos de transporte (status 0) y respuestas 5xx; los 429 se
+    cuentan aparte como rechazos por contrapresión.
+    """
+    by_status = {}
+    by_step = {}
+    total_bytes = 0
+    for name, status, elapsed, size in records:
+        by_status[status] = by_status.get(status, 0) + 1
+        by_step.setdefault(name, []).append(elapsed)
+        total_bytes += size
+
+    errors = sum(count for status, count in by_status.items() if status == 0 or status >= 500)
+    steps = {
+        name: {"requests": len(values), **_latency(values)}
+        for name, values in sorted(by_step.items())
+    }
+    return {
+        "requests": len(records),
+        "seconds": round(seconds, 3),
+        "throughput": round(len(records) / seconds, 2) if seconds > 0 else 0.0,
+        "bytes": total_bytes,
+        "errors": errors,
+        "rejected": by_status.get(429, 0),
+        "status": {str(status): count for status, count in sorted(by_status.items())},
+        "latency_ms": _latency([elapsed for _, _, elapsed, _ in records]),
+        "steps": steps,
+    }
+
+
+def environment() -> dict:
+    """Datos del entorno para interpretar (y no comparar a ciegas) los resultados."""
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "git_revision": revision,
+    }
+
+
+def compare(current: dict, baseline: dict, thresholds: dict = None) -> dict:
+    """
+    Compara cada escenario con la baseline.
+
+    Es regresión si el throughput cae o p50/p95/p99 suben más que su umbral
+    (en %), o si aparecen errores que la baseline no tenía.
+    """
+    thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+    checks = []
+    for scenario, result in current["results"].items():
+        base = baseline.get("results", {}).get(scenario)
+        if base is None:
+            checks.append({"scenario": scenario, "metric": "*", "status": "missing-baseline"})
+            continue
+        if (base.get("concurrency"), base.get("transport")) != (result.get("concurrency"), result.get("transport")):
+            # Con otra concurrencia o transporte las cifras no son comparables
+            checks.append({"scenario": scenario, "metric": "*", "status": "config-mismatch",
+                           "baseline": {"concurrency": base.get("concurrency"), "transport": base.get("transport")},
+                           "current": {"concurrency": result.get("concurrency"), "transport": result.get("transport")}})
+            continue
+
+        def check(metric, now, before, higher_is_worse):
+            if not before:
+                return
+            change = (now - before) / before * 100.0
+            worse = change if higher_is_worse else -change
+            checks.append({
+                "scenario": scenario,
+                "metric": metric,
+                "baseline": before,
+                "current": now,
+                "change_pct": round(change, 2),
+                "threshold_pct": thresholds[metric],
+                "status": "regression" if worse > thresholds[metric] else
+                          "improvement" if worse < -thresholds[metric] else "ok",
+            })
+
+        check("throughput", result["throughput"], base["throughput"], higher_is_worse=False)
+        for metric in ("p50", "p95", "p99"):
+            check(metric, result["latency_ms"][metric], base["latency_ms"][metric], higher_is_worse=True)
+        if result["errors"] and not base.get("errors"):
+            checks.append({"scenario": scenario, "metric": "errors", "baseline": 0,
+                           "current": result["errors"], "status": "regression"})
+
+    return {
+        "thresholds": thresholds,
+        "regressions": sum(1 for c in checks if c["status"] == "regression"),
+        "checks": checks,
+    }
+
+
+def load(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(report: dict, path) -> Path:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+    return path
@@ -0,0 +1,158 @@
+"""Ejecución concurrente de escenarios por test client o por socket HTTP real."""
+import http.client
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from ..app.utils.prefork import PooledWSGIServer
+from .report import summarize
+
+
+class ClientTransport:
+    """Peticiones en proceso con el test client de Flask (sin red ni servidor WSGI)."""
+
+    name = "client"
+
+    def __init__(self, app):
+        self.app = app
+
+    def connect(self):
+        client = self.app.test_client()
+
+        def send(method: str, path: str):
+            response = client.open(path, method=method)
+            size = len(response.get_data())
+            response.close()
+            return response.status_code, size
+
+        return send
+
+    def close(self):
+        pass
+
+
+class SocketTransport:
+    """
+    Peticiones HTTP/1.1 con keep-alive sobre un socket local.
+
+    Sin ``url`` levanta la aplicación en un puerto efímero con el mismo
+    servidor que usan los workers de producción; con ``url`` mide un
+    servidor ya en marcha (p. ej. ``python -m backend.run --production``).
+    """
+
+    name = "socket"
+
+    def __init__(self, app=None, url: str = None, threads: int = 16):
+        self._server = None
+        if url is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind(("127.0.0.1", 0))
+            sock.listen(1024)
+            self._socket = sock
+            host, port = sock.getsockname()
+            self._server = PooledWSGIServer(host, port, app, fd=sock.fileno(),
+                                            threads=threads, keepalive=5.0)
+            threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.1},
+                             name="bench-server", daemon=True).start()
+            url = f"http://{host}:{port}"
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+
+    def connect(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+        def send(method: str, path: str):
+            nonlocal conn
+            try:
+                conn.request(method, path)
+                response = conn.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                # Reconectar en la siguiente petición
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                raise
+            if response.will_close:
+                conn.close()
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return response.status, len(body)
+
+        return send
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.drain()
+            self._server.server_close()
+            self._socket.close()
+
+
+def _picker(steps: list, seed: int):
+    rng = random.Random(seed)
+    weights = [step.weight for step in steps]
+    while True:
+        yield from rng.choices(steps, weights=weights, k=256)
+
+
+def run(transport, steps: list, concurrency: int = 8, duration: float = 5.0,
+        requests: int = None, warmup: float = 1.0, seed: int = 0) -> dict:
+    """
+    Lanza ``concurrency`` hilos que envían peticiones del escenario.
+
+    Termina tras ``duration`` segundos o, si se indica, tras ``requests``
+    peticiones en total. Las peticiones del calentamiento no se miden.
+    """
+    samples = [[] for _ in range(concurrency)]
+    start_barrier = threading.Barrier(concurrency + 1)
+    state = {"measure_from": None, "deadline": None}
+    quota = None if requests is None else [requests // concurrency + (i < requests % concurrency)
+                                           for i in range(concurrency)]
+
+    def worker(index: int):
+        send = transport.connect()
+        picker = _picker(steps, seed + index)
+        local = samples[index]
+        start_barrier.wait()
+        remaining = None if quota is None else quota[index]
+        clock = time.perf_counter
+        while True:
+            now = clock()
+            if remaining is None:
+                if now >= state["deadline"]:
+                    break
+            elif remaining == 0 and now >= state["measure_from"]:
+                break
+            step = next(picker)
+            t0 = clock()
+            try:
+                status, size = send(step.method, step.path)
+            except Exception:
+                status, size = 0, 0
+            elapsed = clock() - t0
+            if t0 >= state["measure_from"]:
+                local.append((step.name, status, elapsed, size))
+                if remaining is not None:
+                    remaining -= 1
+
+    threads = [threading.Thread(target=worker, args=(i,), name=f"bench-{i}", daemon=True)
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    began = time.perf_counter()
+    state["measure_from"] = began + warmup
+    state["deadline"] = state["measure_from"] + duration
+    start_barrier.wait()
+    for thread in threads:
+        thread.join()
+    measured = time.perf_counter() - state["measure_from"]
+
+    records = [record for local in samples for record in local]
+    summary = summarize(records, measured)
+    summary["concurrency"] = concurrency
+    summary["transport"] = transport.name
+    return summary
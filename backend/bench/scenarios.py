@@ -0,0 +1,79 @@
+"""Escenarios de carga: listas ponderadas de peticiones contra la API."""
+from ..app.routes import FACTORIES
+from ..app.utils.character_catalog import PARTES, character_catalog
+
+
+class Step:
+    """Una petición del escenario con su peso relativo."""
+
+    __slots__ = ("name", "method", "path", "weight")
+
+    def __init__(self, name: str, method: str, path: str, weight: int = 1):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.weight = weight
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "method": self.method, "path": self.path, "weight": self.weight}
+
+
+def _image_paths() -> list:
+    """Rutas web de las imágenes de cada raza según el catálogo."""
+    paths = []
+    for kind, factory_class in FACTORIES.items():
+        race = character_catalog.get(kind, factory_class)
+        for parte in PARTES:
+            for value in race.parts[parte].values():
+                if isinstance(value, str) and value.startswith("/images/"):
+                    paths.append((kind, parte, value))
+    return paths
+
+
+def _create(weight: int = 1) -> list:
+    return [Step(f"create:{kind}", "GET", f"/api/create/{kind}", weight) for kind in FACTORIES]
+
+
+def _info(weight: int = 1) -> list:
+    return [Step(f"info:{kind}", "GET", f"/api/character/{kind}/info", weight) for kind in FACTORIES]
+
+
+def _images_api(weight: int = 1) -> list:
+    steps = [Step("images:list", "GET", "/api/images/characters?limit=100", weight)]
+    for kind, parte, path in _image_paths():
+        rel = path[len("/images/characters/"):]
+        steps.append(Step(f"images:api:{parte}", "GET", f"/api/images/characters/{rel}", weight))
+    return steps
+
+
+def _static(weight: int = 1) -> list:
+    return [Step(f"static:{parte}", "GET", path, weight) for _, parte, path in _image_paths()]
+
+
+def _pool(weight: int = 1) -> list:
+    steps = [Step("pool:status", "GET", "/api/pool/status", 8 * weight)]
+    for kind in FACTORIES:
+        # Ciclo de borrado y recarga: la siguiente creación vuelve a construir la fábrica
+        steps.append(Step("pool:delete", "DELETE", f"/api/pool/delete/{kind}", weight))
+        steps.append(Step(f"create:{kind}", "GET", f"/api/create/{kind}", 2 * weight))
+    return steps
+
+
+SCENARIOS = {
+    "create": ("Creación de personajes con las cuatro razas mezcladas", lambda: _create()),
+    "info": ("Información de personaje (catálogo + pool_stats)", lambda: _info()),
+    "images-api": ("Listado e imágenes servidas por /api/images", lambda: _images_api()),
+    "static": ("Imágenes estáticas bajo /images", lambda: _static()),
+    "pool": ("Estado del pool con borrados y recargas de fábricas", lambda: _pool()),
+    "mixed": (
+        "Tráfico mixto: creación, info, imágenes y pool",
+        lambda: _create(4) + _info(2) + _static(1) + _images_api(1)
+        + [Step("pool:status", "GET", "/api/pool/status", 2)],
+    ),
+}
+
+
+def build(name: str) -> list:
+    if name not in SCENARIOS:
+        raise ValueError(f"Escenario desconocido: '{name}' (disponibles: {', '.join(SCENARIOS)})")
+    return SCENARIOS[name][1]()
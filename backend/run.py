@@ -1,16 +1,16 @@
 """Launcher for the Flask backend package.
 
 Run with: python -m backend.run
+Production (pre-fork, multi-process): python -m backend.run --production
 """
+import os
+import sys
 
 try:
     from backend.app import create_app
 except Exception:
     # Al ejecutar `python backend/run.py` es posible que el paquete no esté
     # en sys.path; añadir el directorio padre para permitir importaciones
-    import os
-    import sys
-
     pkg_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     if pkg_root not in sys.path:
         sys.path.insert(0, pkg_root)
@@ -18,10 +18,61 @@ except Exception:
     from backend.app import create_app
 
 
-def main():
-    app = create_app()
-    app.run(host="127.0.0.1", port=5000, debug=True)
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backend de Fábrica de Personajes")
+    parser.add_argument("--production", action="store_true",
+                        default=os.environ.get("FABRICA_ENV") == "production",
+                        help="servidor pre-fork multi-proceso (también con FABRICA_ENV=production)")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="procesos worker")
+    parser.add_argument("--threads", type=int, help="hilos por worker")
+    parser.add_argument("--max-requests", type=int, help="peticiones antes de reciclar un worker (0 = nunca)")
+    parser.add_argument("--graceful-timeout", type=float, help="segundos para terminar peticiones en curso")
+    parser.add_argument("--pool-state", choices=("local", "sqlite"),
+                        default=os.environ.get("FABRICA_POOL_STATE"),
+                        help="estado del pool entre workers (en producción, sqlite por defecto)")
+    return parser.parse_args(argv)
+
+
+def simulation_workers(server_workers: int, environ=None) -> int:
+    """
+    Procesos de simulación por worker en producción: ``FABRICA_SIMULATION_WORKERS``
+    o las CPU repartidas entre los workers (al menos uno).
+    """
+    environ = os.environ if environ is None else environ
+    value = environ.get("FABRICA_SIMULATION_WORKERS")
+    if value not in (None, ""):
+        return int(value)
+    return max(1, (os.cpu_count() or 1) // server_workers)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.production:
+        app = create_app({"POOL_STATE": args.pool_state or "local"})
+        app.run(host=args.host or "127.0.0.1", port=args.port or 5000, debug=True)
+        return 0
+
+    from backend.app.utils.prefork import PreforkServer, ServerConfig
+    config = ServerConfig.load({
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "threads": args.threads,
+        "max_requests": args.max_requests,
+        "graceful_timeout": args.graceful_timeout,
+    })
+    # Con varios workers el estado del pool se comparte en SQLite (WAL) y
+    # los procesos de simulación se reparten las CPU entre los workers
+    app = create_app({
+        "POOL_STATE": args.pool_state or "sqlite",
+        "SIMULATION_WORKERS": simulation_workers(config.workers),
+    })
+    return PreforkServer(app, config).run()
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""Fixtures comunes: aplicación con todos los directorios de trabajo en ``tmp_path``."""
+import pytest
+
+from backend.app import create_app
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Construye la aplicación con la configuración indicada sobre la de pruebas."""
+    def factory(**config):
+        base = {
+            "TESTING": True,
+            "WARM_UP": False,
+            "POOL_STATE": "local",
+            "POOL_STATE_PATH": tmp_path / "pool-state.sqlite3",
+            "CHARACTER_STORE_PATH": tmp_path / "characters.sqlite3",
+            "POPULATION_DIR": tmp_path / "populations",
+            "SIMULATION_DIR": tmp_path / "simulations",
+            "SPRITE_CACHE_DIR": tmp_path / "sprites",
+            "PROFILE_DIR": tmp_path / "profiles",
+        }
+        base.update(config)
+        return create_app(base)
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def image_dir(tmp_path, monkeypatch):
+    """Categoría ``characters`` apuntando a un directorio temporal, sin paquetes mmap."""
+    from backend.app.utils.asset_pack import asset_packs
+    from backend.app.utils.image_manager import image_manager
+
+    base = tmp_path / "images"
+    (base / "elfo").mkdir(parents=True)
+    (base / "elfo" / "arma.png").write_bytes(b"\x89PNG-v1")
+    monkeypatch.setitem(image_manager._base_paths, "characters", base)
+    image_manager.invalidate("characters")
+    asset_packs.unload()
+    yield base
+    asset_packs.unload()
+    monkeypatch.undo()
+    image_manager.invalidate("characters")
@@ -0,0 +1,155 @@
+import threading
+import time
+
+import pytest
+
+from backend.app.utils.admission import AdmissionController, ClientBuckets, Rejected, TokenBucket
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condición no alcanzada a tiempo"
+        time.sleep(0.001)
+
+
+def _queue(controller, waiters, order, max_wait=5.0):
+    """Encola ``waiters`` ((kind, plazo relativo, etiqueta)) en hilos que anotan su turno."""
+    threads = []
+    for kind, delay, label in waiters:
+        def run(kind=kind, delay=delay, label=label):
+            controller.acquire(kind, time.monotonic() + delay)
+            order.append(label)
+            controller.release()
+        thread = threading.Thread(target=run)
+        thread.start()
+        threads.append(thread)
+        # Encolar en orden: la secuencia desempata plazos iguales
+        _wait_until(lambda n=len(threads): controller.queued == n)
+    return threads
+
+
+def test_nunca_supera_las_plazas_concurrentes():
+    controller = AdmissionController(max_concurrent=3, queue_size=200, max_wait=10.0)
+    lock = threading.Lock()
+    active = peak = 0
+    errors = []
+
+    def worker():
+        nonlocal active, peak
+        for _ in range(20):
+            try:
+                controller.acquire("elfos", time.monotonic() + 10.0)
+            except Rejected as error:  # pragma: no cover - no debería ocurrir
+                errors.append(error)
+                continue
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.0005)
+            with lock:
+                active -= 1
+            controller.release(0.0005)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert peak <= 3
+    state = controller.snapshot()
+    assert state["in_flight"] == 0 and state["queued"] == 0
+
+
+def test_turnos_entre_razas_y_plazo_dentro_de_cada_una():
+    controller = AdmissionController(max_concurrent=1, queue_size=10, max_wait=5.0)
+    controller.acquire("orcos", time.monotonic() + 1)
+    order = []
+    threads = _queue(controller, [
+        ("orcos", 4.0, "orcos-lejano"),
+        ("orcos", 2.0, "orcos-cercano"),
+        ("orcos", 3.0, "orcos-medio"),
+        ("elfos", 4.0, "elfos"),
+    ], order)
+    controller.release()
+    for thread in threads:
+        thread.join()
+    # Una raza saturada no deja sin turno a las demás
+    assert order == ["orcos-cercano", "elfos", "orcos-medio", "orcos-lejano"]
+
+
+def test_plazo_vencido_no_pierde_la_plaza():
+    controller = AdmissionController(max_concurrent=1, queue_size=10, max_wait=5.0)
+    controller.service_time = 0.001
+    controller.acquire("elfos", time.monotonic() + 1)
+    with pytest.raises(Rejected) as error:
+        controller.acquire("elfos", time.monotonic() + 0.05)
+    assert (error.value.status, error.value.reason) == (503, "deadline")
+    assert controller.snapshot()["queued"] == 0
+
+    controller.release()
+    assert controller.acquire("elfos", time.monotonic() + 0.05) == 0.0
+    controller.release()
+    assert controller.snapshot()["in_flight"] == 0
+
+
+def test_cola_llena():
+    controller = AdmissionController(max_concurrent=1, queue_size=1, max_wait=5.0)
+    controller.acquire("elfos", time.monotonic() + 1)
+    order = []
+    threads = _queue(controller, [("elfos", 2.0, "en-cola")], order)
+    with pytest.raises(Rejected) as error:
+        controller.acquire("elfos", time.monotonic() + 2.0)
+    assert error.value.reason == "queue_full"
+    assert error.value.retry_after >= 1
+    controller.release()
+    threads[0].join()
+    assert order == ["en-cola"]
+
+
+def test_rechazo_inmediato_si_la_espera_no_cabe_en_el_plazo():
+    controller = AdmissionController(max_concurrent=1, queue_size=10, max_wait=5.0)
+    controller.service_time = 1.0
+    controller.acquire("elfos", time.monotonic() + 1)
+    start = time.monotonic()
+    with pytest.raises(Rejected, match="deadline"):
+        controller.acquire("elfos", start + 0.5)
+    assert time.monotonic() - start < 0.25
+
+
+def test_cubeta_de_tokens():
+    bucket = TokenBucket(2.0, now=0.0)
+    assert bucket.take(rate=1.0, burst=2.0, now=0.0) == 0.0
+    assert bucket.take(rate=1.0, burst=2.0, now=0.0) == 0.0
+    assert bucket.take(rate=1.0, burst=2.0, now=0.0) == pytest.approx(1.0)
+    assert bucket.take(rate=1.0, burst=2.0, now=1.5) == 0.0
+
+
+def test_cubetas_por_cliente_acotadas_y_concurrentes():
+    clients = ClientBuckets(rate=0.001, burst=5, max_clients=4)
+    granted = []
+
+    def take():
+        granted.append(clients.take("a") == 0.0)
+
+    threads = [threading.Thread(target=take) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Exactamente la ráfaga, sin carreras entre hilos
+    assert granted.count(True) == 5
+    for name in "bcdef":
+        clients.take(name)
+    assert len(clients) == 4
+
+
+def test_ritmo_por_cliente_429(make_app):
+    client = make_app(ADMISSION_RATE=0.001, ADMISSION_BURST=1).test_client()
+    assert client.get("/api/create/elfos").status_code == 200
+    response = client.get("/api/create/elfos")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["reason"] == "rate_limited"
@@ -0,0 +1,74 @@
+import hashlib
+import os
+from pathlib import Path
+from wsgiref.util import FileWrapper
+
+import pytest
+
+from backend.app.utils import asset_pack
+from backend.app.utils.asset_pack import AssetPack, PackSlice, build_pack
+
+
+@pytest.fixture
+def pack(image_dir, tmp_path):
+    (image_dir / "elfo" / "cuerpo.png").write_bytes(b"cuerpo" * 1000)
+    from backend.app.utils.image_manager import image_manager
+    image_manager.invalidate("characters")
+    pack = AssetPack(build_pack("characters", tmp_path / "packs"))
+    yield pack
+    pack.close()
+
+
+def test_file_wrapper_limitado_a_la_entrada(pack):
+    entry = pack.lookup("elfo/arma.png")
+    body = PackSlice(pack, entry).file_wrapper({"wsgi.file_wrapper": FileWrapper})
+    # Un wrapper que lee hasta EOF se detiene al final de la entrada, no del paquete
+    data = b"".join(body)
+    body.close()
+    assert data == b"\x89PNG-v1"
+    assert data == bytes(pack.view(entry))
+
+
+def test_build_copia_por_bloques_sin_leer_archivos_enteros(image_dir, tmp_path, monkeypatch):
+    contents = {"elfo/arma.png": b"\x89PNG-v1", "elfo/cuerpo.png": os.urandom(10000)}
+    (image_dir / "elfo" / "cuerpo.png").write_bytes(contents["elfo/cuerpo.png"])
+    monkeypatch.setattr(asset_pack, "_CHUNK", 1000)
+    monkeypatch.setattr(Path, "read_bytes", lambda self: pytest.fail("build_pack leyó un archivo entero"))
+
+    pack = AssetPack(build_pack("characters", tmp_path / "packs"))
+    try:
+        assert set(pack.entries) == set(contents)
+        for rel, data in contents.items():
+            entry = pack.lookup(rel)
+            assert entry[0] % asset_pack._ALIGN == 0
+            assert entry[1] == len(data)
+            assert entry[2] == os.stat(image_dir / rel).st_mtime
+            assert entry[3] == hashlib.sha256(data).hexdigest()
+            assert bytes(pack.view(entry)) == data
+        assert os.path.getsize(pack.path) == max(o + n for o, n, _, _ in pack.entries.values())
+    finally:
+        pack.close()
+
+
+def test_lookup_rechaza_archivo_cambiado(pack):
+    entry = pack.entries["elfo/arma.png"]
+    assert pack.lookup("elfo/arma.png", entry[1], entry[2]) == entry
+    assert pack.lookup("elfo/arma.png", entry[1] + 1, entry[2]) is None
+    assert pack.lookup("elfo/arma.png", entry[1], entry[2] - 5) is None
+    assert pack.lookup("elfo/otra.png") is None
+
+
+def test_sobrescritura_sirve_el_archivo_suelto(make_app, image_dir, tmp_path):
+    build_pack("characters", tmp_path / "packs")
+    client = make_app(ASSET_PACK_DIR=tmp_path / "packs").test_client()
+    url = "/images/characters/elfo/arma.png"
+    assert client.get(url).data == b"\x89PNG-v1"
+
+    path = image_dir / "elfo" / "arma.png"
+    mtime = os.stat(path).st_mtime
+    with open(path, "r+b") as f:
+        f.write(b"\x89PNG-v2")
+    # Mismo tamaño y mtime anterior: antes se seguía sirviendo el paquete
+    os.utime(path, (mtime - 100, mtime - 100))
+    response = client.get(url)
+    assert response.data == b"\x89PNG-v2"
@@ -0,0 +1,53 @@
+import json
+import threading
+
+from backend.app.patterns.singleton_pool import Pool
+from backend.app.routes import FACTORIES
+from backend.app.utils.batch_stream import parse_mix, stream_batch
+
+
+def _in_use(kind):
+    fabrica = Pool().get_factory(FACTORIES[kind])
+    return {parte: stats["in_use"] for parte, stats in fabrica.get_pool_stats().items()}
+
+
+def test_no_retiene_partes_entre_escrituras(app):
+    stream = stream_batch(parse_mix("elfos:1,orcos:1", FACTORIES), 1000, FACTORIES, chunk_lines=10)
+    first = next(stream)
+    # Cliente lento: el generador está suspendido tras el primer bloque
+    assert len(first.splitlines()) == 10
+    assert set(_in_use("elfos").values()) == {0}
+    assert set(_in_use("orcos").values()) == {0}
+    stream.close()
+
+
+def test_resumen_y_lineas(client):
+    response = client.get("/api/batch/create?mix=elfos:3,orcos:1&count=40")
+    lines = [json.loads(line) for line in response.data.splitlines()]
+    assert len(lines) == 41
+    assert lines[-1]["summary"]["by_kind"] == {"elfos": {"created": 30, "failed": 0},
+                                               "orcos": {"created": 10, "failed": 0}}
+    assert all(line["status"] == "created" for line in lines[:-1])
+
+
+def test_lotes_suspendidos_no_agotan_create(app):
+    # Tantos lotes a medias como objetos tiene cada pool, cada uno en su hilo como en el servidor
+    started, release = threading.Barrier(11), threading.Event()
+
+    def slow_client():
+        response = app.test_client().get("/api/batch/create?kind=humanos&count=5000", buffered=False)
+        next(iter(response.response))
+        started.wait()
+        release.wait()
+        response.close()
+
+    threads = [threading.Thread(target=slow_client) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    try:
+        assert app.test_client().get("/api/create/humanos?timeout=0.05").status_code == 200
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
@@ -0,0 +1,109 @@
+import json
+
+import pytest
+
+from backend.bench import __main__ as cli
+from backend.bench import report
+
+
+def _result(throughput=100.0, p50=10.0, p95=20.0, p99=30.0, errors=0, concurrency=8, transport="client"):
+    return {
+        "concurrency": concurrency,
+        "transport": transport,
+        "throughput": throughput,
+        "errors": errors,
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99},
+    }
+
+
+def _statuses(comparison):
+    return {(check["scenario"], check["metric"]): check["status"] for check in comparison["checks"]}
+
+
+@pytest.mark.parametrize("pct, expected", [(0, 1), (25, 3), (50, 5), (90, 9), (95, 10), (99, 10), (100, 10)])
+def test_percentil_por_rango_mas_cercano(pct, expected):
+    assert report.percentile(list(range(1, 11)), pct) == expected
+
+
+def test_percentil_casos_limite():
+    assert report.percentile([], 50) == 0.0
+    assert report.percentile([7], 99) == 7
+    assert report.percentile([1, 2, 3, 4], 25) == 1
+    assert report.percentile([1, 2, 3, 4], 26) == 2
+
+
+def test_summarize_errores_rechazos_y_latencias():
+    records = [("a", 200, 0.010, 100), ("a", 200, 0.030, 100), ("b", 429, 0.001, 10),
+               ("b", 503, 0.002, 10), ("b", 0, 0.004, 0)]
+    summary = report.summarize(records, 2.0)
+    assert summary["requests"] == 5
+    assert summary["throughput"] == 2.5
+    assert summary["bytes"] == 220
+    assert summary["errors"] == 2  # 5xx y fallo de transporte; el 429 va aparte
+    assert summary["rejected"] == 1
+    assert summary["status"] == {"0": 1, "200": 2, "429": 1, "503": 1}
+    assert summary["latency_ms"]["p50"] == 4.0
+    assert summary["latency_ms"]["max"] == 30.0
+    assert summary["steps"]["a"] == {"requests": 2, "mean": 20.0, "p50": 10.0, "p95": 30.0, "p99": 30.0,
+                                     "max": 30.0}
+    assert report.summarize([], 0)["throughput"] == 0.0
+
+
+def test_direccion_de_cada_metrica():
+    baseline = {"results": {"s": _result()}}
+    # Cae el throughput y sube la latencia: ambas son regresiones
+    worse = report.compare({"results": {"s": _result(throughput=80.0, p95=30.0)}}, baseline)
+    assert _statuses(worse)[("s", "throughput")] == "regression"
+    assert _statuses(worse)[("s", "p95")] == "regression"
+    assert _statuses(worse)[("s", "p50")] == "ok"
+    assert worse["regressions"] == 2
+    # Sube el throughput y baja la latencia: mejoras, no regresiones
+    better = report.compare({"results": {"s": _result(throughput=150.0, p99=10.0)}}, baseline)
+    assert _statuses(better)[("s", "throughput")] == "improvement"
+    assert _statuses(better)[("s", "p99")] == "improvement"
+    assert better["regressions"] == 0
+
+
+def test_umbrales_y_casos_no_comparables():
+    baseline = {"results": {"s": _result(), "otra": _result()}}
+    current = {"results": {"s": _result(p95=23.0, errors=3), "otra": _result(concurrency=16),
+                           "nueva": _result()}}
+    # p95 sube un 15 %: regresión con umbral 10, no con el de por defecto (20)
+    assert _statuses(report.compare(current, baseline))[("s", "p95")] == "ok"
+    comparison = report.compare(current, baseline, {"p95": 10.0})
+    statuses = _statuses(comparison)
+    assert comparison["thresholds"]["p95"] == 10.0
+    assert comparison["thresholds"]["p99"] == report.DEFAULT_THRESHOLDS["p99"]
+    assert statuses[("s", "p95")] == "regression"
+    assert statuses[("s", "errors")] == "regression"
+    assert statuses[("otra", "*")] == "config-mismatch"
+    assert statuses[("nueva", "*")] == "missing-baseline"
+    assert comparison["regressions"] == 2
+
+
+def test_parseo_de_umbrales():
+    assert cli._thresholds(["p95=15", "throughput=5.5"]) == {"p95": 15.0, "throughput": 5.5}
+    for value in ("p42=10", "p95", "p95=", "p95=x", "p95=-1", "p95=nan"):
+        with pytest.raises(SystemExit, match="Umbral inválido"):
+            cli._thresholds([value])
+
+
+@pytest.mark.parametrize("throughput, status", [(100.0, 0), (50.0, 1)])
+def test_codigo_de_salida_con_baseline(tmp_path, monkeypatch, capsys, throughput, status):
+    class Transport:
+        def __init__(self, app):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr("backend.app.create_app", lambda: None)
+    monkeypatch.setattr(cli.runner, "ClientTransport", Transport)
+    monkeypatch.setattr(cli.runner, "run", lambda *args, **kwargs: _result(throughput=throughput))
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": {"mixed@client": _result()}}), encoding="utf-8")
+
+    assert cli.main(["--baseline", str(baseline), "-o", str(tmp_path / "out.json")]) == status
+    saved = report.load(tmp_path / "out.json")
+    assert saved["comparison"]["regressions"] == status
+    assert json.loads(capsys.readouterr().out)["comparison"] == saved["comparison"]
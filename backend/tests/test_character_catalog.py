@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from backend.app.factories import race_registry
+from backend.app.utils import serialization
+from backend.app.utils.character_catalog import PARTES, CharacterCatalog, CompiledRace
+from backend.app.utils.image_manager import image_manager
+
+
+@pytest.fixture(autouse=True)
+def restore_encoder():
+    yield
+    serialization.configure_json("stdlib", compact=False)
+
+
+def _dict_path(kind: str) -> dict:
+    """Información de las cuatro partes por la vía de diccionarios (fábrica con pools)."""
+    fabrica = race_registry[kind](modo="pool")
+    personaje = fabrica.crear_personaje()
+    try:
+        return {parte: producto.obtener_informacion() for parte, producto in zip(PARTES, personaje)}
+    finally:
+        fabrica.devolver_personaje(*personaje)
+
+
+@pytest.mark.parametrize("encoder, compact", [("stdlib", False), ("stdlib", True), ("orjson", True)])
+@pytest.mark.parametrize("kind", ["elfos", "enanos", "humanos", "orcos"])
+def test_bytes_precompilados_igual_que_los_diccionarios(kind, encoder, compact):
+    if encoder == "orjson":
+        pytest.importorskip("orjson")
+    serialization.configure_json(encoder, compact=compact)
+    race = CompiledRace(kind, race_registry[kind], image_manager.generation())
+    character = _dict_path(kind)
+    stats = {"cuerpo": {"in_use": 0, "hits": 3}}
+
+    assert race.to_dict() == character
+    assert json.loads(race.create_body) == {"status": "created", "kind": kind, "character": character}
+    assert json.loads(race.info_body(stats)) == {"kind": kind, **character, "pool_stats": stats}
+    # Mismos bytes que el codificador configurado sobre el diccionario
+    assert race.create_body == serialization.dumps_json(
+        {"status": "created", "kind": kind, "character": character})
+    assert race.info_body(stats) == serialization.dumps_json({"kind": kind, **character, "pool_stats": stats})
+
+
+def test_recompila_al_cambiar_la_generacion(monkeypatch):
+    catalog = CharacterCatalog()
+    generation = [7]
+    monkeypatch.setattr(image_manager, "generation", lambda: generation[0])
+    factory_class = race_registry["elfos"]
+
+    first = catalog.get("elfos", factory_class)
+    assert first.generation == 7
+    assert catalog.get("elfos", factory_class) is first
+
+    generation[0] = 8
+    second = catalog.get("elfos", factory_class)
+    assert second is not first and second.generation == 8
+    assert catalog.get("elfos", factory_class) is second
+
+
+def test_cambio_de_imagenes_sube_la_generacion(image_dir):
+    before = image_manager.generation()
+    (image_dir / "elfo" / "nueva.png").write_bytes(b"\x89PNG-v2")
+    image_manager.invalidate("characters")
+    assert image_manager.generation() != before
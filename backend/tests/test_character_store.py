@@ -0,0 +1,99 @@
+import base64
+import json
+import sqlite3
+import time
+
+import pytest
+
+from backend.app.utils.character_store import character_store
+
+
+@pytest.fixture
+def store_client(make_app):
+    # Sin volcados en segundo plano: las pruebas llaman a flush() explícitamente
+    app = make_app(CHARACTER_STORE_ENABLED=True, CHARACTER_STORE_FLUSH_INTERVAL=60)
+    yield app.test_client()
+    character_store.configure(None)
+
+
+def _cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_desactivado_por_defecto(client):
+    client.get("/api/create/elfos")
+    assert not character_store.enabled
+    assert client.get("/api/characters").status_code == 404
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_paginacion_por_cursor(store_client, order):
+    for kind in ("elfos", "orcos", "enanos"):
+        assert store_client.get(f"/api/create/{kind}").status_code == 200
+    assert character_store.flush() == 3
+
+    first = store_client.get(f"/api/characters?limit=2&order={order}").get_json()
+    assert len(first["items"]) == 2 and first["next_cursor"]
+    rest = store_client.get(f"/api/characters?limit=2&order={order}&cursor={first['next_cursor']}").get_json()
+    assert len(rest["items"]) == 1 and rest["next_cursor"] is None
+    ids = [item["id"] for item in first["items"] + rest["items"]]
+    assert ids == sorted(ids, reverse=order == "desc")
+
+
+@pytest.mark.parametrize("cursor", [
+    _cursor([{}, "a"]),
+    _cursor(["created_at", "asc", {}, "a"]),
+    _cursor(["created_at", "asc", 1.5, "a"]),
+    _cursor(["created_at", "asc", 1.5, 2 ** 70]),
+    _cursor(["created_at", "desc", 1.5, 1]),
+    _cursor(["name", "asc", "a", "a"]),
+    "%%%",
+])
+def test_cursor_invalido_es_400(store_client, cursor):
+    response = store_client.get("/api/characters", query_string={"cursor": cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("query", ["since=abc", "until=1e400x", "since=nan", "until=inf"])
+def test_limites_de_tiempo_invalidos_son_400(store_client, query):
+    assert store_client.get(f"/api/characters?{query}").status_code == 400
+
+
+def test_filtro_por_instante(store_client):
+    store_client.get("/api/create/elfos")
+    assert character_store.flush() == 1
+    future = time.time() + 3600
+    assert store_client.get(f"/api/characters?since={future}").get_json()["items"] == []
+    assert len(store_client.get(f"/api/characters?until={future}").get_json()["items"]) == 1
+
+
+def test_lote_fallido_vuelve_a_la_cola_sin_ids_de_catalogo(store_client, monkeypatch):
+    store_client.get("/api/create/elfos")
+    store_client.get("/api/create/elfos")
+    monkeypatch.setattr(character_store, "_INSERT", "INSERT INTO no_existe VALUES (?, ?, ?)")
+    with pytest.raises(sqlite3.OperationalError):
+        character_store.flush()
+    # La transacción se deshizo: ni ids de catálogo cacheados ni personajes perdidos
+    assert character_store.stats()["catalog_entries"] == 0
+    assert character_store.stats()["queued"] == 2
+    assert character_store.stats()["failed_batches"] == 1
+
+    monkeypatch.undo()
+    assert character_store.flush() == 2
+    page = store_client.get("/api/characters").get_json()
+    assert [item["kind"] for item in page["items"]] == ["elfos", "elfos"]
+
+
+def test_retencion(make_app):
+    make_app(CHARACTER_STORE_ENABLED=True, CHARACTER_STORE_FLUSH_INTERVAL=60, CHARACTER_STORE_RETENTION=3600)
+    try:
+        conn = character_store._connection()
+        conn.execute("INSERT INTO catalog_entries (etag, kind, character, created_at) VALUES ('e', 'elfos', '{}', 0)")
+        now = time.time()
+        conn.executemany("INSERT INTO characters (kind, created_at, catalog_id) VALUES ('elfos', ?, 1)",
+                         [(now - 7200,), (now - 10,)])
+        assert character_store.prune(now) == 1
+        assert character_store.counts() == {"elfos": 1}
+        assert character_store.stats()["pruned"] == 1
+    finally:
+        character_store.configure(None)
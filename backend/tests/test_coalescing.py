@@ -0,0 +1,53 @@
+import threading
+import time
+
+from backend.app.utils.admission import admission
+from backend.app.utils.coalescing import coalescer
+
+
+INFO = "/api/character/elfos/info"
+
+
+def test_respuesta_en_cache_paga_la_cubeta_del_cliente(make_app):
+    client = make_app(COALESCE_TTL=60, ADMISSION_RATE=0.001, ADMISSION_BURST=1).test_client()
+    assert client.get(INFO).status_code == 200
+    # Servirla desde la caché no se salta el límite por cliente
+    response = client.get(INFO)
+    assert response.status_code == 429
+    assert response.get_json()["reason"] == "rate_limited"
+
+
+def test_seguidores_no_ocupan_plaza(make_app):
+    app = make_app(ADMISSION_MAX_CONCURRENT=1, ADMISSION_QUEUE_SIZE=0, COALESCE_MAX_WAIT=5)
+    view = app.view_functions["api.get_character_info"]
+    entered, release = threading.Event(), threading.Event()
+
+    def slow_view(**kwargs):
+        entered.set()
+        release.wait(5)
+        return view(**kwargs)
+
+    app.view_functions["api.get_character_info"] = slow_view
+    results = []
+
+    def get():
+        response = app.test_client().get(INFO)
+        results.append((response.status_code, response.get_data()))
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    assert entered.wait(5)
+    followers = [threading.Thread(target=get) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    time.sleep(0.2)  # Los seguidores ya esperan al líder
+    assert admission.controller.snapshot()["in_flight"] == 1
+    assert len(coalescer._flights) == 1
+
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+    # Con la cola a 0, un seguidor que pidiera plaza habría recibido 503
+    assert [status for status, _ in results] == [200] * 5
+    assert len({body for _, body in results}) == 1
+    assert admission.controller.snapshot()["in_flight"] == 0
@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend.app.utils.combat import simulation_jobs
+from backend.app.utils.population import available
+
+pytestmark = pytest.mark.skipif(not available(), reason="requiere NumPy")
+
+
+def _wait_done(client, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/api/simulations/{job_id}").get_json()
+        if job["status"] in ("done", "failed"):
+            return job
+        assert time.monotonic() < deadline, "simulación sin terminar a tiempo"
+        time.sleep(0.01)
+
+
+def test_semilla_negativa_es_400(client):
+    before = len(simulation_jobs.list())
+    response = client.post("/api/simulations?duels=10&seed=-1")
+    assert response.status_code == 400
+    assert len(simulation_jobs.list()) == before
+
+
+def test_poda_de_trabajos_en_disco(make_app):
+    client = make_app(SIMULATION_MAX_JOBS=2, SIMULATION_WORKERS=0).test_client()
+    directory = simulation_jobs.directory
+    directory.mkdir(parents=True, exist_ok=True)
+    # Trabajo de otro worker todavía en curso: no se borra aunque sea antiguo
+    running = {"id": "0" * 16, "status": "running", "pid": os.getpid()}
+    (directory / f"{running['id']}.json").write_text(json.dumps(running))
+    os.utime(directory / f"{running['id']}.json", (0, 0))
+
+    ids = []
+    for seed in range(4):
+        response = client.post(f"/api/simulations?duels=5&seed={seed}&kinds=elfos,orcos")
+        assert response.status_code == 202
+        ids.append(_wait_done(client, response.get_json()["id"])["id"])
+
+    remaining = {path.stem for path in directory.glob("*.json")}
+    assert remaining == {running["id"]} | set(ids[-2:])
+
+
+def test_tope_de_trabajos_pendientes(make_app, monkeypatch):
+    from backend.app.utils import combat
+
+    release = threading.Event()
+    original = combat.run_tournament
+
+    def blocked(*args, **kwargs):
+        release.wait(10)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(combat, "run_tournament", blocked)
+    client = make_app(SIMULATION_MAX_PENDING=2, SIMULATION_WORKERS=0).test_client()
+    url = "/api/simulations?duels=5&kinds=elfos,orcos"
+    ids = [client.post(url).get_json()["id"] for _ in range(2)]
+
+    response = client.post(url)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "5"
+    assert client.get("/api/simulations").get_json()["pending"] == 2
+
+    release.set()
+    for job_id in ids:
+        assert _wait_done(client, job_id)["status"] == "done"
+    deadline = time.monotonic() + 5
+    while simulation_jobs.pending:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert client.post(url).status_code == 202
+
+
+def test_procesos_de_simulacion_en_produccion(monkeypatch):
+    from backend.run import simulation_workers
+
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert simulation_workers(4, environ={}) == 2
+    assert simulation_workers(16, environ={}) == 1
+    assert simulation_workers(4, environ={"FABRICA_SIMULATION_WORKERS": "3"}) == 3
@@ -0,0 +1,138 @@
+import os
+import threading
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork()")
+
+
+def _threads_in_child():
+    """Nombres de los hilos vivos en un hijo recién creado con fork()."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            names = ",".join(sorted(thread.name for thread in threading.enumerate()))
+            os.write(write_fd, names.encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        names = f.read().decode()
+    os.waitpid(pid, 0)
+    return names.split(",")
+
+
+def test_varias_apps_un_solo_hilo_por_servicio_en_el_hijo(make_app):
+    for _ in range(3):
+        make_app(POOL_STATE="sqlite")
+    names = _threads_in_child()
+    # Los sinks y estados sustituidos no se relanzan en el hijo
+    assert names.count("action-event-flusher") == 1
+    assert names.count("pool-state-sync") == 1
+
+
+def test_sinks_y_estados_sustituidos_se_liberan(make_app):
+    import gc
+    import weakref
+
+    from backend.app.interfaces.interfaces import get_event_sink
+    from backend.app.patterns.singleton_pool import Pool
+
+    make_app(POOL_STATE="sqlite")
+    old_sink, old_state = weakref.ref(get_event_sink()), weakref.ref(Pool().state)
+    make_app(POOL_STATE="sqlite")
+    gc.collect()
+    # Un hook de fork por instancia los mantendría vivos para siempre
+    assert old_sink() is None
+    assert old_state() is None
+
+
+def test_maestro_sin_hilos_antes_de_fork(make_app, tmp_path):
+    from backend.app.utils.prefork import PreforkServer
+
+    make_app(POOL_STATE="sqlite", CHARACTER_STORE_ENABLED=True,
+             CHARACTER_STORE_PATH=tmp_path / "characters.sqlite3")
+    PreforkServer._quiesce()
+    master = {thread.name for thread in threading.enumerate()}
+    assert not master & {"action-event-flusher", "character-store-writer", "pool-state-sync"}
+
+    # Los hooks de fork los relanzan en cada worker
+    names = _threads_in_child()
+    for name in ("action-event-flusher", "character-store-writer", "pool-state-sync"):
+        assert names.count(name) == 1
+
+
+def _pipes(pid):
+    inodes = set()
+    for fd in os.listdir(f"/proc/{pid}/fd"):
+        try:
+            target = os.readlink(f"/proc/{pid}/fd/{fd}")
+        except FileNotFoundError:
+            continue
+        if target.startswith("pipe:"):
+            inodes.add(target)
+    return inodes
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/task"), reason="requiere /proc")
+def test_worker_no_hereda_el_pipe_de_senales(make_app):
+    import signal
+    import time
+    import urllib.request
+
+    from backend.app.utils.prefork import PreforkServer, ServerConfig
+
+    server = PreforkServer(make_app(), ServerConfig(port=0, workers=1, threads=2, max_requests=0,
+                                                    graceful_timeout=5))
+    server.bind()
+    port = server.socket.getsockname()[1]
+    master = os.fork()
+    if master == 0:
+        try:
+            server.run()
+        finally:
+            os._exit(0)
+    server.socket.close()
+    try:
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/api/ready", timeout=1).read()
+                break
+            except OSError:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        with open(f"/proc/{master}/task/{master}/children") as f:
+            worker = int(f.read().split()[0])
+        wakeup_pipe = _pipes(master) - _pipes(os.getpid())
+        assert wakeup_pipe
+        assert not _pipes(worker) & wakeup_pipe
+    finally:
+        os.kill(master, signal.SIGTERM)
+        os.waitpid(master, 0)
+
+
+def test_worker_vuelca_los_eventos_al_retirarse(make_app, tmp_path):
+    from backend.app.interfaces.interfaces import set_event_sink
+    from backend.app.utils.event_sink import SampledEventSink
+    from backend.app.utils.prefork import PreforkServer
+
+    make_app()
+    path = tmp_path / "actions.log"
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            # Sin volcados periódicos: solo el cierre del worker escribe los eventos
+            sink = SampledEventSink(flush_interval=3600, path=str(path))
+            set_event_sink(sink)
+            sink.emit("CuerpoElfo", "analizar", "Analizando cuerpo elfo...")
+            PreforkServer._retire()
+            status = 0
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert "CuerpoElfo\tanalizar" in path.read_text(encoding="utf-8")
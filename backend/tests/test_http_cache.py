@@ -0,0 +1,37 @@
+import os
+
+
+def _overwrite(path, data):
+    # Sobrescritura en el sitio (el mtime del directorio no cambia)
+    mtime = os.stat(path).st_mtime + 10
+    with open(path, "r+b") as f:
+        f.truncate(0)
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_sobrescritura_invalida_etag_y_304(client, image_dir):
+    url = "/images/characters/elfo/arma.png"
+    first = client.get(url)
+    assert first.status_code == 200 and first.data == b"\x89PNG-v1"
+    etag = first.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    _overwrite(image_dir / "elfo" / "arma.png", b"\x89PNG-version-2")
+    conditional = client.get(url, headers={"If-None-Match": etag})
+    assert conditional.status_code == 200
+    assert conditional.data == b"\x89PNG-version-2"
+    assert conditional.headers["ETag"] != etag
+    assert conditional.headers["Last-Modified"] != first.headers["Last-Modified"]
+
+
+def test_if_modified_since(client, image_dir):
+    url = "/images/characters/elfo/arma.png"
+    last_modified = client.get(url).headers["Last-Modified"]
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 304
+    _overwrite(image_dir / "elfo" / "arma.png", b"\x89PNG-v3")
+    assert client.get(url, headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_imagen_inexistente(client, image_dir):
+    assert client.get("/images/characters/elfo/nada.png").status_code == 404
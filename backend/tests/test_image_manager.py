@@ -0,0 +1,122 @@
+import base64
+import io
+import json
+import os
+
+import pytest
+
+from backend.app.utils.image_manager import ImagePathManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    (tmp_path / "elfo").mkdir()
+    (tmp_path / "elfo" / "arma.png").write_bytes(b"v1")
+    manager = ImagePathManager(refresh_interval=0)
+    manager._base_paths["characters"] = tmp_path
+    manager.build_index(["characters"])
+    return manager
+
+
+def _overwrite(path, data, mtime):
+    # Escritura en el sitio: el mtime del directorio no cambia
+    with open(path, "r+b") as f:
+        f.truncate(0)
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_stat_file_detecta_sobrescritura(manager, tmp_path):
+    path = tmp_path / "elfo" / "arma.png"
+    dir_mtime = os.stat(path.parent).st_mtime_ns
+    version = manager.index_version("characters")
+    _overwrite(path, b"version-2", os.stat(path).st_mtime + 10)
+    assert os.stat(path.parent).st_mtime_ns == dir_mtime
+
+    # El índice no lo ve por sí solo; stat_file sí, y lo actualiza
+    assert manager.file_info("characters", "elfo/arma.png")[0] == 2
+    size, mtime = manager.stat_file("characters", "elfo/arma.png")
+    assert size == len(b"version-2")
+    assert manager.file_info("characters", "elfo/arma.png") == (size, mtime)
+    assert manager.index_version("characters") > version
+
+
+def test_stat_file_sin_cambios_no_cambia_version(manager):
+    version = manager.index_version("characters")
+    assert manager.stat_file("characters", "elfo/arma.png")[0] == 2
+    assert manager.index_version("characters") == version
+
+
+def test_stat_file_inexistente(manager, tmp_path):
+    assert manager.stat_file("characters", "elfo/otro.png") is None
+    assert manager.stat_file("characters", "../fuera.png") is None
+    os.unlink(tmp_path / "elfo" / "arma.png")
+    assert manager.stat_file("characters", "elfo/arma.png") is None
+
+
+@pytest.fixture
+def listing(manager, tmp_path):
+    for i, name in enumerate(["a.png", "b.png", "c.png"]):
+        (tmp_path / name).write_bytes(b"x" * (10 - i))
+    manager.invalidate("characters")
+    return manager
+
+
+def test_paginas_por_tamano_descendente(listing):
+    first = listing.list_images_page("characters", limit=2, sort="size", descending=True)
+    assert [item["name"] for item in first["items"]] == ["a.png", "b.png"]
+    rest = listing.list_images_page("characters", limit=2, cursor=first["next_cursor"],
+                                    sort="size", descending=True)
+    assert [item["name"] for item in rest["items"]] == ["c.png"]
+    assert rest["next_cursor"] is None
+
+
+@pytest.mark.parametrize("sort, descending", [("name", False), ("size", True), ("mtime", False)])
+def test_cursor_de_otro_orden(listing, sort, descending):
+    cursor = listing.list_images_page("characters", limit=1, sort="size")["next_cursor"]
+    with pytest.raises(ValueError, match="otro orden"):
+        listing.list_images_page("characters", cursor=cursor, sort=sort, descending=descending)
+
+
+@pytest.mark.parametrize("key", [["name", "asc", 5, "a.png"], ["size", "asc", "a.png", "a.png"],
+                                 ["size", "asc", True, "a.png"], ["mtime", "asc", 1.5, None],
+                                 ["name", "asc", "a.png"]])
+def test_cursor_con_tipos_invalidos(listing, key):
+    cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        listing.list_images_page("characters", cursor=cursor, sort=key[0])
+
+
+def test_subidas_deduplican_por_hash_sin_importar_la_extension(manager, tmp_path):
+    first = manager.save_image_stream("characters", "elfo/foto.jpg", io.BytesIO(b"jpeg-bytes"))
+    second = manager.save_image_stream("characters", "orco/foto.JPEG", io.BytesIO(b"jpeg-bytes"))
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert first["sha256"] == second["sha256"]
+    assert second["path"] == first["path"] and first["path"].endswith(".jpg")
+    blobs = [p for p in (tmp_path / "_cas").rglob("*") if p.is_file() and p.parent.name != ".incoming"]
+    assert sorted(p.name for p in blobs) == sorted([f"{first['sha256']}.jpg", "names.json"])
+
+    other = manager.save_image_stream("characters", "elfo/otra.jpg", io.BytesIO(b"otros-bytes"))
+    assert not other["deduplicated"] and other["path"] != first["path"]
+
+
+def test_manifiesto_de_nombres(manager, tmp_path):
+    stored = manager.save_image_stream("characters", "elfo\\escudo.png", io.BytesIO(b"png"))
+    again = manager.save_image_stream("characters", "elfo/escudo.png", io.BytesIO(b"png-v2"))
+    blob = again["path"].split("/images/characters/", 1)[1]
+
+    with open(tmp_path / "_cas" / "names.json", encoding="utf-8") as f:
+        assert json.load(f) == {"elfo/escudo.png": blob}
+    assert stored["filename"] == "elfo/escudo.png"
+    assert manager.get_web_path("characters", "elfo/escudo.png") == again["path"]
+    assert "elfo/escudo.png" in manager.list_images("characters")
+
+    # Otra instancia (otro proceso) lee el mismo manifiesto del disco
+    fresh = ImagePathManager(refresh_interval=0)
+    fresh._base_paths["characters"] = tmp_path
+    fresh.build_index(["characters"])
+    assert fresh.get_web_path("characters", "elfo/escudo.png") == again["path"]
+
+    for name in ("../fuera.png", "_cas/x.png"):
+        with pytest.raises(ValueError):
+            manager.save_image_stream("characters", name, io.BytesIO(b"x"))
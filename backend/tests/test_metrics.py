@@ -0,0 +1,62 @@
+import os
+import re
+import time
+
+import pytest
+
+from backend.app.utils.metrics import MetricsRegistry, metrics
+
+
+def _sample(text, name, labels=""):
+    match = re.search(rf"^{re.escape(name + labels)} (\S+)$", text, re.M)
+    return None if match is None else float(match.group(1))
+
+
+def test_render_suma_snapshots_de_otros_procesos():
+    registry = MetricsRegistry(stripes=2)
+    requests = registry.counter("x_requests_total", "Peticiones.", ("result",))
+    latency = registry.histogram("x_seconds", "Latencia.", ("route",), buckets=(0.1, 1.0))
+    registry.register_collector(lambda: [("x_items", "gauge", "Objetos.", [({"pool": "a"}, 2)])])
+    registry.register_collector(lambda view: [(
+        "x_hit_ratio", "gauge", "Aciertos.",
+        [({}, view.value("x_requests_total", ("hit",)) / 4)],
+    )], derived=True)
+
+    requests.inc(("hit",))
+    latency.observe(("/a",), 0.05)
+    other = registry.snapshot()
+    requests.inc(("miss",), 2)
+    latency.observe(("/a",), 0.5)
+
+    text = registry.render([other])
+    assert _sample(text, "x_requests_total", '{result="hit"}') == 2
+    assert _sample(text, "x_requests_total", '{result="miss"}') == 2
+    assert _sample(text, "x_seconds_bucket", '{route="/a",le="0.1"}') == 2
+    assert _sample(text, "x_seconds_count", '{route="/a"}') == 3
+    assert _sample(text, "x_items", '{pool="a"}') == 4
+    # Las derivadas se calculan sobre la suma, no se suman entre procesos
+    assert _sample(text, "x_hit_ratio") == 0.5
+    assert text.count("# TYPE x_hit_ratio gauge") == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork()")
+def test_metrics_suma_todos_los_workers(make_app):
+    app = make_app(POOL_STATE="sqlite", POOL_SYNC_INTERVAL=0.05)
+    metrics.reset()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            client = app.test_client()
+            for _ in range(3):
+                client.get("/api/create/elfos")
+            time.sleep(0.5)  # Al menos una sincronización publicada
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    client = app.test_client()
+    for _ in range(2):
+        client.get("/api/create/elfos")
+    text = client.get("/metrics").get_data(as_text=True)
+    labels = '{method="GET",route="/api/create/<kind>",status="200"}'
+    assert _sample(text, "fabrica_http_request_duration_seconds_count", labels) == 5
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+from backend.app.patterns.object_pool import ObjectPool, PoolExhausted
+
+
+def test_reutiliza_objetos_devueltos():
+    pool = ObjectPool(object, max_size=2)
+    first = pool.acquire()
+    pool.release(first)
+    assert pool.acquire() is first
+    assert pool.stats()["created"] == 1
+
+
+def test_timeout_cuando_esta_agotado():
+    pool = ObjectPool(object, max_size=1)
+    pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolExhausted):
+        pool.acquire(timeout=0.05)
+    assert time.monotonic() - started >= 0.05
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_espera_hasta_que_se_devuelve():
+    pool = ObjectPool(object, max_size=1)
+    obj = pool.acquire()
+    threading.Timer(0.05, pool.release, (obj,)).start()
+    assert pool.acquire(timeout=2) is obj
+
+
+def test_limite_con_hilos_concurrentes():
+    pool = ObjectPool(object, max_size=3)
+    in_use, peak, lock = [0], [0], threading.Lock()
+
+    def worker():
+        for _ in range(50):
+            obj = pool.acquire(timeout=5)
+            with lock:
+                in_use[0] += 1
+                peak[0] = max(peak[0], in_use[0])
+            time.sleep(0.0005)
+            with lock:
+                in_use[0] -= 1
+            pool.release(obj)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = pool.stats()
+    assert peak[0] <= 3
+    assert stats["created"] <= 3 and stats["in_use"] == 0
+
+
+def test_release_sin_acquire():
+    with pytest.raises(ValueError):
+        ObjectPool(object).release(object())
+
+
+def test_reset_fallido_descarta_el_objeto_sin_perder_el_hueco():
+    def reset(obj):
+        raise RuntimeError("reset roto")
+
+    pool = ObjectPool(object, max_size=1, reset=reset)
+    broken = pool.acquire()
+    with pytest.raises(RuntimeError, match="reset roto"):
+        pool.release(broken)
+    stats = pool.stats()
+    assert (stats["in_use"], stats["created"], stats["discarded"]) == (0, 0, 1)
+    # El hueco sigue disponible: se crea un objeto nuevo en lugar del descartado
+    assert pool.acquire(timeout=0.05) is not broken
+
+
+def test_runtime_error_no_es_pool_agotado(client, monkeypatch):
+    from backend.app.utils.character_catalog import character_catalog
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("NumPy no está instalado (pip install numpy)")
+
+    monkeypatch.setattr(character_catalog, "get", broken)
+    response = client.get("/api/create/elfos")
+    assert response.status_code == 500
+    assert response.get_json()["error"] == "Internal error"
@@ -0,0 +1,136 @@
+import json
+import os
+
+import pytest
+
+from backend.app.patterns.pool_state import ALL_FACTORIES, SQLitePoolState
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requiere fork()")
+
+
+class _StubPool:
+    """Lo mínimo que usa ``SQLitePoolState``: snapshot local y eliminaciones."""
+
+    def __init__(self, factories=()):
+        self.factories = list(factories)
+        self.removed = []
+
+    def _local_snapshot(self):
+        return {"factories": [{"factory_type": name} for name in self.factories]}
+
+    def _apply_removal(self, factory_type=None, requested_at=None):
+        self.removed.append(factory_type)
+
+
+def _in_child(target):
+    """Ejecuta ``target()`` en un proceso hijo y devuelve su resultado (JSON)."""
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            os.write(write_fd, json.dumps(target()).encode())
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        data = f.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    return pid, json.loads(data)
+
+
+def _state(path, factories=()):
+    state = SQLitePoolState(path, sync_interval=60)
+    state._pool = _StubPool(factories)  # Sin attach(): las pruebas llaman a sync()
+    return state
+
+
+def test_eliminaciones_llegan_a_otra_instancia(tmp_path):
+    path = tmp_path / "state.sqlite3"
+    old = _state(path)
+    old.sync()
+    old.request_removal("FabricarAntigua")
+
+    a, b = _state(path), _state(path)
+    a.sync()
+    b.sync()
+    # Las eliminaciones anteriores al arranque no se aplican
+    assert b._pool.removed == []
+
+    a.request_removal("FabricarElfos")
+    a.request_removal(ALL_FACTORIES)
+    b.sync()
+    assert b._pool.removed == ["FabricarElfos", None]
+    # Cada eliminación se aplica una vez; una nueva petición sube la época
+    b.sync()
+    a.request_removal("FabricarElfos")
+    b.sync()
+    assert b._pool.removed == ["FabricarElfos", None, "FabricarElfos"]
+    # Quien la pidió ya la aplicó localmente
+    a.sync()
+    assert a._pool.removed == []
+
+
+def test_shared_view_y_cluster_view_reunen_los_workers(tmp_path):
+    path = tmp_path / "state.sqlite3"
+
+    def worker(value, factories):
+        def run():
+            state = _state(path, factories)
+            state.share("metrics", lambda: {"requests": value})
+            state.share("roto", lambda: 1 / 0)
+            state.sync()
+            return os.getpid()
+        return run
+
+    first, _ = _in_child(worker(2, ["FabricarElfos"]))
+    second, _ = _in_child(worker(3, ["FabricarOrcos"]))
+
+    parent = _state(path, ["FabricarEnanos"])
+    parent.share("metrics", lambda: {"requests": 100})
+    parent.sync()
+    # Los demás workers, por pid, sin el propio proceso
+    assert parent.shared_view("metrics") == tuple(sorted([(first, {"requests": 2}),
+                                                           (second, {"requests": 3})]))
+    assert parent.shared_view("roto") == ()
+    view = {pid: snapshot["factories"] for pid, _, snapshot in parent.cluster_view()}
+    assert view == {first: [{"factory_type": "FabricarElfos"}], second: [{"factory_type": "FabricarOrcos"}]}
+
+    # Un worker que deja de publicar desaparece tras worker_ttl
+    parent.worker_ttl = 0.0
+    parent.sync()
+    assert parent.shared_view("metrics") == ()
+    assert parent.cluster_view() == ()
+
+
+def test_after_fork_recrea_conexion_e_hilo(tmp_path):
+    path = tmp_path / "state.sqlite3"
+    state = SQLitePoolState(path, sync_interval=60)
+    state.attach(_StubPool(["FabricarElfos"]))
+    closed = SQLitePoolState(tmp_path / "closed.sqlite3", sync_interval=60)
+    closed.attach(_StubPool())
+    closed.close()
+    parent_conn = state._connection()
+    try:
+        def child():
+            state.after_fork()
+            closed.after_fork()
+            state.sync()
+            return {
+                "alive": state._thread.is_alive(),
+                "closed_alive": closed._thread is not None and closed._thread.is_alive(),
+                "new_conn": state._connection() is not parent_conn,
+                "view": [pid for pid, _, _ in state.cluster_view()],
+            }
+
+        pid, result = _in_child(child)
+        assert result == {"alive": True, "closed_alive": False, "new_conn": True,
+                          "view": [os.getpid()]}
+        # El hijo publicó con su pid: el padre lo ve en su siguiente sincronización
+        state.sync()
+        assert pid in [row_pid for row_pid, _, _ in state.cluster_view()]
+    finally:
+        state.close()
@@ -0,0 +1,43 @@
+import pytest
+
+from backend.app.utils.population import available, population_store
+
+pytestmark = pytest.mark.skipif(not available(), reason="requiere NumPy")
+
+
+def test_semilla_negativa_es_400(client):
+    assert client.post("/api/populations?name=p&count=100&seed=-1").status_code == 400
+    assert client.post("/api/populations?name=p&count=100&seed=3").status_code == 201
+    response = client.get("/api/populations/p/sample?n=5&seed=-1")
+    assert response.status_code == 400
+    assert client.get("/api/populations/p/sample?n=5&seed=7").status_code == 200
+
+
+def test_tope_de_filas(make_app):
+    client = make_app(POPULATION_MAX_COUNT=1000).test_client()
+    assert client.post("/api/populations?name=p&count=1001").status_code == 400
+
+
+def test_tope_de_disco(make_app):
+    client = make_app(POPULATION_MAX_BYTES=200_000).test_client()
+    assert client.post("/api/populations?name=a&count=2000").status_code == 201
+    used = client.get("/api/populations").get_json()["used_bytes"]
+    assert 0 < used <= 200_000
+
+    response = client.post("/api/populations?name=b&count=4000")
+    assert response.status_code == 507
+    assert response.get_json()["max_bytes"] == 200_000
+    # Sobrescribir libera el espacio de la población anterior
+    assert client.post("/api/populations?name=a&count=4000&overwrite=true").status_code == 201
+    assert [p["name"] for p in client.get("/api/populations").get_json()["populations"]] == ["a"]
+
+
+def test_una_generacion_a_la_vez(client):
+    population_store._creating.acquire()
+    try:
+        response = client.post("/api/populations?name=p&count=100")
+    finally:
+        population_store._creating.release()
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert client.post("/api/populations?name=p&count=100").status_code == 201
@@ -0,0 +1,67 @@
+import pytest
+
+from backend.app.factories import race_registry
+from backend.app.factories.productos import ProductoVariante
+
+
+@pytest.fixture
+def fabrica():
+    return race_registry["elfos"](modo="flyweight")
+
+
+def test_flyweight_comparte_instancias(fabrica):
+    otra = race_registry["elfos"](modo="flyweight")
+    personaje = fabrica.crear_personaje()
+    assert personaje == otra.crear_personaje()
+    assert fabrica.crear_cuerpo() is personaje[0] is otra.crear_cuerpo()
+    # Devolver no hace nada: la instancia sigue siendo la compartida
+    fabrica.devolver_personaje(*personaje)
+    assert fabrica.crear_cuerpo() is personaje[0]
+    assert all(stats == {"mode": "flyweight", "instances": 1} for stats in fabrica.get_pool_stats().values())
+
+
+def test_plantilla_compartida_inmutable(fabrica):
+    cuerpo = fabrica.crear_cuerpo()
+    with pytest.raises(TypeError):
+        type(cuerpo).plantilla["especie"] = "Orco"
+    with pytest.raises(TypeError):
+        type(cuerpo).plantilla["habilidades"][0] = "Nada"
+    with pytest.raises(AttributeError):
+        cuerpo.extra = 1
+    # La información devuelta es una copia mutable
+    info = cuerpo.obtener_informacion()
+    info["habilidades"].append("Nada")
+    assert "Nada" not in cuerpo.obtener_informacion()["habilidades"]
+
+
+def test_variante_superpone_estado_sin_tocar_la_plantilla(fabrica):
+    cuerpo = fabrica.crear_cuerpo()
+    original = cuerpo.obtener_informacion()
+
+    variante = fabrica.crear_variante("cuerpo", altura="2.10m")
+    assert isinstance(variante, ProductoVariante) and isinstance(variante, type(cuerpo))
+    assert variante is not fabrica.crear_variante("cuerpo")
+    assert variante.obtener_informacion() == {**original, "altura": "2.10m"}
+    variante.estado["peso"] = "90kg"
+    assert variante.obtener_informacion()["peso"] == "90kg"
+
+    assert cuerpo.obtener_informacion() == original
+    # Las variantes no pertenecen a ningún pool
+    pool = race_registry["elfos"](modo="pool")
+    pool.devolver_cuerpo(variante)
+    assert pool.get_pool_stats()["cuerpo"]["in_use"] == 0
+
+
+def test_modo_flyweight_en_la_aplicacion(make_app):
+    from backend.app.patterns.singleton_pool import Pool
+
+    # El modo se aplica a las fábricas que se construyan después de fijarlo
+    Pool().remove_factory()
+    try:
+        client = make_app(PRODUCT_MODE="flyweight").test_client()
+        response = client.get("/api/character/orcos/info")
+        assert response.status_code == 200
+        assert response.get_json()["pool_stats"]["cuerpo"] == {"mode": "flyweight", "instances": 1}
+    finally:
+        make_app()
+        Pool().remove_factory()
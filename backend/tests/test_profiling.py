@@ -0,0 +1,58 @@
+import pytest
+
+
+@pytest.mark.parametrize("supplied, status", [
+    ("secreto", 200),
+    ("otro", 403),
+    ("señal", 403),
+    ("secretoñ", 403),
+])
+def test_token_de_perfilado(make_app, supplied, status):
+    client = make_app(PROFILE_TOKEN="secreto").test_client()
+    response = client.get("/api/admin/profiles", headers={"X-Profile-Token": supplied})
+    assert response.status_code == status
+
+
+def test_token_no_ascii(make_app):
+    client = make_app(PROFILE_TOKEN="clave-ñ").test_client()
+    # El cliente envía el token en UTF-8; WSGI lo entrega decodificado como latin-1
+    utf8_as_latin1 = "clave-ñ".encode("utf-8").decode("latin-1")
+    assert client.get("/api/admin/profiles", headers={"X-Profile-Token": utf8_as_latin1}).status_code == 200
+    assert client.get("/api/admin/profiles", headers={"X-Profile-Token": "clave-ñ"}).status_code == 403
+
+
+def test_un_solo_cprofile_por_proceso(make_app, monkeypatch):
+    from backend.app.utils.profiling import request_profiler
+
+    client = make_app(PROFILE_SAMPLE_RATE=1.0, PROFILE_MODE="cprofile").test_client()
+    started = []
+    start = request_profiler.sampler.start
+    monkeypatch.setattr(request_profiler.sampler, "start", lambda ident: started.append(ident) or start(ident))
+
+    # Otra petición tiene cProfile activo: esta se perfila con el muestreador
+    assert request_profiler._cprofile.acquire(blocking=False)
+    try:
+        assert client.get("/api/factories").status_code == 200
+    finally:
+        request_profiler._cprofile.release()
+    assert len(started) == 1
+
+    assert client.get("/api/factories").status_code == 200
+    assert len(started) == 1
+    assert request_profiler._cprofile.acquire(blocking=False)
+    request_profiler._cprofile.release()
+    assert [item["mode"] for item in request_profiler.store.list()] == ["cprofile"]
+
+
+def test_error_al_guardar_no_rompe_la_respuesta(make_app, monkeypatch):
+    from backend.app.utils.profiling import request_profiler
+
+    client = make_app(PROFILE_SAMPLE_RATE=1.0, PROFILE_MODE="cprofile").test_client()
+
+    def full(*args, **kwargs):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(request_profiler.store, "save", full)
+    assert client.get("/api/factories").status_code == 200
+    assert request_profiler._cprofile.acquire(blocking=False)
+    request_profiler._cprofile.release()
@@ -0,0 +1,90 @@
+import copy
+import json
+
+import pytest
+
+from backend.app.factories import registry
+from backend.app.factories.registry import BUILTIN_DIR, RaceDefinitionError, RaceRegistry, compile_race, load_race
+
+
+@pytest.fixture
+def definition():
+    with open(BUILTIN_DIR / "elfos.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _broken(definition, path, value):
+    broken = copy.deepcopy(definition)
+    *parents, last = path
+    target = broken
+    for key in parents:
+        target = target[key]
+    if value is KeyError:
+        del target[last]
+    else:
+        target[last] = value
+    return broken
+
+
+def test_compila_la_definicion(definition):
+    factory_class = compile_race(definition, "elfos")
+    assert factory_class.__name__ == "FabricarElfos"
+    assert factory_class.kind == "elfos"
+    assert set(factory_class.productos) == set(registry.INTERFACES)
+
+
+@pytest.mark.parametrize("path, value, message", [
+    (("kind",), "orcos", "no coincide"),
+    (("fabrica",), "no valida", "'fabrica' inválida"),
+    (("partes", "arma"), KeyError, "'partes' debe definir"),
+    (("partes", "cuerpo", "clase"), 3, "'cuerpo.clase' inválida"),
+    (("partes", "cuerpo", "info"), [], "'cuerpo.info' debe ser un objeto"),
+    (("partes", "montura", "acciones", "montar"), KeyError, "le faltan las acciones"),
+    (("partes", "cuerpo", "acciones", "obtener_informacion"), "x", "nombre de acción inválido"),
+    (("partes", "cuerpo", "estadisticas", "vida", "min"), 200, "'min' <= 'max'"),
+    (("partes", "cuerpo", "estadisticas", "vida", "media"), 500, "fuera de [min, max]"),
+    (("partes", "cuerpo", "estadisticas", "vida", "max"), "100", "valores numéricos"),
+])
+def test_errores_de_validacion(definition, path, value, message):
+    with pytest.raises(RaceDefinitionError, match=r"^elfos\.json: .*" + message.replace("[", r"\[")):
+        compile_race(_broken(definition, path, value), "elfos", source="elfos.json")
+
+
+def test_load_race_archivo_invalido(tmp_path):
+    path = tmp_path / "rota.json"
+    path.write_text("{no es json", encoding="utf-8")
+    with pytest.raises(RaceDefinitionError, match=r"^rota\.json: "):
+        load_race(path)
+    with pytest.raises(RaceDefinitionError, match=r"^falta\.json: "):
+        load_race(tmp_path / "falta.json")
+
+
+def test_primer_acceso_compila_y_los_siguientes_reutilizan(tmp_path, definition, monkeypatch):
+    (tmp_path / "silvanos.json").write_text(
+        json.dumps({**definition, "kind": "silvanos", "fabrica": "FabricarSilvanos"}), encoding="utf-8")
+    calls = []
+    original = registry.load_race
+    monkeypatch.setattr(registry, "load_race", lambda path: calls.append(path.stem) or original(path))
+
+    races = RaceRegistry([tmp_path])
+    # Listar y consultar ``in`` no compila nada
+    assert "silvanos" in races and "elfos" in list(races)
+    assert races.loaded() == [] and calls == []
+
+    first = races["silvanos"]
+    assert first.__name__ == "FabricarSilvanos"
+    assert races["silvanos"] is first
+    assert calls == ["silvanos"]
+    assert races.loaded() == ["silvanos"]
+    with pytest.raises(KeyError):
+        races["no_existe"]
+
+
+def test_arranque_sin_precompilar(make_app):
+    from backend.app.factories import race_registry
+
+    race_registry.configure(["otro"])  # Olvidar lo compilado por pruebas anteriores
+    client = make_app().test_client()
+    assert race_registry.loaded() == []
+    assert client.get("/api/create/orcos").status_code == 200
+    assert race_registry.loaded() == ["orcos"]
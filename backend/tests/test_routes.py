@@ -0,0 +1,26 @@
+def test_crear_razas_distintas_sin_conflicto(client):
+    for kind in ("elfos", "orcos", "elfos"):
+        response = client.get(f"/api/create/{kind}")
+        assert response.status_code == 200
+        assert response.get_json()["kind"] == kind
+
+
+def test_raza_desconocida(client):
+    assert client.get("/api/create/dragones").status_code == 404
+
+
+def test_auto_return_no_deja_objetos_prestados(client):
+    # Más peticiones que objetos por pool: antes agotaba la raza hasta /pool/delete
+    for _ in range(15):
+        assert client.get("/api/create/enanos?auto_return=false").status_code == 200
+    stats = client.get("/api/character/enanos/info").get_json()["pool_stats"]
+    assert all(part["in_use"] == 0 for part in stats.values())
+
+
+def test_cursor_de_otro_orden_es_400(client, image_dir):
+    for name in ("a.png", "b.png"):
+        (image_dir / name).write_bytes(b"\x89PNG")
+    cursor = client.get("/api/images/characters?limit=1").get_json()["next_cursor"]
+    assert cursor
+    response = client.get(f"/api/images/characters?cursor={cursor}&sort=size")
+    assert response.status_code == 400
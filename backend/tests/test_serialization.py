@@ -0,0 +1,87 @@
+import json
+import math
+
+import pytest
+
+from backend.app.utils import serialization
+from backend.app.utils.binary_codec import cbor_dumps, cbor_loads, msgpack_dumps, msgpack_loads
+
+
+PAYLOADS = [
+    None, True, False, 0, -1, 127, 128, -33, 2 ** 32, -(2 ** 63), 2 ** 64 - 1,
+    0.1, -2.5, 1760000000.123, "", "ñandú ⚔ 龍", "x" * 300,
+    [], [1, "dos", [3.0, None]], {"a": {"b": [True, {"c": "d"}]}},
+    {"character": {"nombre": "Légolas", "stats": {"vida": 100, "agilidad": 0.75}}},
+    {"items": [{"name": f"img{i}.png", "size": i * 1000} for i in range(70)]},
+]
+
+
+@pytest.fixture(autouse=True)
+def restore_encoder():
+    yield
+    serialization.configure_json("stdlib", compact=False)
+
+
+@pytest.mark.parametrize("obj", PAYLOADS)
+def test_stdlib_por_defecto_identico_a_json_dumps(obj):
+    serialization.configure_json("auto", compact=False)
+    assert serialization.dumps_json(obj) == json.dumps(obj, ensure_ascii=False).encode()
+
+
+@pytest.mark.parametrize("encoder", ["stdlib", "orjson"])
+@pytest.mark.parametrize("obj", PAYLOADS)
+def test_compacto_identico_a_json_dumps(encoder, obj):
+    if encoder == "orjson":
+        pytest.importorskip("orjson")
+    serialization.configure_json(encoder, compact=True)
+    expected = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+    assert serialization.dumps_json(obj) == expected
+
+
+@pytest.mark.parametrize("value, stdlib, fast", [
+    (1e16, b"1e+16", b"1e16"),
+    (1e-07, b"1e-07", b"1e-7"),
+    (math.nan, b"NaN", b"null"),
+    (math.inf, b"Infinity", b"null"),
+])
+def test_diferencias_documentadas_de_orjson(value, stdlib, fast):
+    pytest.importorskip("orjson")
+    serialization.configure_json("stdlib", compact=True)
+    assert serialization.dumps_json([value]) == b"[" + stdlib + b"]"
+    serialization.configure_json("orjson", compact=True)
+    assert serialization.dumps_json([value]) == b"[" + fast + b"]"
+
+
+@pytest.mark.parametrize("dumps, loads", [(msgpack_dumps, msgpack_loads), (cbor_dumps, cbor_loads)])
+@pytest.mark.parametrize("obj", PAYLOADS + [b"\x00\xff" * 200, 2 ** 64 - 1, -(2 ** 63)])
+def test_ida_y_vuelta_binaria(dumps, loads, obj):
+    assert loads(dumps(obj)) == obj
+
+
+@pytest.mark.parametrize("dumps, loads", [(msgpack_dumps, msgpack_loads), (cbor_dumps, cbor_loads)])
+def test_tamanos_de_contenedor(dumps, loads):
+    # Cruza los umbrales de longitud fija, 8, 16 y 32 bits
+    for n in (15, 16, 23, 24, 255, 256, 65535, 65536):
+        obj = {"lista": list(range(n)), "texto": "a" * n, "mapa": {str(i): i for i in range(n % 300)}}
+        assert loads(dumps(obj)) == obj
+
+
+def test_respuestas_binarias_equivalentes_a_json(client):
+    json_body = client.get("/api/factories").get_json()
+    packed = client.get("/api/factories", headers={"Accept": "application/msgpack"})
+    cbor = client.get("/api/factories", headers={"Accept": "application/cbor"})
+    assert packed.mimetype == "application/msgpack"
+    assert msgpack_loads(packed.data) == json_body
+    assert cbor.mimetype == "application/cbor"
+    assert cbor_loads(cbor.data) == json_body
+
+
+def test_respuesta_compacta_identica_entre_codificadores(make_app):
+    pytest.importorskip("orjson")
+    bodies = {}
+    for encoder in ("stdlib", "orjson"):
+        client = make_app(JSON_ENCODER=encoder, JSON_COMPACT=True).test_client()
+        bodies[encoder] = client.get("/api/factories").data
+    assert bodies["stdlib"] == bodies["orjson"]
+    assert bodies["stdlib"] == json.dumps(json.loads(bodies["stdlib"]), ensure_ascii=False,
+                                          separators=(",", ":")).encode()
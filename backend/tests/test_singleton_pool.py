@@ -0,0 +1,59 @@
+import threading
+import time
+
+from backend.app.patterns.singleton_pool import Pool
+
+
+def _factory_class(name, delay=0.0):
+    built = []
+
+    def __init__(self):
+        time.sleep(delay)
+        built.append(self)
+
+    return type(name, (), {"__init__": __init__}), built
+
+
+def test_cada_tipo_tiene_su_fabrica():
+    pool = Pool()
+    pool.configure(idle_ttl=None, max_factories=None)
+    elfos, _ = _factory_class("FabricaA")
+    orcos, _ = _factory_class("FabricaB")
+    try:
+        a, b = pool.get_factory(elfos), pool.get_factory(orcos)
+        assert isinstance(a, elfos) and isinstance(b, orcos)
+        assert pool.get_factory(elfos) is a
+    finally:
+        pool.remove_factory(elfos)
+        pool.remove_factory(orcos)
+
+
+def test_construccion_concurrente_una_sola_vez():
+    pool = Pool()
+    pool.configure(idle_ttl=None, max_factories=None)
+    cls, built = _factory_class("FabricaLenta", delay=0.05)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get_factory(cls))) for _ in range(16)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(built) == 1
+        assert all(result is built[0] for result in results)
+    finally:
+        pool.remove_factory(cls)
+
+
+def test_desalojo_por_limite():
+    pool = Pool()
+    pool.configure(idle_ttl=None, max_factories=1)
+    first, _ = _factory_class("FabricaPrimera")
+    second, _ = _factory_class("FabricaSegunda")
+    try:
+        pool.get_factory(first)
+        pool.get_factory(second)
+        assert not pool.remove_factory(first)
+    finally:
+        pool.remove_factory(second)
+        pool.configure(idle_ttl=None, max_factories=None)
@@ -0,0 +1,75 @@
+import os
+import struct
+import zlib
+
+import pytest
+
+from backend.app.utils import sprite_atlas
+from backend.app.utils.sprite_atlas import SpriteRenderer
+
+
+def _png(width, height):
+    """PNG mínimo válido (un píxel gris repetido) con las dimensiones indicadas."""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    raw = b"".join(b"\x00" + b"\x80" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b""))
+
+
+@pytest.fixture
+def renderer(image_dir, tmp_path, monkeypatch):
+    (image_dir / "elfo" / "cuerpo.png").write_bytes(_png(40, 20))
+    renderer = SpriteRenderer(cache_dir=str(tmp_path / "sprites"))
+    sources = []
+    for parte, rel in (("cuerpo", "elfo/cuerpo.png"), ("arma", "elfo/arma.png")):
+        st = os.stat(image_dir / rel)
+        sources.append((parte, "characters", rel, st.st_size, st.st_mtime))
+    monkeypatch.setattr(renderer, "sources", lambda kind, factory_class: sources)
+    return renderer
+
+
+def test_layout_omite_fuentes_ilegibles(renderer):
+    # elfo/arma.png no es un PNG válido: antes era un 500
+    layout = renderer.layout("elfos", None, cell=16)
+    assert list(layout["frames"]) == ["cuerpo"]
+    assert layout["frames"]["cuerpo"] == {"x": 0, "y": 4, "w": 16, "h": 8,
+                                          "source": "/images/characters/elfo/cuerpo.png"}
+
+
+def test_dimensiones_se_leen_una_vez(renderer, monkeypatch):
+    reads = []
+    original = sprite_atlas._image_size
+    monkeypatch.setattr(sprite_atlas, "_image_size", lambda path: reads.append(path) or original(path))
+    for cell in (16, 32, 64):
+        renderer.layout("elfos", None, cell=cell)
+    assert len(reads) == 2
+
+
+def test_prune_disk_borra_los_menos_usados(tmp_path):
+    renderer = SpriteRenderer(cache_dir=str(tmp_path), max_disk_bytes=250)
+    for age, key in enumerate(("nuevo", "medio", "viejo")):
+        for ext, size in ((".png", 100), (".json", 10)):
+            path = tmp_path / f"{key}{ext}"
+            path.write_bytes(b"x" * size)
+            os.utime(path, (1000 - age, 1000 - age))
+    assert renderer.prune_disk() == 1
+    assert sorted(os.listdir(tmp_path)) == ["medio.json", "medio.png", "nuevo.json", "nuevo.png"]
+
+
+@pytest.mark.skipif(sprite_atlas.Image is not None, reason="comportamiento sin Pillow")
+def test_sin_pillow_501_con_imagenes_sueltas(client):
+    response = client.get("/api/character/elfos/sprite")
+    assert response.status_code == 501
+    assert set(response.get_json()["sources"]) == {"cuerpo", "montura", "armadura", "arma"}
+    assert client.get("/api/character/elfos/sprite?format=svg").status_code == 400
+    mapa = client.get("/api/character/elfos/sprite/map").get_json()
+    assert mapa["url"] is None and len(mapa["frames"]) == 4
+
+
+@pytest.mark.skipif(sprite_atlas.Image is None, reason="requiere Pillow")
+def test_cell_define_el_tamano_del_atlas(renderer):
+    from io import BytesIO
+    sprite = renderer.render("elfos", None, "png", cell=16)
+    with sprite_atlas.Image.open(BytesIO(sprite.body)) as atlas:
+        assert atlas.size == (32, 32)
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from backend.app.utils.tracing import Tracer, tracer, traced
+
+
+@pytest.fixture
+def local_tracer():
+    return Tracer(buffer=4)
+
+
+def _spans(trace):
+    return {name: (start, end, args) for name, _, start, end, args in trace.spans}
+
+
+def test_span_fuera_de_una_traza_no_anota(local_tracer):
+    with local_tracer.span("suelto") as first, local_tracer.span("otro") as second:
+        pass
+    # Objeto vacío compartido, sin traza que terminar
+    assert first is second
+    assert local_tracer.finish() is None
+    assert local_tracer.recent() == []
+
+
+def test_spans_anidados_quedan_contenidos(local_tracer):
+    trace = local_tracer.begin("GET /x", "/x")
+    with local_tracer.span("externo", "pool", kind="elfos"):
+        with local_tracer.span("interno", "factory"):
+            pass
+        with pytest.raises(KeyError), local_tracer.span("fallo"):
+            raise KeyError("x")
+    assert local_tracer.finish(200) is trace
+
+    spans = _spans(trace)
+    # Se anotan al cerrarse: el interno antes que el externo
+    assert [span[0] for span in trace.spans] == ["interno", "fallo", "externo"]
+    outer_start, outer_end, outer_args = spans["externo"]
+    assert outer_args == {"kind": "elfos"}
+    for name in ("interno", "fallo"):
+        start, end, _ = spans[name]
+        assert trace.start <= outer_start <= start <= end <= outer_end <= trace.end
+    assert spans["interno"][2] is None
+    assert spans["fallo"][2] == {"error": "KeyError"}
+    assert trace.status == 200 and local_tracer.recent() == [trace]
+
+
+def test_traced_solo_anota_con_traza_activa(monkeypatch, local_tracer):
+    monkeypatch.setattr(tracer, "_local", local_tracer._local)
+
+    @traced("suma", "calc")
+    def suma(a, b):
+        with local_tracer.span("dentro"):
+            return a + b
+
+    assert suma.__name__ == "suma"
+    assert suma(1, 2) == 3
+    trace = local_tracer.begin("GET /suma", "/suma")
+    assert suma(2, 3) == 5
+    local_tracer.finish(200)
+    assert [(name, cat) for name, cat, *_ in trace.spans] == [("dentro", "app"), ("suma", "calc")]
+    spans = _spans(trace)
+    assert spans["suma"][0] <= spans["dentro"][0] <= spans["dentro"][1] <= spans["suma"][1]
+
+
+def test_buffer_y_filtros(local_tracer):
+    for i in range(6):
+        local_tracer.begin(f"GET /r{i}", f"/r{i % 2}")
+        local_tracer.finish(200)
+    recent = local_tracer.recent()
+    assert [t.name for t in recent] == ["GET /r2", "GET /r3", "GET /r4", "GET /r5"]
+    assert [t.name for t in local_tracer.recent(route="/r1")] == ["GET /r3", "GET /r5"]
+    assert [t.name for t in local_tracer.recent(limit=1)] == ["GET /r5"]
+    assert local_tracer.recent(min_ms=1e9) == []
+    local_tracer.resize(2)
+    assert [t.name for t in local_tracer.recent()] == ["GET /r4", "GET /r5"]
+
+
+def test_formato_chrome(local_tracer):
+    trace = local_tracer.begin("GET /x", "/x")
+    with local_tracer.span("fase", "pool", n=1):
+        pass
+    local_tracer.finish(201)
+
+    exported = Tracer.to_chrome([trace])
+    assert exported["displayTimeUnit"] == "ms"
+    events = exported["traceEvents"]
+    request_event, span_event, process, thread = events
+    assert request_event == {
+        "name": "GET /x", "cat": "request", "ph": "X",
+        "ts": trace.start / 1000.0, "dur": (trace.end - trace.start) / 1000.0,
+        "pid": trace.pid, "tid": trace.tid, "args": {"route": "/x", "status": 201},
+    }
+    _, _, start, end, _ = trace.spans[0]
+    assert span_event == {"name": "fase", "cat": "pool", "ph": "X", "ts": start / 1000.0,
+                          "dur": (end - start) / 1000.0, "pid": trace.pid, "tid": trace.tid,
+                          "args": {"n": 1}}
+    assert process == {"name": "process_name", "ph": "M", "pid": trace.pid, "tid": 0,
+                       "args": {"name": f"worker {trace.pid}"}}
+    assert thread == {"name": "thread_name", "ph": "M", "pid": trace.pid, "tid": trace.tid,
+                      "args": {"name": f"thread {trace.tid}"}}
+    # Serializable tal cual para chrome://tracing
+    assert json.loads(json.dumps(exported)) == exported
+    assert Tracer.to_chrome([]) == {"traceEvents": [], "displayTimeUnit": "ms"}
+
+
+def test_exportacion_desde_la_aplicacion(make_app):
+    tracer.clear()
+    try:
+        client = make_app(TRACE_ENABLED=True, TRACE_SAMPLE_RATE=0.0).test_client()
+        assert client.get("/api/create/elfos").status_code == 200  # Sin muestreo ni cabecera
+        assert client.get("/api/create/orcos", headers={"X-Trace": "1"}).status_code == 200
+        response = client.get("/api/debug/traces")
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "no-store"
+        events = response.get_json()["traceEvents"]
+        requests = [e for e in events if e.get("cat") == "request"]
+        assert [e["args"]["route"] for e in requests] == ["/api/create/<kind>"]
+        assert requests[0]["args"]["status"] == 200
+        spans = [e for e in events if e["ph"] == "X" and e.get("cat") != "request"]
+        assert spans and all(requests[0]["ts"] <= e["ts"] and
+                             e["ts"] + e["dur"] <= requests[0]["ts"] + requests[0]["dur"] for e in spans)
+        assert {e["name"] for e in events if e["ph"] == "M"} == {"process_name", "thread_name"}
+    finally:
+        tracer.clear()
+        make_app()
+    assert make_app().test_client().get("/api/debug/traces").status_code == 404